@@ -0,0 +1,270 @@
+"""Calculs vectorisés sur les séries enregistrées.
+
+Les fonctions travaillent sur des tableaux NumPy (un élément par série) pour
+traiter tout l'historique en une passe, sans boucle Python.
+
+``TrainingLoad`` tient les charges d'entraînement jour par jour (tonnage,
+INOL, répétitions par zone d'intensité) et en déduit les cumuls par semaine
+et le ratio de charge aiguë / chronique (ACWR).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from model import EPOCH_ORDINAL, SET_DTYPE, SET_STRUCT, TIME, SessionRecord
+
+FORMULAS = ("epley", "brzycki", "lombardi", "rpe")
+
+# Table RPE (Tuchscherer) : % du 1RM pour 1 à 12 reps à RPE 10.
+# Chaque demi-point de RPE en dessous de 10 compte comme une demi-rep de plus.
+RPE10_PERCENT = np.array([100.0, 95.5, 92.2, 89.2, 86.3, 83.7, 81.1, 78.6, 76.2, 73.9, 70.7, 68.0]) / 100.0
+RPE10_REPS = np.arange(1, len(RPE10_PERCENT) + 1, dtype=float)
+
+
+def estimate_1rm(weights, reps, rpe=None) -> Dict[str, np.ndarray]:
+    """Estime le 1RM de chaque série avec plusieurs formules en une passe
+
+    ``weights`` et ``reps`` sont des tableaux de même taille ; ``rpe`` est
+    optionnel (RPE 10 par défaut, c'est-à-dire série menée à l'échec).
+    Les séries sans répétition, ou hors du domaine d'une formule, donnent NaN.
+    """
+    w = np.asarray(weights, dtype=float)
+    r = np.asarray(reps, dtype=float)
+    rpe = np.full_like(r, 10.0) if rpe is None else np.asarray(rpe, dtype=float)
+    valid = r >= 1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        epley = np.where(r == 1, w, w * (1 + r / 30.0))
+        brzycki = np.where(r < 37, w * 36.0 / (37.0 - r), np.nan)
+        lombardi = w * np.power(r, 0.10)
+
+        effective_reps = r + (10.0 - rpe)
+        percent = np.interp(effective_reps, RPE10_REPS, RPE10_PERCENT)
+        in_table = (effective_reps >= 1) & (effective_reps <= RPE10_REPS[-1])
+        rpe_table = np.where(in_table, w / percent, np.nan)
+
+    return {
+        name: np.where(valid, values, np.nan)
+        for name, values in zip(FORMULAS, (epley, brzycki, lombardi, rpe_table))
+    }
+
+
+def lttb(x, y, threshold: int) -> np.ndarray:
+    """Indices des points conservés par Largest-Triangle-Three-Buckets
+
+    Réduit une série (``x`` croissant) à ``threshold`` points en gardant sa
+    forme : le premier et le dernier point, puis dans chaque seau le point qui
+    forme le plus grand triangle avec le point retenu précédent et la moyenne
+    du seau suivant. Les valeurs NaN de ``y`` sont écartées.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    index = np.flatnonzero(~np.isnan(y))
+    n = len(index)
+    if threshold >= n or threshold < 3:
+        return index
+    x, y = x[index], y[index]
+
+    # Seaux de taille égale entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        # Aire (au facteur 1/2 près) des triangles précédent / candidat / moyenne suivante
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return index[selected]
+
+
+# Zones d'intensité (% du 1RM estimé de référence) : <60, 60-70, 70-80, 80-90, >=90
+INTENSITY_ZONES = np.array([60.0, 70.0, 80.0, 90.0])
+ZONE_LABELS = ("<60%", "60-70%", "70-80%", "80-90%", "≥90%")
+# Intensité plafonnée pour l'INOL (reps / (100 - %1RM)), infini à 100 %
+MAX_INTENSITY = 0.99
+# Fenêtres (jours) de la charge aiguë et chronique
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+
+def _collect_sets(sessions: Iterable[SessionRecord], names: Dict[str, int]) -> Tuple[np.ndarray, ...]:
+    """Séries de ``sessions`` en colonnes : ordinal, exercice (indice dans ``names``), poids, reps
+
+    Les exercices sans séries détaillées comptent pour leurs séries prescrites
+    s'ils sont réussis ; les exercices au temps sont ignorés.
+    """
+    chunks, days, exercises, counts = [], [], [], []
+    for session in sessions:
+        for ex in session.exercises:
+            if ex.prescription.kind == TIME:
+                continue
+            packed = ex.packed_sets
+            if not packed:
+                if ex.status != 'completed' or not ex.sets:
+                    continue
+                packed = SET_STRUCT.pack(ex.weight, ex.prescription.rep_count, True) * ex.sets
+            chunks.append(packed)
+            days.append(session.date)
+            exercises.append(names.setdefault(ex.name, len(names)))
+            counts.append(len(packed) // SET_STRUCT.size)
+    sets = np.frombuffer(b"".join(chunks), dtype=SET_DTYPE)
+    keep = (sets['weight'] > 0) & (sets['reps'] > 0)
+    return (np.repeat(np.array(days, dtype=np.int64), counts)[keep],
+            np.repeat(np.array(exercises, dtype=np.int64), counts)[keep],
+            sets['weight'][keep], sets['reps'][keep].astype(float))
+
+
+def _reference_1rm(days: np.ndarray, exercises: np.ndarray, e1rm: np.ndarray,
+                   best: np.ndarray) -> np.ndarray:
+    """1RM de référence de chaque série : meilleur 1RM estimé de l'exercice jusqu'à ce jour inclus
+
+    ``best`` (par exercice) sert de point de départ et reçoit les nouveaux maxima.
+    """
+    if len(days) == 0:
+        return np.empty(0)
+    order = np.lexsort((days, exercises))
+    keys = exercises[order] * (days.max() - days.min() + 1) + (days[order] - days.min())
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    group = np.cumsum(np.r_[False, keys[1:] != keys[:-1]])
+    day_max = np.maximum.reduceat(e1rm[order], starts)
+    group_exercise = exercises[order][starts]
+    day_max = np.maximum(day_max, best[group_exercise])
+    # Maximum cumulé par exercice en une passe, sur les rangs (entiers, sans
+    # arrondi) : les exercices (triés) sont décalés d'un pas supérieur à tout
+    # rang pour que le maximum ne déborde pas d'un exercice sur le suivant
+    values = np.sort(day_max)
+    step = len(values)
+    ranks = np.searchsorted(values, day_max) + group_exercise * step
+    running = values[np.maximum.accumulate(ranks) - group_exercise * step]
+    # Maximum cumulé : le plus grand de chaque exercice est son dernier (l'ordre des affectations
+    # à indices répétés n'est pas garanti par NumPy, np.maximum.at ne dépend pas de l'ordre)
+    np.maximum.at(best, group_exercise, running)
+    reference = np.empty(len(days))
+    reference[order] = running[group]
+    return reference
+
+
+class TrainingLoad:
+    """Charges d'entraînement quotidiennes, tenues à jour séance par séance
+
+    ``build`` traite tout l'historique en une passe vectorisée ;
+    ``add_session`` ajoute une séance plus récente que les autres sans
+    recalcul (une séance antérieure ou du même jour déclenche une
+    reconstruction à la lecture suivante). Les agrégats hebdomadaires et
+    l'ACWR sont recalculés à la demande depuis les tableaux quotidiens, en
+    quelques opérations sur des tableaux de la taille de l'historique en jours.
+
+    L'intensité d'une série est son poids rapporté au meilleur 1RM estimé
+    (Epley) de l'exercice à cette date, séries ratées comprises : les
+    répétitions faites ont été soulevées.
+    """
+
+    def __init__(self):
+        self._sessions: List[SessionRecord] = []
+        self._names: Dict[str, int] = {}
+        self._best = np.zeros(0)
+        self._first: Optional[int] = None
+        self._last: Optional[int] = None
+        self._tonnage = np.zeros(0)
+        self._inol = np.zeros(0)
+        self._zones = np.zeros((0, len(ZONE_LABELS)))
+        self._dirty = False
+
+    def build(self, sessions: Iterable[SessionRecord]):
+        self._sessions = list(sessions)
+        self._names, self._best = {}, np.zeros(0)
+        self._first = self._last = None
+        self._tonnage, self._inol = np.zeros(0), np.zeros(0)
+        self._zones = np.zeros((0, len(ZONE_LABELS)))
+        self._add(self._sessions)
+        self._dirty = False
+
+    def add_session(self, session: SessionRecord):
+        self._sessions.append(session)
+        if self._last is not None and session.date <= self._last:
+            self._dirty = True
+        elif not self._dirty:
+            self._add([session])
+
+    def _add(self, sessions: List[SessionRecord]):
+        days, exercises, weights, reps = _collect_sets(sessions, self._names)
+        if len(days) == 0:
+            return
+        if len(self._best) < len(self._names):
+            self._best = np.r_[self._best, np.zeros(len(self._names) - len(self._best))]
+        e1rm = np.where(reps == 1, weights, weights * (1 + reps / 30.0))
+        intensity = np.minimum(weights / _reference_1rm(days, exercises, e1rm, self._best), MAX_INTENSITY)
+        inol = reps / (100.0 * (1.0 - intensity))
+        zones = np.searchsorted(INTENSITY_ZONES, intensity * 100.0, side='right')
+
+        if self._first is None:
+            self._first = int(days.min())
+        length = int(days.max()) - self._first + 1
+        if length > len(self._tonnage):
+            grow = length - len(self._tonnage)
+            self._tonnage = np.r_[self._tonnage, np.zeros(grow)]
+            self._inol = np.r_[self._inol, np.zeros(grow)]
+            self._zones = np.vstack([self._zones, np.zeros((grow, len(ZONE_LABELS)))])
+        self._last = self._first + len(self._tonnage) - 1
+        offsets = days - self._first
+        self._tonnage[:length] += np.bincount(offsets, weights=weights * reps, minlength=length)
+        self._inol[:length] += np.bincount(offsets, weights=inol, minlength=length)
+        zone_reps = np.bincount(offsets * len(ZONE_LABELS) + zones, weights=reps,
+                                minlength=length * len(ZONE_LABELS))
+        self._zones[:length] += zone_reps.reshape(length, len(ZONE_LABELS))
+
+    def _refresh(self):
+        if self._dirty:
+            self.build(sorted(self._sessions, key=lambda s: s.date))
+
+    def daily(self, until: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Charges par jour, du premier jour d'entraînement à ``until`` (ordinal, défaut : dernier jour)"""
+        self._refresh()
+        if self._first is None:
+            empty = np.zeros(0)
+            return {'date': empty.astype('datetime64[D]'), 'tonnage': empty, 'inol': empty,
+                    'zones': np.zeros((0, len(ZONE_LABELS))), 'acwr': empty}
+        pad = max(0, (until or self._last) - self._last)
+        tonnage = np.r_[self._tonnage, np.zeros(pad)]
+        cumulative = np.r_[0.0, np.cumsum(tonnage)]
+        index = np.arange(len(tonnage))
+        acute = cumulative[index + 1] - cumulative[np.maximum(index + 1 - ACUTE_DAYS, 0)]
+        chronic = (cumulative[index + 1] - cumulative[np.maximum(index + 1 - CHRONIC_DAYS, 0)]) \
+            * ACUTE_DAYS / CHRONIC_DAYS
+        with np.errstate(divide='ignore', invalid='ignore'):
+            acwr = np.where((index >= CHRONIC_DAYS - 1) & (chronic > 0), acute / chronic, np.nan)
+        dates = (np.arange(self._first, self._first + len(tonnage)) - EPOCH_ORDINAL).astype('datetime64[D]')
+        return {'date': dates, 'tonnage': tonnage, 'inol': np.r_[self._inol, np.zeros(pad)],
+                'zones': np.vstack([self._zones, np.zeros((pad, len(ZONE_LABELS)))]), 'acwr': acwr}
+
+    def weekly(self, until: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Charges par semaine (lundi à dimanche, ``date`` : le lundi) ; ACWR du dernier jour de la semaine"""
+        daily = self.daily(until)
+        days = len(daily['date'])
+        if days == 0:
+            return daily
+        # Semaines complètes : jours vides avant le premier lundi et après le dernier jour
+        before = (self._first - 1) % 7  # ordinal 1 : un lundi
+        after = -(before + days) % 7
+
+        def weeks(values: np.ndarray, fill: float = 0.0) -> np.ndarray:
+            widths = ((before, after),) + ((0, 0),) * (values.ndim - 1)
+            return np.pad(values, widths, constant_values=fill).reshape((-1, 7) + values.shape[1:])
+
+        acwr = weeks(daily['acwr'], np.nan)
+        last_day = np.full(len(acwr), 6)
+        last_day[-1] = 6 - after
+        mondays = self._first - before + 7 * np.arange(len(acwr))
+        return {
+            'date': (mondays - EPOCH_ORDINAL).astype('datetime64[D]'),
+            'tonnage': weeks(daily['tonnage']).sum(axis=1),
+            'inol': weeks(daily['inol']).sum(axis=1),
+            'zones': weeks(daily['zones']).sum(axis=1),
+            'acwr': acwr[np.arange(len(acwr)), last_day],
+        }
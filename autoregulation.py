@@ -0,0 +1,187 @@
+"""Autorégulation des charges : poids de travail suggérés d'après les séances récentes.
+
+Pour chaque exercice, on garde les points (date, 1RM estimé réalisé, 1RM
+estimé prévu) des ``TREND_DAYS`` jours précédant sa dernière séance :
+
+- réalisé : plus lourde série (Epley) parmi celles dont les répétitions ont
+  été saisies, réussies ou non (une série échouée compte pour les
+  répétitions faites) ; sans séries détaillées, poids et reps prescrits si
+  l'exercice est réussi (un échec sans détail n'apprend rien : ignoré) ;
+- prévu : poids et reps prescrits par le programme.
+
+Une droite des moindres carrés est ajustée sur chacune des deux séries ; leur
+rapport, extrapolé à la date de la séance (au plus ``MAX_HORIZON`` jours après
+le dernier point), multiplie le poids du programme, dans les bornes
+``MIN_RATIO`` / ``MAX_RATIO``. Le programme garde sa périodisation, seule son
+échelle suit l'athlète. Le poids est ensuite arrondi aux disques disponibles.
+
+Les ajustements sont calculés à la première demande pour un exercice, et
+invalidés seulement quand une séance enregistrée le concerne.
+"""
+import bisect
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from model import TIME, ExerciseRecord, SessionRecord, parse_prescription
+
+TREND_DAYS = 42
+# Au-delà, l'historique est trop ancien : poids du programme
+STALE_DAYS = 28
+MAX_HORIZON = 14
+MIN_RATIO, MAX_RATIO = 0.85, 1.10
+# Échec sans répétitions saisies : baisse appliquée au poids de travail
+FAILURE_RATIO = 0.95
+
+DEFAULT_BAR = 20.0
+DEFAULT_PLATES = [25.0, 20.0, 15.0, 10.0, 5.0, 2.5, 1.25]
+PLATE_SIZES = [50.0, 25.0, 20.0, 15.0, 10.0, 5.0, 2.5, 2.0, 1.25, 1.0, 0.5, 0.25]
+
+# (ordinal de la date, 1RM estimé réalisé, 1RM estimé prévu)
+TrendPoint = Tuple[int, float, float]
+
+
+def _epley(weight: float, reps: int) -> float:
+    return weight if reps == 1 else weight * (1 + reps / 30.0)
+
+
+def plate_increment(plates: Sequence[float]) -> float:
+    """Plus petit écart de charge possible : une paire du plus petit diviseur commun des disques"""
+    step = 0
+    for plate in plates or DEFAULT_PLATES:
+        step = math.gcd(step, round(plate * 100))
+    return 2 * step / 100
+
+
+def round_to_plates(weight: float, bar: float = DEFAULT_BAR, plates: Sequence[float] = None,
+                    down: bool = False) -> float:
+    """Charge réalisable la plus proche (ou juste en dessous) : barre + paires de disques
+
+    Sous le poids de la barre (haltères, machines), le poids est arrondi au
+    même pas, sans barre.
+    """
+    step = plate_increment(plates)
+    base = bar if weight >= bar else 0.0
+    count = (weight - base) / step
+    count = math.floor(count + 1e-9) if down else math.floor(count + 0.5)
+    return round(base + max(count, 0) * step, 2)
+
+
+def _point(date: int, ex: ExerciseRecord) -> Optional[TrendPoint]:
+    prescription = ex.prescription
+    if prescription.kind == TIME or ex.weight <= 0 or prescription.rep_count <= 0:
+        return None
+    planned = _epley(ex.weight, prescription.rep_count)
+    performed = max((_epley(weight, reps) for weight, reps, _ in ex.iter_sets() if weight > 0 and reps > 0),
+                    default=0.0)
+    if performed <= 0:
+        if ex.status != 'completed':
+            return None
+        performed = planned
+    return date, performed, planned
+
+
+def _line(xs: List[int], ys: List[float]) -> Tuple[float, float]:
+    """Ordonnée à l'origine et pente de la droite des moindres carrés"""
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    if sxx == 0:
+        return mean_y, 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
+    return mean_y - slope * mean_x, slope
+
+
+@dataclass(frozen=True)
+class TrendFit:
+    """Tendances du 1RM estimé réalisé et prévu d'un exercice (x : jours depuis le dernier point)"""
+    last_date: int
+    points: int
+    performed: Tuple[float, float]
+    planned: Tuple[float, float]
+
+    @classmethod
+    def from_points(cls, points: List[TrendPoint]) -> "TrendFit":
+        last_date = points[-1][0]
+        xs = [date - last_date for date, _, _ in points]
+        return cls(last_date, len(points), _line(xs, [p[1] for p in points]), _line(xs, [p[2] for p in points]))
+
+    def e1rm(self, date: int) -> float:
+        """1RM estimé réalisé, extrapolé à ``date``"""
+        intercept, slope = self.performed
+        return intercept + slope * min(date - self.last_date, MAX_HORIZON)
+
+    def ratio(self, date: int) -> float:
+        """Rapport réalisé / prévu à ``date``, borné"""
+        intercept, slope = self.planned
+        planned = intercept + slope * min(date - self.last_date, MAX_HORIZON)
+        if planned <= 0:
+            return 1.0
+        return min(max(self.e1rm(date) / planned, MIN_RATIO), MAX_RATIO)
+
+
+class AutoRegulator:
+    """Exercice -> points récents et tendance, mis à jour séance par séance"""
+
+    def __init__(self):
+        self._points: Dict[str, List[TrendPoint]] = {}
+        self._fits: Dict[str, TrendFit] = {}
+
+    def build(self, sessions: Iterable[SessionRecord]):
+        self._points = {}
+        self._fits = {}
+        for session in sessions:
+            self.add_session(session)
+
+    def add_session(self, session: SessionRecord):
+        for ex in session.exercises:
+            point = _point(session.date, ex)
+            if point is None:
+                continue
+            points = self._points.setdefault(ex.name, [])
+            bisect.insort(points, point)
+            cutoff = points[-1][0] - TREND_DAYS
+            if points[0][0] < cutoff:
+                del points[:bisect.bisect_left(points, (cutoff,))]
+            self._fits.pop(ex.name, None)
+
+    def fit(self, exercise_name: str) -> Optional[TrendFit]:
+        fit = self._fits.get(exercise_name)
+        if fit is None:
+            points = self._points.get(exercise_name)
+            if not points:
+                return None
+            fit = self._fits[exercise_name] = TrendFit.from_points(points)
+        return fit
+
+    def suggest(self, exercise_name: str, reps: str, weight: float, date: int, bar: float = DEFAULT_BAR,
+                plates: Sequence[float] = None) -> Optional[float]:
+        """Poids de travail suggéré pour un exercice prescrit
+
+        None : exercice au temps ou au poids du corps, ou pas de séance
+        récente de cet exercice (on garde alors le poids du programme).
+        """
+        if weight <= 0 or parse_prescription(reps).kind == TIME:
+            return None
+        fit = self.fit(exercise_name)
+        if fit is None or date - fit.last_date > STALE_DAYS:
+            return None
+        return round_to_plates(weight * fit.ratio(date), bar, plates)
+
+
+def failure_weight(weight: float, reps: str, done: Iterable[Tuple[float, int]], bar: float = DEFAULT_BAR,
+                   plates: Sequence[float] = None) -> float:
+    """Poids des séries restantes après un échec
+
+    La série la plus faible de la séance (poids, répétitions faites) donne le
+    1RM estimé du jour, ramené aux répétitions prescrites ; sans répétitions
+    saisies, ``FAILURE_RATIO`` du poids. La baisse est d'au moins un pas de
+    disques et d'au plus ``1 - MIN_RATIO``.
+    """
+    target_reps = parse_prescription(reps).rep_count
+    e1rm = min((_epley(w, r) for w, r in done if w > 0 and r > 0), default=0.0)
+    if e1rm > 0 and target_reps > 0:
+        target = e1rm if target_reps == 1 else e1rm / (1 + target_reps / 30.0)
+    else:
+        target = weight * FAILURE_RATIO
+    target = min(max(target, weight * MIN_RATIO), weight - plate_increment(plates))
+    return max(round_to_plates(target, bar, plates, down=True), 0.0)
@@ -0,0 +1,208 @@
+"""Benchmarks des chemins critiques du tracker sur des historiques synthétiques.
+
+Pour chaque taille (années d'historique × nombre d'athlètes), génère les
+données avec ``generate_history.py`` puis mesure le temps médian et le pic
+mémoire (tracemalloc) de :
+
+- ``load_data`` à froid (stockage relu depuis le disque) et à chaud ;
+- ``all_sessions`` : première lecture de l'historique archivé ;
+- le chargement de tous les athlètes ;
+- ``save_data`` (changement de date de début) et ``append_session`` ;
+- ``get_exercise_progression`` (premier appel puis appels suivants) ;
+- ``get_next_workouts(7)`` ;
+- les calculs de la page Statistiques (DataFrames + figures, hors cache) ;
+- la charge d'entraînement (premier calcul, puis section complète avec figures).
+
+Le rapport JSON peut être comparé à un rapport précédent : le script sort en
+erreur si une opération ralentit au-delà de la tolérance.
+
+Usage : python benchmarks/bench_tracker.py [--years 1 5 10] [--athletes 1 10]
+        [--repeat 5] [--output rapport.json] [--compare ancien.json] [--tolerance 0.25]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from charts import (build_frequency_chart, build_progression_charts, build_set_estimates_chart,  # noqa: E402
+                    build_training_load_charts)
+from generate_history import write_history  # noqa: E402
+from storage import reset_shared_storages  # noqa: E402
+from tracker import PowerliftingTracker  # noqa: E402
+
+BENCH_EXERCISE = "Squat"
+
+
+def measure(fn: Callable, repeat: int, setup: Callable = None) -> Dict[str, float]:
+    """Temps médian (ms) puis pic mémoire (KiB) d'un appel, mesurés séparément"""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        times.append((time.perf_counter() - start) * 1000)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": statistics.median(times), "peak_kib": peak / 1024}
+
+
+def cold_tracker(athlete: str = "") -> PowerliftingTracker:
+    reset_shared_storages()
+    return PowerliftingTracker(athlete=athlete)
+
+
+def stats_page(tracker: PowerliftingTracker):
+    """Calculs de la page Statistiques, sans passer par le cache"""
+    overview = (tracker.aggregates.avg_duration, tracker.aggregates.success_rate)
+    progression = tracker.get_exercise_progression(BENCH_EXERCISE)
+    if progression:
+        build_progression_charts(progression, BENCH_EXERCISE)
+    build_set_estimates_chart(tracker.get_set_estimates(BENCH_EXERCISE), BENCH_EXERCISE)
+    build_frequency_chart(tracker.get_sessions_per_date())
+    return overview
+
+
+def load_section(tracker: PowerliftingTracker):
+    """Section « Charge d'entraînement » de la page Statistiques, sans passer par le cache"""
+    build_training_load_charts(tracker.get_weekly_load(), 52)
+
+
+def suggested_weights(tracker: PowerliftingTracker):
+    """Charges suggérées des aperçus de la page Accueil (séance du jour et prochaines séances)"""
+    return [tracker.suggest_weight(ex, workout['date'])
+            for workout in tracker.get_next_workouts(7) for ex in workout['exercises']]
+
+
+def archived_tracker() -> PowerliftingTracker:
+    tracker = cold_tracker()
+    tracker.all_sessions()
+    return tracker
+
+
+def bench_size(years: int, athletes: int, repeat: int) -> List[Dict]:
+    work_dir = tempfile.mkdtemp(prefix="powerlifting_bench_")
+    names = write_history(work_dir, years, athletes)
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        # L'historique généré n'a pas d'archive : le premier chargement la crée
+        archived = cold_tracker()
+        if hasattr(archived.storage, "journal"):
+            archived.storage.journal.wait_for_compaction()
+
+        results = {}
+        results["load_data (froid)"] = measure(lambda _: cold_tracker(), repeat)
+        shared = cold_tracker()
+        results["load_data (chaud)"] = measure(lambda _: PowerliftingTracker(), repeat)
+        if athletes > 1:
+            results[f"load_data ({athletes} athlètes)"] = measure(
+                lambda _: [PowerliftingTracker(athlete=name) for name in names],
+                max(1, repeat // 2), setup=reset_shared_storages)
+
+        results["all_sessions (archive, 1er appel)"] = measure(
+            lambda t: t.all_sessions(), repeat, setup=cold_tracker)
+        results["get_exercise_progression (1er appel)"] = measure(
+            lambda t: t.get_exercise_progression(BENCH_EXERCISE), repeat, setup=cold_tracker)
+        results["get_exercise_progression"] = measure(
+            lambda _: shared.get_exercise_progression(BENCH_EXERCISE), repeat)
+        results["get_next_workouts(7)"] = measure(lambda _: shared.get_next_workouts(7), repeat)
+        results["charges suggérées (1er appel)"] = measure(suggested_weights, repeat, setup=PowerliftingTracker)
+        results["charges suggérées"] = measure(lambda _: suggested_weights(shared), repeat)
+        results["page Statistiques"] = measure(lambda _: stats_page(shared), repeat)
+        results["get_weekly_load (1er appel)"] = measure(
+            lambda t: t.get_weekly_load(), repeat, setup=archived_tracker)
+        results["get_score_history"] = measure(lambda _: shared.get_score_history(), repeat)
+        results["section Charge d'entraînement"] = measure(lambda _: load_section(shared), repeat)
+
+        template = shared.sessions[-1]
+
+        def change_start_date(_):
+            shared.start_date -= datetime.timedelta(days=1)
+            shared.save_data()
+
+        results["save_data"] = measure(change_start_date, repeat)
+        results["append_session"] = measure(lambda _: shared.append_session(template), repeat)
+        if hasattr(shared.storage, "journal"):
+            shared.storage.journal.wait_for_compaction()
+    finally:
+        os.chdir(previous_dir)
+        reset_shared_storages()
+
+    sessions = shared.aggregates.total_sessions
+    return [dict(years=years, athletes=athletes, sessions=sessions, operation=op, **values)
+            for op, values in results.items()]
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = {(r["years"], r["athletes"], r["operation"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get((r["years"], r["athletes"], r["operation"]))
+        if old is None:
+            continue
+        # Écart absolu minimal pour ignorer le bruit des opérations très rapides
+        if r["median_ms"] > old["median_ms"] * (1 + tolerance) and r["median_ms"] - old["median_ms"] > 1.0:
+            regressions.append(f"{r['operation']} ({r['years']} ans, {r['athletes']} athlète(s)) : "
+                               f"{old['median_ms']:.1f}ms -> {r['median_ms']:.1f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--athletes", type=int, nargs="+", default=[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="fichier JSON du rapport")
+    parser.add_argument("--compare", help="rapport de référence")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="ralentissement toléré (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'ans':>4} {'athl.':>6} {'séances':>8}  {'opération':<40} {'médiane':>10} {'pic mém.':>12}")
+    for years in args.years:
+        for athletes in args.athletes:
+            for r in bench_size(years, athletes, args.repeat):
+                results.append(r)
+                print(f"{r['years']:>4} {r['athletes']:>6} {r['sessions']:>8}  {r['operation']:<40} "
+                      f"{r['median_ms']:>8.1f}ms {r['peak_kib']:>9.0f}KiB")
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print("✅ Pas de régression")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Générateur déterministe d'historiques d'entraînement synthétiques.
+
+Écrit des fichiers ``workout_data.json`` / ``user_profile.json`` réalistes
+(programme 8 semaines répété, progression par bloc, séances manquées,
+échecs, ``actual_sets`` complets, pesées hebdomadaires) pour 1 à 10 ans
+d'historique et 1 à 1000 athlètes. Une même graine produit toujours les
+mêmes fichiers.
+
+Le premier athlète utilise les fichiers par défaut du dossier, les suivants
+``athletes/athlete_XXXX/`` (voir ``storage.athlete_paths``).
+
+Usage : python benchmarks/generate_history.py OUT_DIR [--years 3] [--athletes 1] [--seed 42]
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from program import get_program  # noqa: E402
+
+END_DATE = datetime.date(2026, 1, 5)
+PROGRAM = get_program()
+PROGRAM_TABLE = PROGRAM.compile(PROGRAM.default_schedule)
+BLOCK_DAYS = 7 * PROGRAM.weeks
+
+
+def athlete_name(index: int) -> str:
+    return "" if index == 0 else f"athlete_{index:04d}"
+
+
+def _round_plate(weight: float) -> float:
+    return round(weight / 2.5) * 2.5
+
+
+def generate_athlete(rng: random.Random, years: int, end_date: datetime.date = END_DATE) -> Tuple[Dict, Dict]:
+    """Historique + profil d'un athlète"""
+    first_day = end_date - datetime.timedelta(days=365 * years)
+    strength = rng.uniform(0.7, 1.4)
+    body_weight = rng.uniform(60.0, 110.0)
+    sessions: List[Dict] = []
+    measurements: List[Dict] = []
+
+    day = first_day
+    while day < end_date:
+        block, day_in_block = divmod((day - first_day).days, BLOCK_DAYS)
+        week = day_in_block // 7 + 1
+        progress = strength * (1 + 0.015 * block) * rng.uniform(0.98, 1.02)
+
+        if day.weekday() == 6:
+            body_weight += rng.gauss(0, 0.4)
+            measurements.append({"date": str(day), "weight": round(body_weight, 1), "type": "weight"})
+
+        if day.weekday() in PROGRAM.default_schedule and rng.random() > 0.08:
+            workout_name, program = PROGRAM_TABLE[(day.weekday(), PROGRAM.phase_for_week(week))]
+            exercises = []
+            for prescribed in program:
+                weight = _round_plate(prescribed.weight * progress) if prescribed.weight > 0 else 0.0
+                # Prescriptions au temps ("45 sec") : une "répétition" tenue
+                target = prescribed.prescription.rep_count or 1
+                failed = rng.random() < 0.07
+                actual_sets = []
+                for j in range(prescribed.sets):
+                    missed = failed and j >= prescribed.sets - rng.randint(1, 2)
+                    reps = max(0, target - rng.randint(1, target)) if missed else target + rng.choice((0, 0, 0, 1))
+                    actual_sets.append({"reps": reps, "weight": weight, "completed": not missed})
+                exercises.append({
+                    "name": prescribed.name,
+                    "sets": prescribed.sets,
+                    "reps": prescribed.reps,
+                    "weight": weight,
+                    "notes": prescribed.notes,
+                    "completed_sets": 0,
+                    "failed_sets": 0,
+                    "status": "failed" if failed else "completed",
+                    "actual_sets": actual_sets,
+                })
+            sessions.append({
+                "date": str(day),
+                "workout_name": workout_name,
+                "week": week,
+                "exercises": exercises,
+                "completed": True,
+                "duration_minutes": rng.randint(50, 100),
+                "notes": "",
+            })
+        day += datetime.timedelta(days=1)
+
+    last_block_start = first_day + datetime.timedelta(days=((end_date - first_day).days // BLOCK_DAYS) * BLOCK_DAYS)
+    workout_data = {"start_date": str(last_block_start), "sessions": sessions}
+    profile = {
+        "name": f"Athlète {rng.randint(1000, 9999)}",
+        "age": rng.randint(18, 55),
+        "weight": round(body_weight, 1),
+        "height": rng.randint(160, 195),
+        "experience_years": rng.randint(0, 15),
+        "goals": {
+            "bench_1rm": _round_plate(100.0 * strength * 1.1),
+            "squat_1rm": _round_plate(120.0 * strength * 1.1),
+            "deadlift_1rm": _round_plate(140.0 * strength * 1.1),
+        },
+        "measurements": measurements,
+    }
+    return workout_data, profile
+
+
+def write_history(out_dir: str, years: int = 3, athletes: int = 1, seed: int = 42,
+                  end_date: datetime.date = END_DATE) -> List[str]:
+    """Écrit les fichiers de ``athletes`` athlètes ; renvoie leurs identifiants"""
+    if not 1 <= years <= 10 or not 1 <= athletes <= 1000:
+        raise ValueError("years doit être entre 1 et 10, athletes entre 1 et 1000")
+    names = []
+    for index in range(athletes):
+        name = athlete_name(index)
+        directory = os.path.join(out_dir, "athletes", name) if name else out_dir
+        os.makedirs(directory, exist_ok=True)
+        workout_data, profile = generate_athlete(random.Random(seed * 100003 + index), years, end_date)
+        with open(os.path.join(directory, "workout_data.json"), "w") as f:
+            json.dump(workout_data, f, separators=(",", ":"))
+        with open(os.path.join(directory, "user_profile.json"), "w") as f:
+            json.dump(profile, f, separators=(",", ":"))
+        names.append(name)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--athletes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    names = write_history(args.out_dir, args.years, args.athletes, args.seed)
+    print(f"✅ {len(names)} athlète(s), {args.years} an(s) d'historique dans {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
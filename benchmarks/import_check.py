@@ -0,0 +1,72 @@
+"""Test de non-régression de l'import CSV sur un export Strong.
+
+Importe dans un dossier temporaire un extrait d'export Strong (séparateur
+virgule, champs entre guillemets, date avec l'heure, durée ``1h 5m``) et
+vérifie les séances obtenues. Une ligne à la durée illisible doit être
+signalée dans le rapport sans interrompre l'import.
+
+Le script sort en erreur si l'import échoue ou si le résultat diffère.
+
+Usage : python benchmarks/import_check.py
+"""
+import io
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from importer import import_stream  # noqa: E402
+
+STRONG_SAMPLE = """\
+"Date","Workout Name","Duration","Exercise Name","Set Order","Weight","Reps","Distance","Seconds","Notes","Workout Notes","RPE"
+"2024-03-04 18:02:11","Lundi soir","1h 5m","Squat (Barbell)","1","100.0","5","0","0","","",""
+"2024-03-04 18:02:11","Lundi soir","1h 5m","Squat (Barbell)","2","110.0","3","0","0","genoux ok","",""
+"2024-03-04 18:02:11","Lundi soir","1h 5m","Bench Press (Barbell)","1","80.0","5","0","0","","","8"
+"2024-03-06 07:45:00","Matin","45m","Deadlift (Barbell)","1","140.0","3","0","0","","",""
+"2024-03-06 07:45:00","Matin","45m","Deadlift (Barbell)","2","150.0","1","0","0","","",""
+"2024-03-08 12:00:00","Midi","une heure","Squat (Barbell)","1","100.0","5","0","0","","",""
+"""
+
+
+def main():
+    os.chdir(tempfile.mkdtemp())
+    from tracker import PowerliftingTracker
+
+    tracker = PowerliftingTracker()
+    report = import_stream(tracker, io.BytesIO(STRONG_SAMPLE.encode()), "csv")
+    if hasattr(tracker.storage, "journal"):
+        tracker.storage.journal.wait_for_compaction()
+
+    failures = []
+    sessions = {session.iso_date: session for session in tracker.all_sessions()}
+    expected = {
+        "2024-03-04": (65, "genoux ok", {"Squat": 2, "Bench Press": 1}),
+        "2024-03-06": (45, "", {"Deadlift": 2}),
+    }
+    if report.imported != len(expected) or sorted(sessions) != sorted(expected):
+        failures.append(f"séances importées : {sorted(sessions)} (rapport : {report.imported})")
+    for date, (duration, notes, exercises) in expected.items():
+        session = sessions.get(date)
+        if session is None:
+            continue
+        if session.duration_minutes != duration:
+            failures.append(f"{date} : durée {session.duration_minutes} au lieu de {duration}")
+        if session.notes != notes:
+            failures.append(f"{date} : notes {session.notes!r} au lieu de {notes!r}")
+        found = {ex.name: ex.set_count for ex in session.exercises}
+        if found != exercises:
+            failures.append(f"{date} : exercices {found} au lieu de {exercises}")
+    if report.skipped != 1 or not report.errors or not report.errors[0].startswith("ligne 7 : durée illisible"):
+        failures.append(f"ligne à la durée illisible mal signalée : {report.errors}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ Import Strong : {report.imported} séances, {report.skipped} ligne ignorée ({report.errors[0]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Mémoire occupée par l'historique : dicts JSON contre enregistrements compacts.
+
+Génère un historique synthétique avec ``generate_history.py`` puis mesure
+(tracemalloc) la mémoire restant allouée après chargement :
+
+- des séances au format JSON (dicts imbriqués, représentation d'avant
+  ``model.py``) ;
+- des mêmes séances en ``SessionRecord`` ;
+- de l'index de progression du tracker construit sur ces enregistrements.
+
+Les résultats sont rapportés à 10 000 séries réalisées.
+
+Usage : python benchmarks/memory_model.py [--years 1 10]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_history import write_history  # noqa: E402
+from model import sessions_from_dicts  # noqa: E402
+from tracker import ProgressionIndex  # noqa: E402
+
+
+def retained(build):
+    """Résultat de ``build()`` et octets encore alloués une fois les temporaires libérés"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def build_index(records) -> ProgressionIndex:
+    index = ProgressionIndex()
+    index.build(records)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10])
+    args = parser.parse_args()
+
+    print(f"{'ans':>4} {'séries':>8}  {'représentation':<28} {'par 10k séries':>15}")
+    for years in args.years:
+        work_dir = tempfile.mkdtemp(prefix="powerlifting_memory_")
+        write_history(work_dir, years, 1)
+        with open(os.path.join(work_dir, "workout_data.json")) as f:
+            text = f.read()
+
+        dicts, dict_bytes = retained(lambda: json.loads(text)['sessions'])
+        records, record_bytes = retained(lambda: sessions_from_dicts(json.loads(text)['sessions']))
+        _, index_bytes = retained(lambda: build_index(records))
+        sets = sum(ex.set_count for session in records for ex in session.exercises)
+        del dicts
+
+        for label, size in (("dicts JSON", dict_bytes), ("SessionRecord", record_bytes),
+                            ("index de progression", index_bytes)):
+            print(f"{years:>4} {sets:>8}  {label:<28} {size / sets * 10000 / 1024:>11.0f}KiB")
+
+
+if __name__ == "__main__":
+    main()
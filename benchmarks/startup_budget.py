@@ -0,0 +1,95 @@
+"""Budget de démarrage des pages légères (Accueil, Entraînement).
+
+Pour chaque page, lance un interpréteur neuf, rend la page avec
+``streamlit.testing`` et mesure :
+
+- le temps du premier rendu (démarrage à froid, imports compris) ;
+- les modules lourds chargés (pandas, numpy, plotly.express) ;
+- les imports les plus coûteux (``python -X importtime``).
+
+Le script sort en erreur si une page légère charge un module lourd ou
+dépasse le budget : il sert de test de non-régression.
+
+Usage : python benchmarks/startup_budget.py [--budget-ms 1000] [--top 10]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "powerlifting_pro_multipage.py")
+LIGHT_PAGES = ["🏠 Accueil", "🏋️ Entraînement"]
+HEAVY_MODULES = ["pandas", "numpy", "plotly.express"]
+
+CHILD = """
+import json, os, sys, tempfile, time
+os.chdir(tempfile.mkdtemp())
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+at.session_state["current_page"] = {page!r}
+start = time.perf_counter()
+at.run()
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    "first_run_ms": elapsed,
+    "errors": [str(e.value) for e in at.exception],
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(stderr: str, top: int):
+    """Imports de premier niveau les plus coûteux (temps cumulé)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):
+            continue  # import imbriqué, déjà compté dans son parent
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def measure(page: str, top: int):
+    child = CHILD.format(app=APP, page=page, heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", child],
+                          capture_output=True, text=True, env=env)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["page"] = page
+    result["top_imports"] = parse_importtime(proc.stderr, top)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=1000.0,
+                        help="temps maximal du premier rendu d'une page légère")
+    parser.add_argument("--top", type=int, default=10, help="nombre d'imports affichés")
+    args = parser.parse_args()
+
+    failures = []
+    for page in LIGHT_PAGES:
+        result = measure(page, args.top)
+        print(f"{page}: premier rendu {result['first_run_ms']:.0f}ms (budget {args.budget_ms:.0f}ms)")
+        for cumulative_us, name in result["top_imports"]:
+            print(f"    {cumulative_us / 1000:8.1f}ms  {name}")
+        if result["errors"]:
+            failures.append(f"{page}: erreurs {result['errors']}")
+        if result["heavy_modules"]:
+            failures.append(f"{page}: modules lourds chargés {result['heavy_modules']}")
+        if result["first_run_ms"] > args.budget_ms:
+            failures.append(f"{page}: {result['first_run_ms']:.0f}ms > {args.budget_ms:.0f}ms")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Budget de démarrage respecté")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Préparation des DataFrames et figures des pages Statistiques et Profil.
+
+pandas et plotly ne sont importés que par les pages qui affichent des
+graphiques : Accueil et Entraînement démarrent sans eux.
+
+Les courbes sont réduites à ``MAX_POINTS`` points par série (LTTB) avant
+d'être envoyées au navigateur, et passent en WebGL (``scattergl``) au-delà de
+``WEBGL_THRESHOLD`` points par figure. Pour le détail d'une période, la page
+refiltre les données complètes sur l'intervalle choisi puis reconstruit la
+figure.
+
+Les pages gardent les figures dans ``tracker.cached`` telles quelles (objets
+``Figure``) plutôt que leur JSON : ``st.plotly_chart`` revalide tout dict ou
+spec reçu en ``Figure`` avant de le sérialiser, environ 10 fois plus cher que
+la resérialisation d'une ``Figure`` déjà validée (20 ms contre 2 ms par
+graphique sur 10 ans d'historique).
+"""
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Points conservés par série après réduction
+MAX_POINTS = 400
+# Nombre total de points d'une figure au-delà duquel on trace en WebGL
+WEBGL_THRESHOLD = 1000
+
+
+def downsample(df: "pd.DataFrame", y: str, max_points: int = MAX_POINTS) -> "pd.DataFrame":
+    """Réduit ``df`` (trié par date) à ``max_points`` lignes avec LTTB sur ``y``"""
+    from analytics import lttb
+
+    if len(df) <= max_points:
+        return df
+    keep = lttb(df['date'].to_numpy(dtype='datetime64[ns]').astype('int64'), df[y].to_numpy(), max_points)
+    return df.iloc[keep]
+
+
+def render_mode(points: int) -> str:
+    return 'webgl' if points > WEBGL_THRESHOLD else 'svg'
+
+
+def build_progression_charts(progression_data: List[Dict], exercise_name: str):
+    import pandas as pd
+    import plotly.express as px
+
+    df = pd.DataFrame(progression_data)
+    df['date'] = pd.to_datetime(df['date'])
+
+    # Graphique de progression du poids
+    df_weight = downsample(df, 'weight')
+    fig_weight = px.line(df_weight, x='date', y='weight',
+                         title=f'Progression du poids - {exercise_name}',
+                         labels={'weight': 'Poids (kg)', 'date': 'Date'},
+                         render_mode=render_mode(len(df_weight)))
+    fig_weight.update_traces(line_color='#ff6b6b', line_width=3)
+
+    # Graphique du 1RM estimé
+    df_1rm = downsample(df, 'estimated_1rm')
+    fig_1rm = px.line(df_1rm, x='date', y='estimated_1rm',
+                      title=f'1RM estimé - {exercise_name}',
+                      labels={'estimated_1rm': '1RM estimé (kg)', 'date': 'Date'},
+                      render_mode=render_mode(len(df_1rm)))
+    fig_1rm.update_traces(line_color='#3498db', line_width=3)
+    return fig_weight, fig_1rm
+
+def build_set_estimates_chart(set_estimates: Dict[str, "np.ndarray"], exercise_name: str):
+    """1RM estimé série par série, selon plusieurs formules (meilleure série du jour)"""
+    import pandas as pd
+    import plotly.express as px
+    from analytics import FORMULAS
+
+    if len(set_estimates['date']) == 0 or set_estimates['weight'].max() <= 0:
+        return None
+    df_sets = pd.DataFrame(set_estimates).groupby('date')[list(FORMULAS)].max().reset_index()
+    df_sets = df_sets.melt(id_vars='date', var_name='formule', value_name='e1rm')
+    df_sets = pd.concat([downsample(group, 'e1rm') for _, group in df_sets.groupby('formule', sort=False)])
+    return px.line(df_sets, x='date', y='e1rm', color='formule',
+                   title=f'1RM estimé par série - {exercise_name}',
+                   labels={'e1rm': '1RM estimé (kg)', 'date': 'Date', 'formule': 'Formule'},
+                   render_mode=render_mode(len(df_sets)))
+
+def build_frequency_chart(sessions_per_date: List[Tuple[str, int]]):
+    import pandas as pd
+    import plotly.express as px
+
+    # Graphique de fréquence (déjà agrégé par date par le stockage)
+    df_sessions = pd.DataFrame(sessions_per_date, columns=['date', 'count'])
+    df_sessions['date'] = pd.to_datetime(df_sessions['date'])
+
+    fig_freq = px.bar(df_sessions, x='date', y='count',
+                      title='Fréquence des entraînements',
+                      labels={'count': 'Nombre de séances', 'date': 'Date'})
+    fig_freq.update_traces(marker_color='#28a745')
+    return fig_freq
+
+def build_body_weight_chart(measurements: List[Dict]):
+    import pandas as pd
+    import plotly.express as px
+
+    weight_data = [m for m in measurements if m.get('type') == 'weight']
+    if not weight_data:
+        return None
+    df_weight = pd.DataFrame(weight_data)
+    df_weight['date'] = pd.to_datetime(df_weight['date'])
+    df_weight = downsample(df_weight.sort_values('date', kind='stable'), 'weight')
+
+    fig_weight_evolution = px.line(df_weight, x='date', y='weight',
+                                   title='Évolution du poids corporel',
+                                   labels={'weight': 'Poids (kg)', 'date': 'Date'},
+                                   render_mode=render_mode(len(df_weight)))
+    fig_weight_evolution.update_traces(line_color='#28a745', line_width=3)
+    return fig_weight_evolution
+
+def build_training_load_charts(weekly: Dict[str, "np.ndarray"], weeks: int = None):
+    """Tonnage et INOL, zones d'intensité et ACWR par semaine (les ``weeks`` dernières si précisé)"""
+    import plotly.graph_objects as go
+    from analytics import ZONE_LABELS
+
+    window = slice(-weeks, None) if weeks else slice(None)
+    dates = weekly['date'][window]
+
+    fig_load = go.Figure()
+    fig_load.add_bar(x=dates, y=weekly['tonnage'][window], name='Tonnage (kg)', marker_color='#ff6b6b')
+    fig_load.add_scatter(x=dates, y=weekly['inol'][window], name='INOL', yaxis='y2', mode='lines',
+                         line=dict(color='#2c3e50', width=2))
+    fig_load.update_layout(title='Tonnage et INOL par semaine', xaxis_title='Semaine',
+                           yaxis=dict(title='Tonnage (kg)'),
+                           yaxis2=dict(title='INOL', overlaying='y', side='right', showgrid=False),
+                           legend=dict(orientation='h'))
+
+    fig_zones = go.Figure()
+    colors = ('#a8e6cf', '#dcedc1', '#ffd3b6', '#ffaaa5', '#ff8b94')
+    for zone, (label, color) in enumerate(zip(ZONE_LABELS, colors)):
+        fig_zones.add_bar(x=dates, y=weekly['zones'][window, zone], name=label, marker_color=color)
+    fig_zones.update_layout(title="Répétitions par zone d'intensité (% du 1RM estimé)", barmode='stack',
+                            xaxis_title='Semaine', yaxis_title='Répétitions', legend=dict(orientation='h'))
+
+    fig_acwr = go.Figure()
+    fig_acwr.add_hrect(y0=0.8, y1=1.3, fillcolor='#28a745', opacity=0.12, line_width=0)
+    fig_acwr.add_scatter(x=dates, y=weekly['acwr'][window], name='ACWR', mode='lines',
+                         line=dict(color='#3498db', width=3))
+    fig_acwr.update_layout(title='Ratio charge aiguë / chronique (7 j / 28 j)', xaxis_title='Semaine',
+                           yaxis_title='ACWR')
+    return fig_load, fig_zones, fig_acwr
+
+def build_score_chart(history: Dict[str, "np.ndarray"]):
+    """Scores DOTS, Wilks 2020 et IPF GL du total estimé, au fil des séances"""
+    import pandas as pd
+    import plotly.express as px
+    from scoring import SCORE_LABELS
+
+    if len(history['date']) == 0:
+        return None
+    df_scores = pd.DataFrame({label: history[name] for name, label in SCORE_LABELS.items()})
+    df_scores['date'] = history['date']
+    df_scores = df_scores.melt(id_vars='date', var_name='score', value_name='points')
+    df_scores = pd.concat([downsample(group, 'points') for _, group in df_scores.groupby('score', sort=False)])
+    return px.line(df_scores, x='date', y='points', color='score',
+                   title='Scores du total estimé (pesée la plus proche)',
+                   labels={'points': 'Points', 'date': 'Date', 'score': 'Score'},
+                   render_mode=render_mode(len(df_scores)))
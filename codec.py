@@ -0,0 +1,220 @@
+"""Encodage des fichiers de données : JSON et snapshot binaire, schéma versionné.
+
+JSON : ``orjson`` est utilisé s'il est installé (lecture et écriture plusieurs
+fois plus rapides), sinon le module ``json`` standard. Les deux produisent le
+même JSON compact.
+
+Snapshot : ``POWERLIFTING_SNAPSHOT_FORMAT`` choisit le format écrit,
+``binary`` (par défaut) ou ``json``. Le format est reconnu à la lecture (en-tête
+``MAGIC``) : on peut changer de format à tout moment, le snapshot est réécrit
+dans le nouveau format à la prochaine compaction. Le snapshot binaire a son
+propre fichier (``workout_data.snap``, voir ``storage.py``) : le fichier JSON
+n'est jamais réécrit en binaire. Le JSON lisible reste disponible à l'export
+(``exporter.py``).
+
+Versions du schéma (``SCHEMA_VERSION``) :
+
+- 1 : ``start_date``, ``sessions`` puis ``journal_seq`` et ``archive``, sans
+  clé ``schema`` (archive toujours en JSON lines) ;
+- 2 : clé ``schema``, format de l'archive dans ``archive.format``, snapshot
+  binaire possible.
+
+Un fichier d'une version antérieure est migré à la lecture (``MIGRATIONS``,
+une fonction par version) ; un fichier d'une version plus récente est refusé
+plutôt que réécrit avec des données perdues.
+
+Snapshot binaire :
+
+    MAGIC | version (uint16) | taille des métadonnées (uint32)
+    | métadonnées JSON (start_date, journal_seq, archive) | bloc de séances
+
+Bloc de séances (l'archive binaire est une suite de blocs, un par compaction) :
+
+    taille (uint32) | nombre de chaînes (uint32) | chaînes (uint32 + UTF-8)
+    | nombre de séances (uint32) | séances
+
+    séance   : date (ordinal), séance, semaine, réussie, durée, notes,
+               nombre d'exercices (``_SESSION``)
+    exercice : nom, séries, reps, poids, notes, séries réussies / échouées,
+               statut, taille des séries (``_EXERCISE``), puis les séries
+               telles qu'elles sont en mémoire (``model.SET_STRUCT``)
+
+Les chaînes (noms, prescriptions, statuts, notes) sont dédoublonnées dans la
+table du bloc et désignées par leur indice : chaque nom n'est décodé qu'une
+fois par bloc.
+"""
+import json
+import os
+import struct
+import sys
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # repli sur le module json standard
+    orjson = None
+
+from model import ExerciseRecord, SessionRecord, session_from_dict, session_to_dict
+
+SCHEMA_VERSION = 2
+FORMATS = ("binary", "json")
+SNAPSHOT_FORMAT = os.environ.get("POWERLIFTING_SNAPSHOT_FORMAT", "binary")
+if SNAPSHOT_FORMAT not in FORMATS:
+    raise ValueError(f"POWERLIFTING_SNAPSHOT_FORMAT doit valoir {' ou '.join(FORMATS)}")
+
+MAGIC = b"PLTSNAP\x00"
+_HEADER = struct.Struct("<8sHI")
+_U32 = struct.Struct("<I")
+_SESSION = struct.Struct("<iIi?iIH")
+_EXERCISE = struct.Struct("<IiIdIiiII")
+
+
+def json_loads(data: Union[str, bytes]):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(data) -> bytes:
+    """JSON compact, en UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+# Migrations : version n -> n + 1, appliquées aux métadonnées du snapshot
+
+def _migrate_v1(meta: Dict) -> Dict:
+    meta.setdefault('journal_seq', 0)
+    if meta.get('archive'):
+        meta['archive'].setdefault('format', 'json')
+    return meta
+
+
+MIGRATIONS: Dict[int, Callable[[Dict], Dict]] = {1: _migrate_v1}
+
+
+def migrate(meta: Dict) -> Dict:
+    version = meta.get('schema', 1)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Fichier de données au schéma {version}, plus récent que celui de "
+                         f"l'application ({SCHEMA_VERSION}) : mettez l'application à jour")
+    while version < SCHEMA_VERSION:
+        meta = MIGRATIONS[version](meta)
+        version += 1
+    meta['schema'] = version
+    return meta
+
+
+# Blocs de séances
+
+def encode_block(sessions: Iterable[SessionRecord]) -> bytes:
+    strings: Dict[str, int] = {}
+
+    def index(value: str) -> int:
+        position = strings.get(value)
+        if position is None:
+            position = strings[value] = len(strings)
+        return position
+
+    body, count = [], 0
+    for session in sessions:
+        count += 1
+        body.append(_SESSION.pack(session.date, index(session.workout_name), session.week, session.completed,
+                                  session.duration_minutes, index(session.notes), len(session.exercises)))
+        for ex in session.exercises:
+            body.append(_EXERCISE.pack(index(ex.name), ex.sets, index(ex.reps), ex.weight, index(ex.notes),
+                                       ex.completed_sets, ex.failed_sets, index(ex.status),
+                                       len(ex.packed_sets)))
+            body.append(ex.packed_sets)
+    table = [_U32.pack(len(strings))]
+    for value in strings:
+        raw = value.encode('utf-8')
+        table.append(_U32.pack(len(raw)))
+        table.append(raw)
+    payload = b"".join(table) + _U32.pack(count) + b"".join(body)
+    return _U32.pack(len(payload)) + payload
+
+
+def decode_blocks(data: bytes, offset: int = 0) -> List[SessionRecord]:
+    """Séances de tous les blocs de ``data`` à partir de ``offset``"""
+    unpack_u32, unpack_session, unpack_exercise = _U32.unpack_from, _SESSION.unpack_from, _EXERCISE.unpack_from
+    session_size, exercise_size = _SESSION.size, _EXERCISE.size
+    sessions = []
+    while offset < len(data):
+        (size,) = unpack_u32(data, offset)
+        offset += 4
+        end = offset + size
+        (count,) = unpack_u32(data, offset)
+        offset += 4
+        strings = []
+        for _ in range(count):
+            (length,) = unpack_u32(data, offset)
+            offset += 4
+            strings.append(sys.intern(data[offset:offset + length].decode('utf-8')))
+            offset += length
+        (count,) = unpack_u32(data, offset)
+        offset += 4
+        for _ in range(count):
+            date, workout, week, completed, duration, notes, exercise_count = unpack_session(data, offset)
+            offset += session_size
+            exercises = []
+            for _ in range(exercise_count):
+                name, sets, reps, weight, ex_notes, done, failed, status, sets_size = unpack_exercise(data, offset)
+                offset += exercise_size
+                exercises.append(ExerciseRecord(strings[name], sets, strings[reps], weight, strings[ex_notes],
+                                                done, failed, strings[status], data[offset:offset + sets_size]))
+                offset += sets_size
+            sessions.append(SessionRecord(date, strings[workout], week, tuple(exercises), completed, duration,
+                                          strings[notes]))
+        if offset != end:
+            raise ValueError("Bloc de séances corrompu")
+    return sessions
+
+
+# Snapshot
+
+def encode_sessions(sessions: List[SessionRecord], fmt: str) -> bytes:
+    """Partie séances du snapshot (le coût principal, calculable hors verrou)"""
+    if fmt == "binary":
+        return encode_block(sessions)
+    return json_dumps([session_to_dict(session) for session in sessions])
+
+
+def encode_snapshot(meta: Dict, sessions_payload: bytes, fmt: str) -> bytes:
+    """Snapshot complet : métadonnées + séances déjà encodées par ``encode_sessions``"""
+    raw_meta = json_dumps(dict(meta, schema=SCHEMA_VERSION))
+    if fmt == "binary":
+        return _HEADER.pack(MAGIC, SCHEMA_VERSION, len(raw_meta)) + raw_meta + sessions_payload
+    return raw_meta[:-1] + b',"sessions":' + sessions_payload + b'}'
+
+
+def snapshot_format(data: bytes) -> str:
+    return "binary" if data.startswith(MAGIC) else "json"
+
+
+def decode_snapshot(data: bytes) -> Tuple[Dict, List[SessionRecord]]:
+    """Métadonnées (migrées) et séances d'un snapshot, quel que soit son format"""
+    if snapshot_format(data) == "binary":
+        _, version, meta_size = _HEADER.unpack_from(data)
+        meta = json_loads(data[_HEADER.size:_HEADER.size + meta_size])
+        meta['schema'] = version
+        sessions = decode_blocks(data, _HEADER.size + meta_size)
+    else:
+        meta = json_loads(data)
+        sessions = [session_from_dict(session) for session in meta.pop('sessions', [])]
+    return migrate(meta), sessions
+
+
+# Archive : JSON lines ou suite de blocs, selon ``archive.format`` du snapshot
+
+def encode_archive(sessions: List[SessionRecord], fmt: str) -> bytes:
+    if fmt == "binary":
+        return encode_block(sessions)
+    return b"".join(json_dumps(session_to_dict(session)) + b"\n" for session in sessions)
+
+
+def decode_archive(data: bytes, fmt: str) -> List[SessionRecord]:
+    if fmt == "binary":
+        return decode_blocks(data)
+    return [session_from_dict(json_loads(line)) for line in data.splitlines()]
@@ -0,0 +1,161 @@
+"""Export en flux de l'historique (CSV, JSON lines, JSON lisible ou Parquet).
+
+Les séances sont parcourues une à une et encodées par morceaux directement
+dans le tampon renvoyé (``io.BytesIO``, que ``st.download_button`` accepte
+tel quel) : pas de chaîne intermédiaire contenant tout l'export. Les filtres
+(intervalle de dates, exercices) sont appliqués pendant le parcours.
+
+- CSV : une ligne par série, colonnes relues telles quelles par ``importer.py`` ;
+- JSON lines : une séance par ligne, au format JSON de ``workout_data.json`` ;
+- JSON lisible : les mêmes séances en un tableau indenté, à relire ou
+  comparer à la main (le stockage, lui, est binaire par défaut) ;
+- Parquet : mêmes lignes que le CSV, par groupes de ``CHUNK_ROWS`` lignes
+  (nécessite pyarrow).
+"""
+import csv
+import datetime
+import importlib.util
+import io
+import json
+from dataclasses import replace
+from typing import BinaryIO, Collection, Dict, Iterable, Iterator, List, Optional
+
+from model import SessionRecord, session_to_dict
+
+# Lignes écrites par morceau
+CHUNK_ROWS = 5000
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "json": ("application/json", "json"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+CSV_FIELDS = ["date", "workout", "week", "exercise", "set", "weight", "reps", "completed", "status",
+              "duration", "notes"]
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def filter_sessions(sessions: Iterable[SessionRecord], start: Optional[datetime.date] = None,
+                    end: Optional[datetime.date] = None,
+                    exercises: Optional[Collection[str]] = None) -> Iterator[SessionRecord]:
+    """Séances de [start, end], réduites aux exercices demandés (les séances vides sont omises)"""
+    first = start.toordinal() if start else None
+    last = end.toordinal() if end else None
+    for session in sessions:
+        if (first and session.date < first) or (last and session.date > last):
+            continue
+        if exercises:
+            kept = tuple(ex for ex in session.exercises if ex.name in exercises)
+            if not kept:
+                continue
+            session = replace(session, exercises=kept)
+        yield session
+
+
+def iter_set_rows(sessions: Iterable[SessionRecord]) -> Iterator[Dict]:
+    """Une ligne par série réalisée (ou par exercice si les séries n'ont pas été détaillées)"""
+    for session in sessions:
+        base = {
+            'date': session.iso_date,
+            'workout': session.workout_name,
+            'week': session.week,
+            'duration': session.duration_minutes,
+            'notes': session.notes,
+        }
+        for ex in session.exercises:
+            if not ex.packed_sets:
+                yield dict(base, exercise=ex.name, set=None, weight=ex.weight, reps=ex.prescription.rep_count,
+                           completed=ex.status == 'completed', status=ex.status)
+                continue
+            for number, (weight, reps, completed) in enumerate(ex.iter_sets(), start=1):
+                yield dict(base, exercise=ex.name, set=number, weight=weight, reps=reps, completed=completed,
+                           status=ex.status)
+
+
+def _chunks(rows: Iterator[Dict], size: int = CHUNK_ROWS) -> Iterator[List[Dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_csv(sessions: Iterable[SessionRecord], out: BinaryIO):
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(CSV_FIELDS)
+    for chunk in _chunks(iter_set_rows(sessions)):
+        writer.writerows([row[name] for name in CSV_FIELDS] for row in chunk)
+    text.flush()
+    text.detach()  # le fichier reste ouvert pour l'appelant
+
+
+def write_jsonl(sessions: Iterable[SessionRecord], out: BinaryIO):
+    lines = []
+    for session in sessions:
+        lines.append(json.dumps(session_to_dict(session), separators=(',', ':'), ensure_ascii=False) + "\n")
+        if len(lines) >= CHUNK_ROWS:
+            out.write("".join(lines).encode('utf-8'))
+            lines = []
+    out.write("".join(lines).encode('utf-8'))
+
+
+def write_json(sessions: Iterable[SessionRecord], out: BinaryIO):
+    out.write(b"[")
+    for index, session in enumerate(sessions):
+        text = json.dumps(session_to_dict(session), indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        out.write((b",\n  " if index else b"\n  ") + text.encode('utf-8'))
+    out.write(b"\n]\n")
+
+
+def write_parquet(sessions: Iterable[SessionRecord], out: BinaryIO):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("date", pa.string()), ("workout", pa.string()), ("week", pa.int32()), ("exercise", pa.string()),
+        ("set", pa.int32()), ("weight", pa.float64()), ("reps", pa.int32()), ("completed", pa.bool_()),
+        ("status", pa.string()), ("duration", pa.int32()), ("notes", pa.string()),
+    ])
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for chunk in _chunks(iter_set_rows(sessions)):
+            columns = {name: [row[name] for row in chunk] for name in schema.names}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "json": write_json, "parquet": write_parquet}
+
+
+def export_file(sessions: Iterable[SessionRecord], fmt: str) -> io.BytesIO:
+    """Écrit l'export dans un tampon, rembobiné, prêt à être lu"""
+    if fmt not in WRITERS:
+        raise ValueError(f"format inconnu : {fmt}")
+    out = io.BytesIO()
+    WRITERS[fmt](sessions, out)
+    out.seek(0)
+    return out
+
+
+def export_sessions(sessions: Iterable[SessionRecord], fmt: str, start: Optional[datetime.date] = None,
+                    end: Optional[datetime.date] = None,
+                    exercises: Optional[Collection[str]] = None) -> io.BytesIO:
+    return export_file(filter_sessions(sessions, start, end, exercises), fmt)
+
+
+def export_backup(profile: Dict, start_date: str, sessions: Iterable[SessionRecord]) -> io.BytesIO:
+    """Sauvegarde complète (profil + historique) en JSON compact, écrite séance par séance"""
+    out = io.BytesIO()
+    out.write(b'{"profile":' + json.dumps(profile, separators=(',', ':')).encode('utf-8'))
+    out.write(b',"workout_data":{"start_date":' + json.dumps(start_date).encode('utf-8') + b',"sessions":[')
+    for index, session in enumerate(sessions):
+        out.write((b',' if index else b'') + json.dumps(session_to_dict(session), separators=(',', ':')).encode('utf-8'))
+    out.write(b']},"export_date":' + json.dumps(str(datetime.date.today())).encode('utf-8') + b'}')
+    out.seek(0)
+    return out
@@ -0,0 +1,383 @@
+"""Import en flux d'historiques d'entraînement (CSV ou JSON lines).
+
+Formats acceptés :
+
+- CSV avec une ligne par série (export de tableur, Strong, ...). Colonnes
+  reconnues (en-têtes français ou anglais) : date, exercice, poids, reps et,
+  en option, séance, réussie, durée (minutes, ``1h 5m`` comme Strong ou
+  ``1:05``), notes. Les lignes consécutives d'une même date (et séance)
+  forment une séance.
+- JSON lines : une séance par ligne, au format de ``workout_data.json``.
+
+Le fichier est lu ligne à ligne et les séances sont écrites par lots de
+``BATCH_SIZE`` (une écriture disque par lot) : la mémoire utilisée par
+l'import ne dépend pas de la taille du fichier. Les noms d'exercices sont
+ramenés aux noms connus (programmes, historique, synonymes courants) et les
+séances déjà présentes (même date, mêmes exercices) sont ignorées.
+
+Usage : python importer.py FICHIER [--athlete nom] [--format csv|jsonl]
+"""
+import argparse
+import csv
+import datetime
+import functools
+import io
+import os
+import re
+import struct
+import sys
+import unicodedata
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import codec
+from model import SET_STRUCT, ExerciseRecord, SessionRecord, session_from_dict, to_ordinal
+from program import LIBRARY, ProgramError
+
+if TYPE_CHECKING:
+    from tracker import PowerliftingTracker
+
+BATCH_SIZE = 500
+# Nombre de messages d'erreur conservés dans le rapport
+MAX_ERRORS = 20
+
+# En-têtes CSV reconnus pour chaque champ (comparés sans accents ni casse)
+CSV_COLUMNS = {
+    'date': ("date", "jour", "day"),
+    'exercise': ("exercise", "exercise name", "exercice", "mouvement"),
+    'weight': ("weight", "poids", "weight (kg)", "poids (kg)", "kg", "charge"),
+    'reps': ("reps", "répétitions", "rep"),
+    'workout': ("workout", "workout name", "séance", "session"),
+    'completed': ("completed", "réussie", "success"),
+    'duration': ("duration", "durée", "duration (min)", "duration_minutes"),
+    'notes': ("notes", "note", "commentaire"),
+}
+
+# Synonymes fréquents -> nom utilisé par l'application
+EXERCISE_ALIASES = {
+    "bench": "Bench Press",
+    "bench press (barbell)": "Bench Press",
+    "developpe couche": "Bench Press",
+    "squat (barbell)": "Squat",
+    "back squat": "Squat",
+    "deadlift (barbell)": "Deadlift",
+    "souleve de terre": "Deadlift",
+    "sdt": "Deadlift",
+    "ohp": "Overhead Press",
+    "developpe militaire": "Overhead Press",
+    "tractions": "Pull-ups",
+    "pull up": "Pull-ups",
+}
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def error(self, message: str):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(message)
+
+
+def _key(text: str) -> str:
+    """Forme de comparaison : sans accents, sans casse, espaces simples"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return re.sub(r"[\s_\-]+", " ", text).strip().casefold()
+
+
+class ExerciseNames:
+    """Ramène un nom d'exercice importé au nom connu correspondant"""
+
+    def __init__(self, known: Iterable[str] = ()):
+        self._names = {_key(alias): name for alias, name in EXERCISE_ALIASES.items()}
+        for name in known:
+            self._names[_key(name)] = name
+        self._resolved: Dict[str, str] = {}  # nom brut -> nom retenu
+
+    def normalize(self, name: str) -> str:
+        canonical = self._resolved.get(name)
+        if canonical is not None:
+            return canonical
+        cleaned = " ".join(name.split())
+        key = _key(cleaned)
+        canonical = self._names.get(key)
+        if canonical is None:
+            # Nouveau nom : les variantes suivantes (casse, accents) s'y rattachent
+            canonical = self._names[key] = cleaned
+        self._resolved[name] = canonical
+        return canonical
+
+
+def known_exercise_names(tracker: "PowerliftingTracker") -> List[str]:
+    names = list(tracker.get_exercise_names())
+    for program_id in LIBRARY.ids():
+        try:
+            program = LIBRARY.get(program_id)
+        except ProgramError:
+            continue
+        for phases in program.workouts.values():
+            for exercises in phases.values():
+                names.extend(ex.name for ex in exercises)
+    return names
+
+
+def parse_date(value: str) -> str:
+    """Date ISO à partir de 2024-01-31, 2024-01-31 18:00:00, 31/01/2024 ou 31.01.2024"""
+    value = value.strip()
+    match = re.match(r"(\d{4})-(\d{1,2})-(\d{1,2})", value)
+    if match:
+        year, month, day = match.groups()
+    else:
+        match = re.match(r"(\d{1,2})[/.](\d{1,2})[/.](\d{4})", value)
+        if not match:
+            raise ValueError(f"date illisible : {value!r}")
+        day, month, year = match.groups()
+    return str(datetime.date(int(year), int(month), int(day)))
+
+
+def parse_duration(value: str) -> int:
+    """Durée en minutes à partir de 65, 65.5, 1h 5m, 45m, 1h (Strong) ou 1:05 / 1:05:30"""
+    value = value.strip()
+    if not value:
+        return 0
+    match = re.fullmatch(r"(?:(\d+)\s*h)?\s*(?:(\d+)\s*m(?:in)?)?\s*(?:(\d+)\s*s)?", value, re.IGNORECASE)
+    if match and any(match.groups()):
+        hours, minutes, _ = (int(group or 0) for group in match.groups())
+        return hours * 60 + minutes
+    match = re.fullmatch(r"(\d+):(\d{2})(?::\d{2})?", value)
+    if match:
+        return int(match.group(1)) * 60 + int(match.group(2))
+    try:
+        return int(_number(value))
+    except ValueError:
+        raise ValueError(f"durée illisible : {value!r}") from None
+
+
+def _number(value: str) -> float:
+    return float(value.strip().replace(",", ".")) if value and value.strip() else 0.0
+
+
+@functools.lru_cache(maxsize=64)
+def _is_true(value: str) -> bool:
+    return _key(value) not in ("0", "false", "faux", "non", "no", "failed", "echec")
+
+
+def session_key(session: SessionRecord) -> Tuple[int, Tuple[str, ...]]:
+    """Identité d'une séance pour le dédoublonnage : date + exercices"""
+    return session.date, tuple(sorted(ex.name for ex in session.exercises))
+
+
+def _build_session(date: str, workout: str, sets: List[Dict], duration: int, notes: str) -> SessionRecord:
+    exercises: Dict[str, List[Dict]] = {}
+    for s in sets:
+        exercises.setdefault(s['exercise'], []).append(s)
+    records = []
+    for name, rows in exercises.items():
+        failed = sum(1 for row in rows if not row['completed'])
+        top = max(rows, key=lambda row: (row['completed'], row['weight']))
+        records.append(ExerciseRecord(
+            name=sys.intern(name),
+            sets=len(rows),
+            reps=sys.intern(str(top['reps'])),
+            weight=top['weight'],
+            completed_sets=len(rows) - failed,
+            failed_sets=failed,
+            status="failed" if failed else "completed",
+            packed_sets=b"".join(SET_STRUCT.pack(row['weight'], row['reps'], row['completed']) for row in rows),
+        ))
+    return SessionRecord(
+        date=to_ordinal(date),
+        workout_name=sys.intern(workout or "Import"),
+        week=0,
+        exercises=tuple(records),
+        completed=True,
+        duration_minutes=duration,
+        notes=notes,
+    )
+
+
+def read_csv_sessions(stream: io.TextIOBase, names: ExerciseNames,
+                      report: ImportReport) -> Iterator[SessionRecord]:
+    """Séances d'un CSV à une ligne par série, regroupées par (date, séance) consécutives"""
+    reader = csv.reader(stream, delimiter=_sniff_delimiter(stream))
+    header = next(reader, None)
+    if header is None:
+        return
+    header_keys = [_key(column) for column in header]
+    columns = {}
+    for field_name, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if _key(alias) in header_keys:
+                columns[field_name] = header_keys.index(_key(alias))
+                break
+    missing = [f for f in ('date', 'exercise', 'weight', 'reps') if f not in columns]
+    if missing:
+        raise ValueError(f"colonnes manquantes : {', '.join(missing)}")
+
+    def cell(row: List[str], field_name: str) -> str:
+        index = columns.get(field_name)
+        return row[index] if index is not None and index < len(row) else ""
+
+    current = None  # (date, séance)
+    sets: List[Dict] = []
+    duration, notes = 0, ""
+    raw_date, date = None, None
+    for line_number, row in enumerate(reader, start=2):
+        if not any(row):
+            continue
+        try:
+            # Les séries d'une séance se suivent : la date est souvent la même
+            if cell(row, 'date') != raw_date:
+                date = parse_date(cell(row, 'date'))
+                raw_date = cell(row, 'date')
+            key = (date, cell(row, 'workout').strip())
+            exercise = cell(row, 'exercise').strip()
+            if not exercise:
+                raise ValueError("exercice vide")
+            reps = int(_number(cell(row, 'reps')))
+            if not 0 <= reps <= 0xFFFF:
+                raise ValueError(f"répétitions invalides : {reps}")
+            set_row = {
+                'exercise': names.normalize(exercise),
+                'weight': _number(cell(row, 'weight')),
+                'reps': reps,
+                'completed': _is_true(cell(row, 'completed')) if 'completed' in columns else True,
+            }
+            row_duration = parse_duration(cell(row, 'duration'))
+            row_notes = cell(row, 'notes').strip()
+        except ValueError as e:
+            report.error(f"ligne {line_number} : {e}")
+            continue
+        if key != current:
+            if sets:
+                yield _build_session(current[0], current[1], sets, duration, notes)
+            current, sets, duration, notes = key, [], 0, ""
+        sets.append(set_row)
+        duration = max(duration, row_duration)
+        notes = notes or row_notes
+    if sets:
+        yield _build_session(current[0], current[1], sets, duration, notes)
+
+
+def _sniff_delimiter(stream: io.TextIOBase) -> str:
+    """Séparateur de la ligne d'en-tête (virgule, point-virgule ou tabulation)"""
+    if not stream.seekable():
+        return ","
+    position = stream.tell()
+    first_line = stream.readline()
+    stream.seek(position)
+    return max((",", ";", "\t"), key=first_line.count)
+
+
+def read_jsonl_sessions(stream: io.TextIOBase, names: ExerciseNames,
+                        report: ImportReport) -> Iterator[SessionRecord]:
+    """Séances au format de l'application, une par ligne"""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            session = codec.json_loads(line)
+            if not isinstance(session, dict) or not isinstance(session.get('exercises'), list):
+                raise ValueError("séance sans liste 'exercises'")
+            session['date'] = parse_date(str(session.get('date', "")))
+            for ex in session['exercises']:
+                ex['name'] = names.normalize(str(ex['name']))
+                ex.setdefault('sets', len(ex.get('actual_sets') or []))
+                ex.setdefault('reps', "")
+                ex['reps'] = str(ex['reps'])
+                ex.setdefault('weight', 0.0)
+                ex.setdefault('notes', "")
+                ex.setdefault('completed_sets', 0)
+                ex.setdefault('failed_sets', 0)
+                ex.setdefault('status', "completed")
+            session.setdefault('workout_name', "Import")
+            session.setdefault('week', 0)
+            session.setdefault('completed', True)
+            session.setdefault('duration_minutes', 0)
+            session.setdefault('notes', "")
+            record = session_from_dict(session)
+        except (ValueError, KeyError, TypeError, AttributeError, struct.error) as e:
+            report.error(f"ligne {line_number} : {e}")
+            continue
+        yield record
+
+
+READERS = {"csv": read_csv_sessions, "jsonl": read_jsonl_sessions}
+
+
+def detect_format(filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    return "jsonl" if extension in (".jsonl", ".ndjson") else "csv"
+
+
+def import_stream(tracker: "PowerliftingTracker", binary: BinaryIO, fmt: str,
+                  progress: Optional[Callable[[float], None]] = None,
+                  batch_size: int = BATCH_SIZE) -> ImportReport:
+    """Importe un fichier (ouvert en binaire) dans l'historique du tracker
+
+    ``progress`` reçoit la fraction du fichier déjà lue (entre 0 et 1) après
+    chaque lot.
+    """
+    if fmt not in READERS:
+        raise ValueError(f"format inconnu : {fmt}")
+    total = binary.seek(0, os.SEEK_END) if binary.seekable() else 0
+    if binary.seekable():
+        binary.seek(0)
+    report = ImportReport()
+    names = ExerciseNames(known_exercise_names(tracker))
+    seen = {session_key(session) for session in tracker.all_sessions()}
+
+    def flush(batch: List[SessionRecord]):
+        if batch:
+            tracker.append_sessions(batch)
+            report.imported += len(batch)
+        if progress is not None and total:
+            progress(min(binary.tell() / total, 1.0))
+
+    stream = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+    try:
+        batch: List[SessionRecord] = []
+        for session in READERS[fmt](stream, names, report):
+            key = session_key(session)
+            if key in seen:
+                report.duplicates += 1
+                continue
+            seen.add(key)
+            batch.append(session)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+    finally:
+        stream.detach()  # le fichier appartient à l'appelant
+    if progress is not None:
+        progress(1.0)
+    return report
+
+
+def main():
+    from tracker import PowerliftingTracker
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--athlete", default="")
+    parser.add_argument("--format", choices=sorted(READERS))
+    args = parser.parse_args()
+    tracker = PowerliftingTracker(athlete=args.athlete)
+    with open(args.path, 'rb') as f:
+        report = import_stream(tracker, f, args.format or detect_format(args.path),
+                               progress=lambda done: print(f"\r{done:.0%}", end="", flush=True))
+    print(f"\n✅ {report.imported} séance(s) importée(s), {report.duplicates} doublon(s), "
+          f"{report.skipped} ligne(s) ignorée(s)")
+    for error in report.errors:
+        print(f"⚠️ {error}")
+    if hasattr(tracker.storage, "journal"):
+        tracker.storage.journal.wait_for_compaction()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Instrumentation légère des chemins critiques.
+
+Activée par la variable d'environnement ``POWERLIFTING_METRICS=1`` ; relevé :
+
+- nombre d'appels et histogramme des durées (``timed`` sur les méthodes du
+  tracker, ``start_timer`` autour de chaque page) ;
+- octets lus / écrits par le stockage (``add_bytes``) ;
+- événements anormaux mais rattrapés, comme une archive introuvable
+  (``add_event``).
+
+Si ``POWERLIFTING_METRICS_FILE`` est défini, les métriques y sont écrites à
+la fin de chaque rendu : format texte Prometheus, ou JSON si le fichier se
+termine par ``.json``.
+
+Désactivée, l'instrumentation ne coûte presque rien : ``timed`` renvoie la
+fonction telle quelle et ``start_timer`` un chronomètre vide partagé.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+ENABLED = os.environ.get("POWERLIFTING_METRICS", "") not in ("", "0")
+METRICS_FILE = os.environ.get("POWERLIFTING_METRICS_FILE", "")
+
+# Bornes supérieures des seaux de l'histogramme, en millisecondes
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float):
+        index = 0
+        while index < len(BUCKETS_MS) and elapsed_ms > BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def quantile(self, q: float) -> float:
+        """Quantile approché : borne supérieure du seau qui le contient"""
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class Metrics:
+    """Registre des mesures du processus (partagé par toutes les sessions)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[str, Histogram] = {}
+        self.bytes: Dict[str, int] = {}
+        self.events: Dict[str, int] = {}
+
+    def observe(self, name: str, elapsed_ms: float):
+        with self._lock:
+            histogram = self.timings.get(name)
+            if histogram is None:
+                histogram = self.timings[name] = Histogram()
+            histogram.observe(elapsed_ms)
+
+    def add_bytes(self, name: str, count: int):
+        with self._lock:
+            self.bytes[name] = self.bytes.get(name, 0) + count
+
+    def add_event(self, name: str):
+        with self._lock:
+            self.events[name] = self.events.get(name, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.bytes.clear()
+            self.events.clear()
+
+    def summary(self) -> List[Dict]:
+        """Une ligne par mesure, triée par temps cumulé décroissant"""
+        with self._lock:
+            rows = [{
+                "name": name,
+                "count": h.count,
+                "total_ms": h.total_ms,
+                "mean_ms": h.total_ms / h.count,
+                "p50_ms": h.quantile(0.5),
+                "p95_ms": h.quantile(0.95),
+                "max_ms": h.max_ms,
+            } for name, h in self.timings.items()]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def to_json(self) -> str:
+        with self._lock:
+            data = {
+                "buckets_ms": list(BUCKETS_MS),
+                "timings": {name: {"count": h.count, "total_ms": h.total_ms, "max_ms": h.max_ms,
+                                   "buckets": list(h.counts)}
+                            for name, h in self.timings.items()},
+                "bytes": dict(self.bytes),
+                "events": dict(self.events),
+            }
+        return json.dumps(data, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP powerlifting_duration_seconds Durée des appels instrumentés",
+            "# TYPE powerlifting_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, h in sorted(self.timings.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS_MS, h.counts):
+                    cumulative += count
+                    lines.append(f'powerlifting_duration_seconds_bucket{{name="{name}",le="{bound / 1000:g}"}} '
+                                 f'{cumulative}')
+                lines.append(f'powerlifting_duration_seconds_bucket{{name="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'powerlifting_duration_seconds_sum{{name="{name}"}} {h.total_ms / 1000:.6f}')
+                lines.append(f'powerlifting_duration_seconds_count{{name="{name}"}} {h.count}')
+            lines.append("# HELP powerlifting_storage_bytes_total Octets lus / écrits par le stockage")
+            lines.append("# TYPE powerlifting_storage_bytes_total counter")
+            for name, count in sorted(self.bytes.items()):
+                lines.append(f'powerlifting_storage_bytes_total{{name="{name}"}} {count}')
+            lines.append("# HELP powerlifting_events_total Événements anormaux rattrapés")
+            lines.append("# TYPE powerlifting_events_total counter")
+            for name, count in sorted(self.events.items()):
+                lines.append(f'powerlifting_events_total{{name="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path: str):
+        from storage import atomic_write
+        atomic_write(path, self.to_json() if path.endswith(".json") else self.to_prometheus())
+
+
+METRICS = Metrics()
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+
+    def stop(self):
+        METRICS.observe(self.name, (time.perf_counter() - self.start) * 1000)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def start_timer(name: str):
+    """Chronomètre à arrêter avec ``stop()`` (ou à utiliser dans un ``with``)"""
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+
+def timed(fn: Callable) -> Callable:
+    """Décorateur : mesure chaque appel sous le nom ``Classe.méthode``"""
+    if not ENABLED:
+        return fn
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            METRICS.observe(name, (time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+def add_bytes(name: str, count: int):
+    if ENABLED:
+        METRICS.add_bytes(name, count)
+
+
+def add_event(name: str):
+    if ENABLED:
+        METRICS.add_event(name)
+
+
+def flush(path: Optional[str] = None):
+    """Écrit le fichier de métriques s'il est configuré"""
+    path = path or METRICS_FILE
+    if ENABLED and path:
+        METRICS.write_file(path)
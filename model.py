@@ -0,0 +1,199 @@
+"""Représentation compacte et typée de l'historique en mémoire.
+
+Le format JSON de ``workout_data.json`` (dicts imbriqués, dates ISO, séries
+en dicts) n'existe plus qu'aux frontières : lecture / écriture du stockage,
+import, export et enregistrement d'une séance depuis la page Entraînement.
+En mémoire :
+
+- séances et exercices sont des enregistrements figés à ``__slots__``,
+  partagés sans copie entre le stockage et toutes les sessions ;
+- les dates sont des ordinaux (``date.toordinal()``) : tris, comparaisons et
+  intervalles sans relire de chaîne ;
+- noms d'exercices, de séances, prescriptions et statuts sont internés ;
+- les séries réalisées d'un exercice sont empaquetées dans un seul ``bytes``
+  (``SET_STRUCT`` : poids float64, reps uint16, réussite bool), que NumPy
+  lit sans copie avec ``SET_DTYPE`` ;
+- la prescription de répétitions ("5", "8-12", "45 sec", "1RM", "AMRAP")
+  est analysée une fois, à la création de l'exercice, en ``Prescription`` :
+  les calculs ne relisent jamais le texte, qui ne sert plus qu'à l'affichage
+  et au stockage.
+"""
+import datetime
+import functools
+import re
+import struct
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+SET_STRUCT = struct.Struct("<dH?")
+SET_DTYPE = [("weight", "<f8"), ("reps", "<u2"), ("completed", "?")]
+# Ordinal du 1970-01-01 : ordinal - EPOCH_ORDINAL donne un datetime64[D]
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def to_ordinal(iso_date: str) -> int:
+    return datetime.date.fromisoformat(iso_date).toordinal()
+
+
+def to_iso(ordinal: int) -> str:
+    return datetime.date.fromordinal(ordinal).isoformat()
+
+
+def pack_sets(sets: Iterable[Dict]) -> bytes:
+    """Séries au format JSON ({reps, weight, completed}) -> ``bytes`` compact"""
+    pack = SET_STRUCT.pack
+    return b"".join(pack(float(s.get('weight', 0.0)), int(s.get('reps', 0)), bool(s.get('completed')))
+                    for s in sets)
+
+
+# Types de prescription
+REPS = "reps"    # nombre ou fourchette de répétitions : "5", "8-12"
+TIME = "time"    # durée en secondes : "45 sec", "1 min", "1:30"
+MAX = "max"      # tentative maximale : "1RM", "3RM"
+AMRAP = "amrap"  # autant de répétitions que possible : "AMRAP", "5+", "max reps"
+FREE = "free"    # texte libre non reconnu
+
+_RANGE = re.compile(r"(\d+)\s*(?:(?:-|–|à|to)\s*(\d+))?", re.IGNORECASE)
+_UNITS = {"s": 1, "sec": 1, "secs": 1, "seconde": 1, "secondes": 1, "\"": 1,
+          "min": 60, "mn": 60, "minute": 60, "minutes": 60, "'": 60}
+
+
+@dataclass(frozen=True, slots=True)
+class Prescription:
+    kind: str
+    low: int = 0   # répétitions, ou secondes pour TIME (0 : non précisé)
+    high: int = 0
+
+    @property
+    def rep_count(self) -> int:
+        """Répétitions retenues quand les séries ne sont pas détaillées (0 : aucune, pas de 1RM)"""
+        return 0 if self.kind == TIME else self.low
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_prescription(text: str) -> Prescription:
+    """Analyse une prescription de répétitions ; ne lève jamais (texte inconnu : ``FREE``)"""
+    value = text.strip().lower()
+    match = _RANGE.fullmatch(value)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2) or match.group(1))
+        return Prescription(REPS, min(low, high), max(low, high))
+    match = re.fullmatch(r"(\d+):([0-5]\d)", value)
+    if match:
+        seconds = int(match.group(1)) * 60 + int(match.group(2))
+        return Prescription(TIME, seconds, seconds)
+    match = re.fullmatch(r"(.+?)\s*(secondes|seconde|secs|sec|s|\"|minutes|minute|min|mn|')", value)
+    if match and _RANGE.fullmatch(match.group(1)):
+        unit = _UNITS[match.group(2)]
+        low, high = (int(n or 0) * unit for n in _RANGE.fullmatch(match.group(1)).groups())
+        return Prescription(TIME, low, high or low)
+    match = re.fullmatch(r"(\d*)\s*rm", value)
+    if match:
+        count = int(match.group(1) or 1)
+        return Prescription(MAX, count, count)
+    match = re.fullmatch(r"(\d+)\s*\+|amrap\s*(\d*)|max(?:\s*reps?)?", value)
+    if match:
+        return Prescription(AMRAP, int(match.group(1) or match.group(2) or 0))
+    number = re.search(r"\d+", value)
+    count = int(number.group()) if number else 0
+    return Prescription(FREE, count, count)
+
+
+@dataclass(frozen=True, slots=True)
+class ExerciseRecord:
+    name: str
+    sets: int
+    reps: str
+    weight: float
+    notes: str = ""
+    completed_sets: int = 0
+    failed_sets: int = 0
+    status: str = "pending"
+    packed_sets: bytes = b""  # vide : séries non détaillées
+    prescription: Prescription = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'prescription', parse_prescription(self.reps))
+
+    def iter_sets(self) -> Iterator[Tuple[float, int, bool]]:
+        """Séries réalisées : (poids, reps, réussie)"""
+        return SET_STRUCT.iter_unpack(self.packed_sets)
+
+    @property
+    def set_count(self) -> int:
+        return len(self.packed_sets) // SET_STRUCT.size
+
+
+@dataclass(frozen=True, slots=True)
+class SessionRecord:
+    date: int  # ordinal
+    workout_name: str
+    week: int
+    exercises: Tuple[ExerciseRecord, ...]
+    completed: bool = False
+    duration_minutes: int = 0
+    notes: str = ""
+
+    @property
+    def iso_date(self) -> str:
+        return to_iso(self.date)
+
+
+def exercise_from_dict(data: Dict) -> ExerciseRecord:
+    return ExerciseRecord(
+        name=sys.intern(data['name']),
+        sets=int(data.get('sets') or 0),
+        reps=sys.intern(str(data.get('reps', ""))),
+        weight=float(data.get('weight') or 0.0),
+        notes=data.get('notes') or "",
+        completed_sets=int(data.get('completed_sets') or 0),
+        failed_sets=int(data.get('failed_sets') or 0),
+        status=sys.intern(data.get('status') or "pending"),
+        packed_sets=pack_sets(data.get('actual_sets') or ()),
+    )
+
+
+def session_from_dict(data: Dict) -> SessionRecord:
+    """Séance au format JSON -> enregistrement"""
+    return SessionRecord(
+        date=to_ordinal(data['date']),
+        workout_name=sys.intern(data.get('workout_name') or ""),
+        week=int(data.get('week') or 0),
+        exercises=tuple(exercise_from_dict(ex) for ex in data.get('exercises', [])),
+        completed=bool(data.get('completed', False)),
+        duration_minutes=int(data.get('duration_minutes') or 0),
+        notes=data.get('notes') or "",
+    )
+
+
+def exercise_to_dict(exercise: ExerciseRecord) -> Dict:
+    return {
+        'name': exercise.name,
+        'sets': exercise.sets,
+        'reps': exercise.reps,
+        'weight': exercise.weight,
+        'notes': exercise.notes,
+        'completed_sets': exercise.completed_sets,
+        'failed_sets': exercise.failed_sets,
+        'status': exercise.status,
+        'actual_sets': [{'reps': reps, 'weight': weight, 'completed': completed}
+                        for weight, reps, completed in exercise.iter_sets()],
+    }
+
+
+def session_to_dict(session: SessionRecord) -> Dict:
+    """Enregistrement -> séance au format JSON"""
+    return {
+        'date': to_iso(session.date),
+        'workout_name': session.workout_name,
+        'week': session.week,
+        'exercises': [exercise_to_dict(ex) for ex in session.exercises],
+        'completed': session.completed,
+        'duration_minutes': session.duration_minutes,
+        'notes': session.notes,
+    }
+
+
+def sessions_from_dicts(sessions: Iterable[Dict]) -> List[SessionRecord]:
+    return [session_from_dict(session) for session in sessions]
@@ -1,13 +1,21 @@
 import streamlit as st
 import datetime
-import json
-import os
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from dataclasses import dataclass, asdict
-from typing import Dict, List, Tuple
-import numpy as np
+import math
+from dataclasses import asdict
+import metrics
+from autoregulation import PLATE_SIZES, failure_weight
+from charts import (build_body_weight_chart, build_frequency_chart, build_progression_charts, build_score_chart,
+                    build_set_estimates_chart, build_training_load_charts)
+from exporter import FORMATS as EXPORT_FORMATS, export_backup, export_sessions, parquet_available
+from importer import detect_format, import_stream
+from model import parse_prescription, session_from_dict
+from records import MAX_REPS
+from program import LIBRARY, ProgramError, get_program
+from schedule import WEEKDAY_NAMES
+from tracker import PowerliftingTracker, WorkoutSession, thaw_exercise
+
+# Répétitions maximales saisies par série
+SET_MAX_REPS = 20
 
 # Configuration de la page pour mobile
 st.set_page_config(
@@ -101,323 +109,154 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@dataclass
-class Exercise:
-    name: str
-    sets: int
-    reps: str
-    weight: float
-    notes: str = ""
-    completed_sets: int = 0
-    failed_sets: int = 0
-    status: str = "pending"
-    actual_sets: List[Dict] = None  # Pour tracking série par série
-
-    def __post_init__(self):
-        if self.actual_sets is None:
-            self.actual_sets = []
-
-@dataclass
-class WorkoutSession:
-    date: str
-    workout_name: str
-    week: int
-    exercises: List[Exercise]
-    completed: bool = False
-    duration_minutes: int = 0
-    notes: str = ""
-
-@dataclass
-class UserProfile:
-    name: str = ""
-    age: int = 25
-    weight: float = 70.0
-    height: int = 175
-    experience_years: int = 1
-    goals: Dict = None
-    measurements: List[Dict] = None
-
-    def __post_init__(self):
-        if self.goals is None:
-            self.goals = {
-                "bench_1rm": 100.0,
-                "squat_1rm": 120.0,
-                "deadlift_1rm": 140.0
-            }
-        if self.measurements is None:
-            self.measurements = []
-
-class PowerliftingTracker:
-    def __init__(self):
-        self.data_file = "workout_data.json"
-        self.profile_file = "user_profile.json"
-        self.load_data()
-        self.load_profile()
-
-    def load_data(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    self.start_date = datetime.datetime.strptime(data.get('start_date', str(datetime.date.today())), '%Y-%m-%d').date()
-                    self.sessions = data.get('sessions', [])
-            except:
-                self.start_date = datetime.date.today()
-                self.sessions = []
-        else:
-            self.start_date = datetime.date.today()
-            self.sessions = []
-
-    def load_profile(self):
-        if os.path.exists(self.profile_file):
-            try:
-                with open(self.profile_file, 'r') as f:
-                    data = json.load(f)
-                    self.profile = UserProfile(**data)
-            except:
-                self.profile = UserProfile()
-        else:
-            self.profile = UserProfile()
-
-    def save_data(self):
-        data = {
-            'start_date': str(self.start_date),
-            'sessions': self.sessions
-        }
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
-
-    def save_profile(self):
-        with open(self.profile_file, 'w') as f:
-            json.dump(asdict(self.profile), f, indent=2)
-
-    def get_current_week(self) -> int:
-        today = datetime.date.today()
-        days_elapsed = (today - self.start_date).days
-        week = (days_elapsed // 7) + 1
-        return min(max(week, 1), 8)
-
-    def calculate_1rm(self, weight: float, reps: int) -> float:
-        """Calcule le 1RM avec la formule d'Epley"""
-        if reps == 1:
-            return weight
-        return weight * (1 + reps / 30.0)
-
-    def get_exercise_progression(self, exercise_name: str) -> List[Dict]:
-        """Récupère la progression d'un exercice"""
-        progression = []
-        for session in self.sessions:
-            for ex in session.get('exercises', []):
-                if ex['name'] == exercise_name and ex['status'] == 'completed':
-                    progression.append({
-                        'date': session['date'],
-                        'weight': ex['weight'],
-                        'sets': ex['sets'],
-                        'reps': ex['reps'],
-                        'estimated_1rm': self.calculate_1rm(ex['weight'], int(ex['reps'].split('-')[0]) if '-' in ex['reps'] else int(ex['reps']))
-                    })
-        return progression
-
-    def get_program_data(self):
-        return {
-            "SÉANCE A - LUNDI": {
-                "semaine_1-2": [
-                    Exercise("Bench Press", 5, "3", 85.0),
-                    Exercise("Squat", 4, "5", 65.0),
-                    Exercise("Bench Press Pause", 3, "3", 80.0),
-                    Exercise("Front Squat", 3, "8", 50.0),
-                    Exercise("Dips", 3, "8-12", 0.0, "poids du corps"),
-                    Exercise("Bulgarian Split Squats", 3, "10", 15.0)
-                ],
-                "semaine_3-4": [
-                    Exercise("Bench Press", 5, "3", 87.5),
-                    Exercise("Squat", 4, "5", 67.5),
-                    Exercise("Bench Press Pause", 3, "3", 82.5),
-                    Exercise("Front Squat", 3, "8", 52.5),
-                    Exercise("Dips", 3, "10-12", 0.0, "poids du corps"),
-                    Exercise("Bulgarian Split Squats", 3, "10", 17.5)
-                ],
-                "semaine_5-6": [
-                    Exercise("Bench Press", 5, "3", 90.0),
-                    Exercise("Squat", 4, "5", 70.0),
-                    Exercise("Bench Press Pause", 3, "3", 85.0),
-                    Exercise("Front Squat", 3, "8", 55.0),
-                    Exercise("Dips", 3, "12-15", 0.0, "poids du corps"),
-                    Exercise("Bulgarian Split Squats", 3, "10", 20.0)
-                ],
-                "semaine_7-8": [
-                    Exercise("Bench Press", 5, "2-3", 92.5),
-                    Exercise("Squat", 4, "5", 72.5),
-                    Exercise("Bench Press Pause", 3, "2", 87.5),
-                    Exercise("Front Squat", 3, "6", 57.5),
-                    Exercise("Dips", 3, "15", 0.0, "poids du corps"),
-                    Exercise("Bulgarian Split Squats", 3, "8", 22.5)
-                ]
-            },
-            "SÉANCE B - MARDI": {
-                "semaine_1-2": [
-                    Exercise("Deadlift", 5, "2", 125.0),
-                    Exercise("Deficit Deadlift", 3, "3", 100.0),
-                    Exercise("Romanian Deadlift", 4, "6", 85.0),
-                    Exercise("Barbell Rows", 4, "8", 70.0),
-                    Exercise("Good Mornings", 3, "10", 40.0),
-                    Exercise("Plank", 3, "45 sec", 0.0)
-                ],
-                "semaine_3-4": [
-                    Exercise("Deadlift", 5, "1-2", 130.0),
-                    Exercise("Deficit Deadlift", 3, "3", 102.5),
-                    Exercise("Romanian Deadlift", 4, "6", 87.5),
-                    Exercise("Barbell Rows", 4, "8", 72.5),
-                    Exercise("Good Mornings", 3, "10", 42.5),
-                    Exercise("Plank", 3, "50 sec", 0.0)
-                ],
-                "semaine_5-6": [
-                    Exercise("Deadlift", 5, "1", 135.0),
-                    Exercise("Deficit Deadlift", 3, "3", 105.0),
-                    Exercise("Romanian Deadlift", 4, "6", 90.0),
-                    Exercise("Barbell Rows", 4, "8", 75.0),
-                    Exercise("Good Mornings", 3, "10", 45.0),
-                    Exercise("Plank", 3, "60 sec", 0.0)
-                ],
-                "semaine_7-8": [
-                    Exercise("Deadlift", 1, "1RM", 140.0, "vise 140kg"),
-                    Exercise("Romanian Deadlift", 3, "6", 92.5),
-                    Exercise("Barbell Rows", 4, "6", 77.5),
-                    Exercise("Good Mornings", 3, "8", 47.5)
-                ]
-            },
-            "SÉANCE C - JEUDI": {
-                "semaine_1-2": [
-                    Exercise("Squat", 5, "2", 85.0),
-                    Exercise("Pause Squat", 3, "3", 70.0),
-                    Exercise("Box Squat", 4, "5", 65.0),
-                    Exercise("Walking Lunges", 3, "12", 15.0),
-                    Exercise("Leg Curls", 3, "12", 0.0, "machine"),
-                    Exercise("Calf Raises", 4, "15", 0.0)
-                ],
-                "semaine_3-4": [
-                    Exercise("Squat", 5, "1-2", 87.5),
-                    Exercise("Pause Squat", 3, "3", 72.5),
-                    Exercise("Box Squat", 4, "5", 67.5),
-                    Exercise("Walking Lunges", 3, "12", 17.5),
-                    Exercise("Leg Curls", 3, "12", 0.0, "machine"),
-                    Exercise("Calf Raises", 4, "15", 0.0)
-                ],
-                "semaine_5-6": [
-                    Exercise("Squat", 5, "1", 90.0),
-                    Exercise("Pause Squat", 3, "3", 75.0),
-                    Exercise("Box Squat", 4, "5", 70.0),
-                    Exercise("Walking Lunges", 3, "12", 20.0),
-                    Exercise("Leg Curls", 3, "12", 0.0, "machine"),
-                    Exercise("Calf Raises", 4, "15", 0.0)
-                ],
-                "semaine_7-8": [
-                    Exercise("Squat", 1, "1RM", 95.0, "vise 95kg"),
-                    Exercise("Pause Squat", 3, "2", 77.5),
-                    Exercise("Box Squat", 3, "5", 72.5),
-                    Exercise("Walking Lunges", 3, "10", 22.5)
-                ]
-            },
-            "SÉANCE D - VENDREDI": {
-                "semaine_1-2": [
-                    Exercise("Bench Press", 5, "2", 92.0),
-                    Exercise("Deadlift", 4, "3", 105.0),
-                    Exercise("Close Grip Bench", 4, "6", 75.0),
-                    Exercise("Sumo Deadlift", 3, "5", 90.0),
-                    Exercise("Incline DB Press", 3, "8", 30.0),
-                    Exercise("Face Pulls", 3, "15", 0.0, "câble")
-                ],
-                "semaine_3-4": [
-                    Exercise("Bench Press", 5, "1-2", 95.0),
-                    Exercise("Deadlift", 4, "3", 110.0),
-                    Exercise("Close Grip Bench", 4, "6", 77.5),
-                    Exercise("Sumo Deadlift", 3, "5", 92.5),
-                    Exercise("Incline DB Press", 3, "8", 32.5),
-                    Exercise("Face Pulls", 3, "15", 0.0, "câble")
-                ],
-                "semaine_5-6": [
-                    Exercise("Bench Press", 5, "1", 97.5),
-                    Exercise("Deadlift", 4, "3", 112.5),
-                    Exercise("Close Grip Bench", 4, "6", 80.0),
-                    Exercise("Sumo Deadlift", 3, "5", 95.0),
-                    Exercise("Incline DB Press", 3, "8", 35.0),
-                    Exercise("Face Pulls", 3, "15", 0.0, "câble")
-                ],
-                "semaine_7-8": [
-                    Exercise("Bench Press", 1, "1RM", 102.5, "vise 102.5kg"),
-                    Exercise("Deadlift", 3, "3", 115.0),
-                    Exercise("Close Grip Bench", 3, "6", 82.5),
-                    Exercise("Incline DB Press", 3, "6", 37.5)
-                ]
-            }
-        }
-
-    def get_workout_by_day(self, target_date):
-        """Retourne l'entraînement pour une date donnée"""
-        day_of_week = target_date.weekday()
-
-        workout_schedule = {
-            0: "SÉANCE A - LUNDI",
-            1: "SÉANCE B - MARDI", 
-            3: "SÉANCE C - JEUDI",
-            4: "SÉANCE D - VENDREDI"
-        }
-
-        if day_of_week not in workout_schedule:
-            return None, [], 0
-
-        workout_name = workout_schedule[day_of_week]
-
-        # Calcul de la semaine pour cette date
-        days_elapsed = (target_date - self.start_date).days
-        week = (days_elapsed // 7) + 1
-        week = min(max(week, 1), 8)
-
-        if week <= 2:
-            phase = "semaine_1-2"
-        elif week <= 4:
-            phase = "semaine_3-4"
-        elif week <= 6:
-            phase = "semaine_5-6"
-        else:
-            phase = "semaine_7-8"
-
-        program_data = self.get_program_data()
-        exercises = program_data[workout_name][phase]
+# Carte d'exercice de la page Entraînement. Chaque carte est un fragment :
+# cocher une série, "Tout réussi" ou "Échec" ne réexécute que cette carte.
+# Les boutons passent par des callbacks, exécutés avant le rendu du fragment,
+# ce qui évite un second passage via st.rerun().
+def toggle_set(i: int, j: int):
+    series_data = st.session_state[f'series_tracking_{i}']
+    series_data[j]["completed"] = not series_data[j]["completed"]
+
+def mark_all_success(i: int):
+    # Séries sans répétitions saisies : faites comme prescrit (records, suggestions)
+    prescribed = parse_prescription(st.session_state.current_workout[i].reps).rep_count
+    for j, s in enumerate(st.session_state[f'series_tracking_{i}']):
+        s["completed"] = True
+        if s["reps"] == 0 and prescribed > 0:
+            s["reps"] = min(prescribed, SET_MAX_REPS)
+            st.session_state[f"reps_{i}_{j}"] = s["reps"]
+    st.session_state.current_workout[i] = thaw_exercise(st.session_state.current_workout[i])
+    st.session_state.current_workout[i].status = "completed"
+
+def mark_failed(i: int):
+    exercise = thaw_exercise(st.session_state.current_workout[i])
+    st.session_state.current_workout[i] = exercise
+    exercise.status = "failed"
+    if exercise.weight > 0:
+        # Séries restantes ramenées au 1RM estimé du jour ; le poids prévu reste enregistré tel quel
+        series_data = st.session_state[f'series_tracking_{i}']
+        profile = st.session_state.tracker.profile
+        working = max(s["weight"] for s in series_data)
+        weight = failure_weight(working, exercise.reps, [(s["weight"], s["reps"]) for s in series_data],
+                                profile.bar_weight, profile.plates)
+        st.session_state[f'failure_weight_{i}'] = (working, weight)
+        for j, s in enumerate(series_data):
+            if not s["completed"] and s["reps"] == 0:
+                s["weight"] = weight
+                st.session_state[f"weight_{i}_{j}"] = weight
+
+def weight_label(exercise, date: datetime.date) -> str:
+    """Poids des aperçus de séance : charge suggérée si elle diffère du programme"""
+    if exercise.weight <= 0:
+        return ""
+    suggested = st.session_state.tracker.suggest_weight(exercise, date)
+    if suggested is None or suggested == exercise.weight:
+        return f" @ {exercise.weight}kg"
+    return f" @ {suggested}kg 🎯 (programme : {exercise.weight}kg)"
+
+@st.fragment
+@metrics.timed
+def render_exercise_card(i: int):
+    exercise = st.session_state.current_workout[i]
+    # Charge suggérée d'après les dernières séances (None : poids du programme)
+    suggested = st.session_state.tracker.suggest_weight(exercise)
+    with st.container():
+        st.markdown(f'<div class="workout-card">', unsafe_allow_html=True)
 
-        return workout_name, exercises, week
+        # Nom et détails de l'exercice
+        weight_str = f"{exercise.weight}kg" if exercise.weight > 0 else ""
+        notes_str = f" ({exercise.notes})" if exercise.notes else ""
+
+        st.markdown(f'<div class="exercise-name">{exercise.name}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="exercise-details">{exercise.sets} sets × {exercise.reps} reps {weight_str}{notes_str}</div>', unsafe_allow_html=True)
+        if suggested is not None and suggested != exercise.weight:
+            st.caption(f"🎯 Charge suggérée : {suggested}kg (programme : {exercise.weight}kg), "
+                       f"d'après la tendance de vos dernières séances")
+
+        # Tracking série par série
+        st.markdown("**Tracking des séries:**")
+
+        # Initialisation du tracking des séries
+        if f'series_tracking_{i}' not in st.session_state:
+            st.session_state[f'series_tracking_{i}'] = [{"reps": 0, "weight": exercise.weight if suggested is None else suggested, "completed": False} for _ in range(exercise.sets)]
+
+        series_data = st.session_state[f'series_tracking_{i}']
+        # Les champs ne lisent que leur clé (pas de value=) : mark_failed peut la réécrire sans
+        # avertissement. Elle est semée depuis le tracking, et de nouveau si Streamlit l'a oubliée
+        # (champ non affiché sur une autre page)
+        for j, s in enumerate(series_data):
+            st.session_state.setdefault(f"reps_{i}_{j}", s["reps"])
+            st.session_state.setdefault(f"weight_{i}_{j}", s["weight"])
+        # Records battus en direct : les séries cochées sont ajoutées, dans l'ordre, à une copie des records
+        live_records = st.session_state.tracker.live_records(exercise)
+        today = datetime.date.today().toordinal()
+
+        # Affichage des séries
+        for j in range(exercise.sets):
+            col1, col2, col3, col4 = st.columns([2, 2, 2, 2])
+
+            with col1:
+                st.write(f"**Série {j+1}:**")
+
+            with col2:
+                reps_done = st.number_input(
+                    f"Reps", 
+                    min_value=0, 
+                    max_value=SET_MAX_REPS, 
+                    key=f"reps_{i}_{j}"
+                )
+                series_data[j]["reps"] = reps_done
+
+            with col3:
+                weight_used = st.number_input(
+                    f"Poids (kg)", 
+                    min_value=0.0, 
+                    max_value=300.0, 
+                    step=2.5,
+                    key=f"weight_{i}_{j}"
+                )
+                series_data[j]["weight"] = weight_used
+
+            with col4:
+                st.button(f"✅" if series_data[j]["completed"] else "⏳", key=f"complete_{i}_{j}",
+                          on_click=toggle_set, args=(i, j))
+
+            if live_records is not None and series_data[j]["completed"]:
+                beaten = live_records.add(series_data[j]["weight"], series_data[j]["reps"], today)
+                if beaten:
+                    with col1:
+                        st.caption("🏆 Record : " + ", ".join(beaten))
 
-    def get_today_workout(self):
-        today = datetime.date.today()
-        return self.get_workout_by_day(today)
+        # Résumé de l'exercice
+        completed_series = sum(1 for s in series_data if s["completed"])
+        st.progress(completed_series / exercise.sets)
+        st.write(f"Séries complétées: {completed_series}/{exercise.sets}")
 
-    def get_next_workouts(self, days_ahead=7):
-        """Retourne les prochains entraînements"""
-        today = datetime.date.today()
-        next_workouts = []
+        # Boutons d'action rapide
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button(f"✅ Tout réussi", key=f"all_success_{i}", on_click=mark_all_success, args=(i,))
 
-        for i in range(1, days_ahead + 1):
-            future_date = today + datetime.timedelta(days=i)
-            workout_name, exercises, week = self.get_workout_by_day(future_date)
+        with col2:
+            st.button(f"❌ Échec (ajuster)", key=f"fail_{i}", on_click=mark_failed, args=(i,))
 
-            if workout_name:  # Si c'est un jour d'entraînement
-                next_workouts.append({
-                    'date': future_date,
-                    'day_name': future_date.strftime("%A"),
-                    'workout_name': workout_name,
-                    'exercises': exercises,
-                    'week': week
-                })
+        failure = st.session_state.get(f'failure_weight_{i}')
+        if getattr(exercise, "status", "pending") == "failed" and failure:
+            working, adjusted = failure
+            st.warning(f"Poids ajusté: {adjusted}kg ({adjusted - working:+g}kg)")
 
-        return next_workouts
+        st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown("---")
 
-# Initialisation
-if 'tracker' not in st.session_state:
-    st.session_state.tracker = PowerliftingTracker()
+# Initialisation (un tracker par session, ?athlete=nom dans l'URL pour choisir l'athlète)
+athlete = st.query_params.get("athlete", "")
+if 'tracker' not in st.session_state or st.session_state.tracker.athlete != athlete:
+    st.session_state.tracker = PowerliftingTracker(athlete=athlete)
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "🏠 Accueil"
 
 tracker = st.session_state.tracker
+tracker.refresh()
 
 # Navigation
 st.markdown('<h1 class="main-header">💪 Powerlifting Pro</h1>', unsafe_allow_html=True)
@@ -436,21 +275,23 @@ for i, (col, page) in enumerate(zip([col1, col2, col3, col4, col5], pages)):
 st.markdown(f"---")
 st.markdown(f'<h2 class="page-header">{st.session_state.current_page}</h2>', unsafe_allow_html=True)
 
+# Mesure du rendu de la page (non arrêtée si la page relance le script)
+page_timer = metrics.start_timer("page." + st.session_state.current_page.split(" ", 1)[1])
+
 # ==================== PAGE ACCUEIL ====================
 if st.session_state.current_page == "🏠 Accueil":
 
     # Métriques principales
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("📅 Semaine", f"{tracker.get_current_week()}/8")
+        st.metric("📅 Semaine", f"{tracker.get_current_week()}/{tracker.program.weeks}")
     with col2:
         st.metric("📍 Aujourd'hui", datetime.date.today().strftime("%A"))
     with col3:
-        days_left = 56 - (datetime.date.today() - tracker.start_date).days
+        days_left = (tracker.calendar.end_date - datetime.date.today()).days
         st.metric("⏳ Jours restants", max(0, days_left))
     with col4:
-        completed_sessions = len([s for s in tracker.sessions if s.get('completed', False)])
-        st.metric("✅ Séances faites", completed_sessions)
+        st.metric("✅ Séances faites", tracker.aggregates.completed_sessions)
 
     # Entraînement du jour
     workout_name, exercises, week = tracker.get_today_workout()
@@ -458,11 +299,11 @@ if st.session_state.current_page == "🏠 Accueil":
     if workout_name:
         st.markdown(f'<div class="workout-card">', unsafe_allow_html=True)
         st.markdown(f"### 🏋️ {workout_name}")
-        st.markdown(f"**Semaine {week}/8**")
+        st.markdown(f"**Semaine {week}/{tracker.program.weeks}**")
 
         # Aperçu des exercices principaux
         for ex in exercises[:3]:
-            weight_str = f" @ {ex.weight}kg" if ex.weight > 0 else ""
+            weight_str = weight_label(ex, datetime.date.today())
             notes_str = f" ({ex.notes})" if ex.notes else ""
             st.markdown(f"• **{ex.name}**: {ex.sets}×{ex.reps}{weight_str}{notes_str}")
 
@@ -488,14 +329,21 @@ if st.session_state.current_page == "🏠 Accueil":
         for workout in next_workouts[:2]:
             st.markdown(f'<div class="stats-card">', unsafe_allow_html=True)
             st.markdown(f"**{workout['day_name']} {workout['date'].strftime('%d/%m')} - {workout['workout_name']}**")
-            st.markdown(f"*Semaine {workout['week']}/8*")
+            st.markdown(f"*Semaine {workout['week']}/{tracker.program.weeks}*")
 
             for ex in workout['exercises'][:2]:
-                weight_str = f" @ {ex.weight}kg" if ex.weight > 0 else ""
+                weight_str = weight_label(ex, workout['date'])
                 st.markdown(f"• {ex.name}: {ex.sets}×{ex.reps}{weight_str}")
 
             st.markdown('</div>', unsafe_allow_html=True)
 
+    # Séances manquées depuis le début du bloc
+    missed_workouts = tracker.get_missed_workouts()
+    if missed_workouts:
+        with st.expander(f"⚠️ {len(missed_workouts)} séance(s) manquée(s) dans ce bloc"):
+            for workout in missed_workouts:
+                st.markdown(f"• {workout.date.strftime('%d/%m')} - {workout.workout_name} (semaine {workout.week})")
+
 # ==================== PAGE ENTRAÎNEMENT ====================
 elif st.session_state.current_page == "🏋️ Entraînement":
 
@@ -503,7 +351,7 @@ elif st.session_state.current_page == "🏋️ Entraînement":
 
     if workout_name:
         st.markdown(f"### 🏋️ {workout_name}")
-        st.markdown(f"**Semaine {week}/8**")
+        st.markdown(f"**Semaine {week}/{tracker.program.weeks}**")
 
         # Timer d'entraînement
         if 'workout_start_time' not in st.session_state:
@@ -513,90 +361,14 @@ elif st.session_state.current_page == "🏋️ Entraînement":
         st.metric("⏱️ Temps écoulé", f"{elapsed.seconds // 60}min {elapsed.seconds % 60}s")
 
         # Initialisation de la session d'entraînement
+        # Liste propre à la session, mais exercices partagés avec le programme
+        # tant qu'ils ne sont pas modifiés (voir thaw_exercise)
         if 'current_workout' not in st.session_state:
-            st.session_state.current_workout = exercises
+            st.session_state.current_workout = list(exercises)
 
         # Affichage des exercices avec tracking avancé
-        for i, exercise in enumerate(st.session_state.current_workout):
-            with st.container():
-                st.markdown(f'<div class="workout-card">', unsafe_allow_html=True)
-
-                # Nom et détails de l'exercice
-                weight_str = f"{exercise.weight}kg" if exercise.weight > 0 else ""
-                notes_str = f" ({exercise.notes})" if exercise.notes else ""
-
-                st.markdown(f'<div class="exercise-name">{exercise.name}</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="exercise-details">{exercise.sets} sets × {exercise.reps} reps {weight_str}{notes_str}</div>', unsafe_allow_html=True)
-
-                # Tracking série par série
-                st.markdown("**Tracking des séries:**")
-
-                # Initialisation du tracking des séries
-                if f'series_tracking_{i}' not in st.session_state:
-                    st.session_state[f'series_tracking_{i}'] = [{"reps": 0, "weight": exercise.weight, "completed": False} for _ in range(exercise.sets)]
-
-                series_data = st.session_state[f'series_tracking_{i}']
-
-                # Affichage des séries
-                for j in range(exercise.sets):
-                    col1, col2, col3, col4 = st.columns([2, 2, 2, 2])
-
-                    with col1:
-                        st.write(f"**Série {j+1}:**")
-
-                    with col2:
-                        reps_done = st.number_input(
-                            f"Reps", 
-                            min_value=0, 
-                            max_value=20, 
-                            value=series_data[j]["reps"],
-                            key=f"reps_{i}_{j}"
-                        )
-                        series_data[j]["reps"] = reps_done
-
-                    with col3:
-                        weight_used = st.number_input(
-                            f"Poids (kg)", 
-                            min_value=0.0, 
-                            max_value=300.0, 
-                            value=series_data[j]["weight"],
-                            step=2.5,
-                            key=f"weight_{i}_{j}"
-                        )
-                        series_data[j]["weight"] = weight_used
-
-                    with col4:
-                        if st.button(f"✅" if series_data[j]["completed"] else "⏳", key=f"complete_{i}_{j}"):
-                            series_data[j]["completed"] = not series_data[j]["completed"]
-                            st.rerun()
-
-                # Résumé de l'exercice
-                completed_series = sum(1 for s in series_data if s["completed"])
-                st.progress(completed_series / exercise.sets)
-                st.write(f"Séries complétées: {completed_series}/{exercise.sets}")
-
-                # Boutons d'action rapide
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button(f"✅ Tout réussi", key=f"all_success_{i}"):
-                        for s in series_data:
-                            s["completed"] = True
-                        st.session_state.current_workout[i].status = "completed"
-                        st.rerun()
-
-                with col2:
-                    if st.button(f"❌ Échec (-5kg)", key=f"fail_{i}"):
-                        st.session_state.current_workout[i].status = "failed"
-                        if exercise.weight > 0:
-                            new_weight = max(0, exercise.weight - 5)
-                            st.session_state.current_workout[i].weight = new_weight
-                            for s in series_data:
-                                s["weight"] = new_weight
-                        st.warning(f"Poids ajusté: {st.session_state.current_workout[i].weight}kg (-5kg)")
-                        st.rerun()
-
-                st.markdown('</div>', unsafe_allow_html=True)
-                st.markdown("---")
+        for i in range(len(st.session_state.current_workout)):
+            render_exercise_card(i)
 
         # Bouton de fin d'entraînement
         if st.button("🏁 Terminer l'entraînement", type="primary"):
@@ -607,7 +379,7 @@ elif st.session_state.current_page == "🏋️ Entraînement":
             detailed_exercises = []
             for i, ex in enumerate(st.session_state.current_workout):
                 series_data = st.session_state.get(f'series_tracking_{i}', [])
-                ex_dict = asdict(ex)
+                ex_dict = asdict(thaw_exercise(ex))
                 ex_dict['actual_sets'] = series_data
                 detailed_exercises.append(ex_dict)
 
@@ -620,14 +392,13 @@ elif st.session_state.current_page == "🏋️ Entraînement":
                 duration_minutes=duration
             )
 
-            tracker.sessions.append(asdict(session))
-            tracker.save_data()
+            tracker.append_session(session_from_dict(asdict(session)))
 
             st.success(f"🎉 Entraînement terminé en {duration} minutes!")
             st.balloons()
 
             # Nettoyage des variables de session
-            keys_to_remove = [key for key in st.session_state.keys() if key.startswith(('current_workout', 'series_tracking_', 'workout_start_time'))]
+            keys_to_remove = [key for key in st.session_state.keys() if key.startswith(('current_workout', 'series_tracking_', 'reps_', 'weight_', 'failure_weight_', 'workout_start_time'))]
             for key in keys_to_remove:
                 del st.session_state[key]
 
@@ -643,97 +414,130 @@ elif st.session_state.current_page == "🏋️ Entraînement":
 # ==================== PAGE STATISTIQUES ====================
 elif st.session_state.current_page == "📊 Statistiques":
 
-    if not tracker.sessions:
+    if not tracker.aggregates.total_sessions:
         st.info("📈 Aucune donnée disponible. Complétez quelques entraînements pour voir vos statistiques !")
     else:
         # Statistiques générales
         st.markdown("### 📈 Vue d'ensemble")
 
+        aggregates = tracker.aggregates
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            total_sessions = len(tracker.sessions)
-            st.metric("🏋️ Séances totales", total_sessions)
+            st.metric("🏋️ Séances totales", aggregates.total_sessions)
 
         with col2:
-            total_duration = sum(s.get('duration_minutes', 0) for s in tracker.sessions)
-            st.metric("⏱️ Temps total", f"{total_duration}min")
+            st.metric("⏱️ Temps total", f"{aggregates.total_duration}min")
 
         with col3:
-            avg_duration = total_duration / total_sessions if total_sessions > 0 else 0
-            st.metric("📊 Durée moyenne", f"{avg_duration:.0f}min")
+            st.metric("📊 Durée moyenne", f"{aggregates.avg_duration:.0f}min")
 
         with col4:
-            # Calcul du taux de réussite
-            total_exercises = sum(len(s.get('exercises', [])) for s in tracker.sessions)
-            completed_exercises = sum(sum(1 for ex in s.get('exercises', []) if ex.get('status') == 'completed') for s in tracker.sessions)
-            success_rate = (completed_exercises / total_exercises * 100) if total_exercises > 0 else 0
-            st.metric("✅ Taux de réussite", f"{success_rate:.1f}%")
+            st.metric("✅ Taux de réussite", f"{aggregates.success_rate:.1f}%")
 
         # Graphiques de progression
         st.markdown("### 📊 Progression par exercice")
 
         # Sélection d'exercice
-        all_exercises = set()
-        for session in tracker.sessions:
-            for ex in session.get('exercises', []):
-                all_exercises.add(ex['name'])
+        all_exercises = tracker.get_exercise_names()
 
         if all_exercises:
-            selected_exercise = st.selectbox("Choisir un exercice:", sorted(all_exercises))
+            selected_exercise = st.selectbox("Choisir un exercice:", all_exercises)
 
             # Données de progression
             progression_data = tracker.get_exercise_progression(selected_exercise)
 
+            # Période affichée : les courbes sont réduites pour l'historique complet,
+            # un intervalle plus court est relu à pleine résolution
+            period = (None, None)
             if progression_data:
-                df = pd.DataFrame(progression_data)
-                df['date'] = pd.to_datetime(df['date'])
-
-                # Graphique de progression du poids
-                fig_weight = px.line(df, x='date', y='weight', 
-                                   title=f'Progression du poids - {selected_exercise}',
-                                   labels={'weight': 'Poids (kg)', 'date': 'Date'})
-                fig_weight.update_traces(line_color='#ff6b6b', line_width=3)
-                st.plotly_chart(fig_weight, use_container_width=True)
-
-                # Graphique du 1RM estimé
-                fig_1rm = px.line(df, x='date', y='estimated_1rm',
-                                title=f'1RM estimé - {selected_exercise}',
-                                labels={'estimated_1rm': '1RM estimé (kg)', 'date': 'Date'})
-                fig_1rm.update_traces(line_color='#3498db', line_width=3)
-                st.plotly_chart(fig_1rm, use_container_width=True)
-
-                # Tableau des records
+                first_date = progression_data[0]['date']
+                last_date = progression_data[-1]['date']
+                if first_date < last_date:
+                    selected_period = st.slider("Période:", min_value=first_date, max_value=last_date,
+                                                value=(first_date, last_date), format="DD/MM/YYYY",
+                                                key=f"period_{selected_exercise}")
+                    if selected_period != (first_date, last_date):
+                        period = selected_period
+
+                period_data = tracker.get_exercise_progression(selected_exercise, *period)
+                if period_data:
+                    # Figures en cache, pas leur JSON : voir charts.py
+                    fig_weight, fig_1rm = tracker.cached(
+                        ('progression', selected_exercise, period),
+                        lambda: build_progression_charts(period_data, selected_exercise))
+                    st.plotly_chart(fig_weight, use_container_width=True)
+                    st.plotly_chart(fig_1rm, use_container_width=True)
+                else:
+                    st.info("Aucune séance réussie sur cette période.")
+
+            fig_sets = tracker.cached(
+                ('set_estimates', selected_exercise, period),
+                lambda: build_set_estimates_chart(tracker.get_set_estimates(selected_exercise, *period),
+                                                  selected_exercise))
+            if fig_sets is not None:
+                st.plotly_chart(fig_sets, use_container_width=True)
+
+            # Records : index tenu à jour séance par séance (séries réussies)
+            exercise_records = tracker.records.get(selected_exercise)
+            if progression_data or exercise_records:
                 st.markdown("### 🏆 Records personnels")
 
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    max_weight = df['weight'].max()
-                    st.metric("💪 Poids max", f"{max_weight}kg")
+                    st.metric("💪 Poids max", f"{exercise_records.weights[0]}kg" if exercise_records else "—")
 
                 with col2:
-                    max_1rm = df['estimated_1rm'].max()
-                    st.metric("🎯 1RM estimé max", f"{max_1rm:.1f}kg")
+                    st.metric("🎯 1RM estimé max",
+                              f"{exercise_records.best_e1rm:.1f}kg" if exercise_records else "—")
 
+                # Exercices au temps : pas de 1RM (NaN)
+                estimates = [row['estimated_1rm'] for row in progression_data
+                             if not math.isnan(row['estimated_1rm'])]
                 with col3:
-                    last_1rm = df['estimated_1rm'].iloc[-1] if len(df) > 0 else 0
-                    st.metric("📊 1RM actuel", f"{last_1rm:.1f}kg")
+                    st.metric("📊 1RM actuel", f"{estimates[-1]:.1f}kg" if estimates else "—")
+
+                if exercise_records:
+                    weight, reps, date = exercise_records.volume_set
+                    st.caption(f"Meilleure série en volume : {reps} × {weight}kg "
+                               f"le {datetime.date.fromordinal(date):%d/%m/%Y}")
+                    st.dataframe([{f"{count}RM": exercise_records.rep_max(count) for count in range(1, MAX_REPS + 1)}],
+                                 hide_index=True)
+
+            with st.expander("📋 Records de tous les exercices"):
+                st.dataframe(tracker.records.table(), hide_index=True, column_config={
+                    'exercise': "Exercice",
+                    'e1rm': st.column_config.NumberColumn("1RM estimé", format="%.1f"),
+                    'volume': st.column_config.NumberColumn("Meilleur volume (kg)", format="%.0f"),
+                })
+
+        # Charge d'entraînement : calculée sur les séries, tenue à jour à chaque séance
+        st.markdown("### 🏋️ Charge d'entraînement")
+        weekly_load = tracker.get_weekly_load(datetime.date.today())
+        if len(weekly_load['date']):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("🏋️ Tonnage (semaine)", f"{weekly_load['tonnage'][-1]:.0f}kg")
+            with col2:
+                st.metric("📐 INOL (semaine)", f"{weekly_load['inol'][-1]:.2f}")
+            with col3:
+                acwr = weekly_load['acwr'][-1]
+                st.metric("⚖️ ACWR", "—" if math.isnan(acwr) else f"{acwr:.2f}",
+                          help="Charge des 7 derniers jours / moyenne hebdomadaire des 28 derniers jours "
+                               "(zone conseillée : 0,8 à 1,3)")
+            load_weeks = st.radio("Période", (12, 52, 0), horizontal=True, key="load_weeks",
+                                  format_func={12: "12 semaines", 52: "1 an", 0: "Tout"}.get)
+            for fig in tracker.cached(('training_load', load_weeks, datetime.date.today()),
+                                      lambda: build_training_load_charts(weekly_load, load_weeks)):
+                st.plotly_chart(fig, use_container_width=True)
 
         # Heatmap des entraînements
         st.markdown("### 🗓️ Calendrier des entraînements")
 
         # Création des données pour la heatmap
-        session_dates = [datetime.datetime.strptime(s['date'], '%Y-%m-%d').date() for s in tracker.sessions]
-
-        if session_dates:
-            # Graphique de fréquence
-            df_sessions = pd.DataFrame({'date': session_dates, 'count': 1})
-            df_sessions['date'] = pd.to_datetime(df_sessions['date'])
-            df_sessions = df_sessions.groupby('date').sum().reset_index()
-
-            fig_freq = px.bar(df_sessions, x='date', y='count',
-                            title='Fréquence des entraînements',
-                            labels={'count': 'Nombre de séances', 'date': 'Date'})
-            fig_freq.update_traces(marker_color='#28a745')
+        sessions_per_date = tracker.cached(('sessions_per_date',), tracker.get_sessions_per_date)
+
+        if sessions_per_date:
+            fig_freq = tracker.cached(('frequency',), lambda: build_frequency_chart(sessions_per_date))
             st.plotly_chart(fig_freq, use_container_width=True)
 
 # ==================== PAGE PROFIL ====================
@@ -753,6 +557,8 @@ elif st.session_state.current_page == "👤 Profil":
         with col2:
             height = st.number_input("Taille (cm)", min_value=140, max_value=220, value=tracker.profile.height)
             experience = st.number_input("Expérience (années)", min_value=0, max_value=50, value=tracker.profile.experience_years)
+            sex = st.selectbox("Sexe (coefficients des scores)", ["M", "F"], index=["M", "F"].index(tracker.profile.sex),
+                               format_func=lambda s: "Homme" if s == "M" else "Femme")
 
         st.markdown("### 🎯 Objectifs de force")
 
@@ -773,6 +579,7 @@ elif st.session_state.current_page == "👤 Profil":
             tracker.profile.weight = weight
             tracker.profile.height = height
             tracker.profile.experience_years = experience
+            tracker.profile.sex = sex
             tracker.profile.goals = {
                 "bench_1rm": bench_goal,
                 "squat_1rm": squat_goal,
@@ -794,12 +601,11 @@ elif st.session_state.current_page == "👤 Profil":
             st.metric("📏 IMC", f"{bmi:.1f}")
 
     with col2:
-        # Wilks Score approximatif (formule simplifiée)
+        # DOTS du total visé, au poids actuel
         if tracker.profile.weight > 0:
-            # Estimation basée sur les objectifs
+            from scoring import dots
             total_goal = bench_goal + squat_goal + deadlift_goal
-            wilks_approx = total_goal / tracker.profile.weight * 2.2  # Approximation
-            st.metric("🏆 Wilks estimé", f"{wilks_approx:.0f}")
+            st.metric("🏆 DOTS des objectifs", f"{float(dots(total_goal, tracker.profile.weight, sex == 'F')):.0f}")
 
     with col3:
         # Niveau d'expérience
@@ -813,6 +619,42 @@ elif st.session_state.current_page == "👤 Profil":
             level = "Expert"
         st.metric("🎖️ Niveau", level)
 
+    # Scores du total estimé, avec la pesée la plus proche de chaque séance
+    st.markdown("### 🏅 Scores de force")
+    score_history = tracker.cached(('score_history',), tracker.get_score_history)
+    if len(score_history['date']):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("🏋️ Total estimé", f"{score_history['total'][-1]:.1f}kg")
+        with col2:
+            st.metric("DOTS", f"{score_history['dots'][-1]:.1f}")
+        with col3:
+            st.metric("Wilks 2020", f"{score_history['wilks'][-1]:.1f}")
+        with col4:
+            st.metric("IPF GL", f"{score_history['ipf_gl'][-1]:.1f}")
+        st.caption(f"Meilleurs 1RM estimés au squat, développé couché et soulevé de terre, "
+                   f"au poids de corps de {score_history['bodyweight'][-1]:.1f}kg (pesée la plus proche)")
+        fig_scores = tracker.cached(('score_chart',), lambda: build_score_chart(score_history))
+        if fig_scores is not None:
+            st.plotly_chart(fig_scores, use_container_width=True)
+    else:
+        st.info("Enregistrez des séries de Squat, Bench Press et Deadlift pour calculer vos scores.")
+
+    with st.expander("🏆 Classement des athlètes"):
+        from scoring import SCORE_LABELS, SCORES
+        ranking_score = st.radio("Classer par", SCORES, format_func=SCORE_LABELS.get, horizontal=True,
+                                 key="ranking_score")
+        st.caption("Tous les athlètes de ce serveur (dossier athletes/), classés sur le total de leurs "
+                   "meilleurs 1RM estimés et le poids de corps de leur profil.")
+        if st.button("📊 Calculer le classement"):
+            from scoring import rank_athletes
+            ranking = rank_athletes(backend=tracker.storage.name, score=ranking_score)
+            st.dataframe([{
+                "Rang": row['rank'], "Athlète": row['athlete'], "Sexe": row['sex'],
+                "Poids (kg)": row['bodyweight'], "Total (kg)": round(row['total'], 1),
+                **{SCORE_LABELS[name]: round(row[name], 1) for name in SCORES},
+            } for row in ranking], hide_index=True, use_container_width=True)
+
     # Suivi du poids corporel
     st.markdown("### ⚖️ Suivi du poids corporel")
 
@@ -835,15 +677,9 @@ elif st.session_state.current_page == "👤 Profil":
 
     # Graphique d'évolution du poids
     if tracker.profile.measurements:
-        weight_data = [m for m in tracker.profile.measurements if m.get('type') == 'weight']
-        if weight_data:
-            df_weight = pd.DataFrame(weight_data)
-            df_weight['date'] = pd.to_datetime(df_weight['date'])
-
-            fig_weight_evolution = px.line(df_weight, x='date', y='weight',
-                                         title='Évolution du poids corporel',
-                                         labels={'weight': 'Poids (kg)', 'date': 'Date'})
-            fig_weight_evolution.update_traces(line_color='#28a745', line_width=3)
+        fig_weight_evolution = tracker.cached(
+            ('body_weight',), lambda: build_body_weight_chart(tracker.profile.measurements))
+        if fig_weight_evolution is not None:
             st.plotly_chart(fig_weight_evolution, use_container_width=True)
 
 # ==================== PAGE PARAMÈTRES ====================
@@ -860,38 +696,134 @@ elif st.session_state.current_page == "⚙️ Paramètres":
             st.success("✅ Date mise à jour!")
             st.rerun()
 
+    with st.expander("📋 Programme"):
+        program_ids = LIBRARY.ids()
+        program_names = {}
+        for program_id in program_ids:
+            try:
+                program_names[program_id] = get_program(program_id).name
+            except ProgramError as e:
+                st.warning(f"⚠️ {e}")
+        for program_id, error in LIBRARY.errors.items():
+            st.warning(f"⚠️ {program_id} : {error} (version précédente conservée)")
+        if program_names:
+            current = tracker.program.program_id
+            selected_program = st.selectbox("Programme", list(program_names),
+                                            index=list(program_names).index(current) if current in program_names else 0,
+                                            format_func=lambda program_id: program_names[program_id])
+            st.caption(get_program(selected_program).description)
+            if st.button("💾 Changer de programme") and selected_program != current:
+                tracker.profile.program = selected_program
+                tracker.profile.workout_days = None  # jours par défaut du nouveau programme
+                tracker.save_profile()
+                st.success("✅ Programme mis à jour!")
+                st.rerun()
+
+    with st.expander("📆 Jours d'entraînement"):
+        workout_days = []
+        for slot, (day, workout_name) in enumerate(tracker.calendar.schedule.items()):
+            workout_days.append(st.selectbox(workout_name.split(" - ")[0], range(7), index=day,
+                                             format_func=lambda d: WEEKDAY_NAMES[d], key=f"workout_day_{slot}"))
+        if st.button("💾 Mettre à jour les jours"):
+            if len(set(workout_days)) != len(workout_days):
+                st.error("❌ Chaque séance doit avoir un jour différent")
+            else:
+                tracker.profile.workout_days = workout_days
+                tracker.save_profile()
+                st.success("✅ Jours mis à jour!")
+                st.rerun()
+
+    with st.expander("🏋️ Barre et disques"):
+        st.caption("Les charges suggérées (autorégulation) sont arrondies à ce que vous pouvez charger : "
+                   "la barre et des paires de disques.")
+        bar_weight = st.number_input("Barre (kg)", min_value=0.0, max_value=50.0,
+                                     value=float(tracker.profile.bar_weight), step=0.5)
+        plates = st.multiselect("Disques disponibles (kg)", PLATE_SIZES,
+                                default=[plate for plate in tracker.profile.plates if plate in PLATE_SIZES])
+        if st.button("💾 Mettre à jour le matériel"):
+            if not plates:
+                st.error("❌ Choisissez au moins un disque")
+            else:
+                tracker.profile.bar_weight = bar_weight
+                tracker.profile.plates = sorted(plates, reverse=True)
+                tracker.save_profile()
+                st.success("✅ Matériel mis à jour!")
+                st.rerun()
+
+    with st.expander("🗄️ Stockage des données"):
+        st.write(f"Backend actuel : **{tracker.storage.name}**")
+        st.write(f"Athlète : **{tracker.athlete or 'par défaut'}** (ajoutez ?athlete=nom à l'URL pour changer)")
+        st.caption("Choisissez le backend avec la variable d'environnement POWERLIFTING_BACKEND "
+                   "(json ou sqlite). Au premier lancement en sqlite, les fichiers JSON existants "
+                   "sont migrés automatiquement. En json, l'historique est enregistré en binaire "
+                   "compact dans workout_data.snap, workout_data.json n'est plus modifié "
+                   "(POWERLIFTING_SNAPSHOT_FORMAT=json pour l'enregistrer en JSON) ; l'export "
+                   "« JSON lisible » ci-dessous en donne une copie lisible.")
+
+    with st.expander("📥 Importer un historique"):
+        st.caption("CSV avec une ligne par série (colonnes date, exercice, poids, reps ; séance, réussie, "
+                   "durée et notes en option) ou JSON lines avec une séance par ligne. Les séances déjà "
+                   "enregistrées sont ignorées.")
+        uploaded = st.file_uploader("Fichier à importer", type=["csv", "tsv", "txt", "jsonl", "ndjson"])
+        if uploaded is not None and st.button("📥 Importer"):
+            progress_bar = st.progress(0.0, text="Import en cours...")
+            try:
+                report = import_stream(tracker, uploaded, detect_format(uploaded.name),
+                                       progress=lambda done: progress_bar.progress(done, text=f"Import : {done:.0%}"))
+            except ValueError as e:
+                st.error(f"❌ Import impossible : {e}")
+            else:
+                st.success(f"✅ {report.imported} séance(s) importée(s), {report.duplicates} doublon(s) ignoré(s)")
+                if report.skipped:
+                    st.warning(f"⚠️ {report.skipped} ligne(s) ignorée(s)")
+                    for error in report.errors:
+                        st.caption(error)
+
+    with st.expander("📤 Exporter l'historique"):
+        export_formats = {"csv": "CSV (une ligne par série)", "jsonl": "JSON lines (une séance par ligne)",
+                          "json": "JSON lisible (indenté)"}
+        if parquet_available():
+            export_formats["parquet"] = "Parquet"
+        export_format = st.radio("Format", list(export_formats), format_func=export_formats.get, horizontal=True)
+        today = datetime.date.today().toordinal()
+        export_period = st.date_input("Période", value=(
+            datetime.date.fromordinal(tracker.aggregates.first_date or today),
+            datetime.date.fromordinal(tracker.aggregates.last_date or today)))
+        export_exercises = st.multiselect("Exercices (tous si vide)", tracker.get_exercise_names())
+        export_start, export_end = (tuple(export_period) + (None, None))[:2]
+        mime, extension = EXPORT_FORMATS[export_format]
+        st.download_button(
+            label="⬇️ Télécharger",
+            # L'historique n'est lu qu'au clic, dans un thread de Streamlit : relu dans le stockage
+            # (read_history), le reste est figé ici par les valeurs par défaut
+            data=lambda read=tracker.read_history, options=(export_format, export_start, export_end,
+                                                            frozenset(export_exercises)):
+                export_sessions(read(), *options),
+            file_name=f"powerlifting_historique_{datetime.date.today()}.{extension}",
+            mime=mime
+        )
+
     # Gestion des données
     st.markdown("### 💾 Gestion des données")
 
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        if st.button("📊 Exporter les données", help="Télécharge tes données en JSON"):
-            # Création du fichier d'export
-            export_data = {
-                "profile": asdict(tracker.profile),
-                "workout_data": {
-                    "start_date": str(tracker.start_date),
-                    "sessions": tracker.sessions
-                },
-                "export_date": str(datetime.date.today())
-            }
-
-            st.download_button(
-                label="⬇️ Télécharger",
-                data=json.dumps(export_data, indent=2),
-                file_name=f"powerlifting_data_{datetime.date.today()}.json",
-                mime="application/json"
-            )
+        # Le fichier n'est généré qu'au clic, pas à chaque rerun (historique relu comme ci-dessus)
+        st.download_button(
+            label="📊 Exporter les données",
+            help="Télécharge tes données en JSON",
+            data=lambda read=tracker.read_history, profile=asdict(tracker.profile), start=str(tracker.start_date):
+                export_backup(profile, start, read()),
+            file_name=f"powerlifting_data_{datetime.date.today()}.json",
+            mime="application/json"
+        )
 
     with col2:
         if st.button("🔄 Réinitialiser les données", help="Supprime toutes les données"):
             if st.button("⚠️ Confirmer la suppression", type="secondary"):
                 # Suppression des fichiers
-                if os.path.exists(tracker.data_file):
-                    os.remove(tracker.data_file)
-                if os.path.exists(tracker.profile_file):
-                    os.remove(tracker.profile_file)
+                tracker.storage.remove_all()
 
                 st.success("✅ Données supprimées!")
                 st.info("🔄 Rechargez la page pour recommencer")
@@ -940,3 +872,20 @@ elif st.session_state.current_page == "⚙️ Paramètres":
 # Footer
 st.markdown("---")
 st.markdown("💪 **Powerlifting Pro** - Votre compagnon d'entraînement de force")
+
+page_timer.stop()
+
+# Panneau de débogage (POWERLIFTING_METRICS=1)
+if metrics.ENABLED:
+    metrics.flush()
+    with st.sidebar.expander("🐞 Métriques", expanded=True):
+        rows = ["| Mesure | Appels | Moy. | p95 | Max |", "|---|---:|---:|---:|---:|"]
+        for row in metrics.METRICS.summary():
+            rows.append(f"| {row['name']} | {row['count']} | {row['mean_ms']:.1f}ms | "
+                        f"{row['p95_ms']:.1f}ms | {row['max_ms']:.1f}ms |")
+        st.markdown("\n".join(rows))
+        for name, count in sorted(metrics.METRICS.bytes.items()):
+            st.caption(f"{name} : {count / 1024:.1f} Kio")
+        if st.button("Réinitialiser les métriques"):
+            metrics.METRICS.reset()
+            st.rerun()
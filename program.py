@@ -0,0 +1,217 @@
+"""Programmes d'entraînement : fichiers déclaratifs compilés en tables de consultation.
+
+Chaque programme est un fichier JSON (ou YAML si PyYAML est installé) du
+dossier ``programs/`` (ou de ``POWERLIFTING_PROGRAMS_DIR``), identifié par
+son nom de fichier sans extension. Au chargement, le fichier est validé puis
+compilé une fois en enregistrements figés (``ProgramExercise``, prescription
+de répétitions analysée) indexés par (jour de la semaine, phase). Les enregistrements sont partagés par toutes les
+sessions : le code qui doit modifier un exercice (ex: bouton d'échec) en fait
+d'abord une copie.
+
+``ProgramLibrary.get`` recompile un programme quand le mtime de son fichier
+change, sans redémarrage. Si la nouvelle version est invalide, l'erreur est
+notée dans ``errors`` et la version précédente reste en service.
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+try:
+    import yaml
+except ImportError:  # programmes YAML ignorés sans PyYAML
+    yaml = None
+
+from model import Prescription, parse_prescription
+
+PROGRAMS_DIR = os.environ.get("POWERLIFTING_PROGRAMS_DIR",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "programs"))
+DEFAULT_PROGRAM = "powerlifting_8_semaines"
+
+
+class ProgramError(ValueError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class ProgramExercise:
+    name: str
+    sets: int
+    reps: str
+    weight: float
+    notes: str = ""
+    prescription: Prescription = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'prescription', parse_prescription(self.reps))
+
+
+@dataclass(frozen=True, eq=False)
+class Program:
+    program_id: str
+    name: str
+    description: str
+    # Phase de chaque semaine du bloc (index 0 = semaine 1)
+    week_phases: Tuple[str, ...]
+    # Séance -> phase -> exercices, en lecture seule
+    workouts: Mapping[str, Mapping[str, Tuple[ProgramExercise, ...]]]
+    # Jour de la semaine (0 = lundi) -> séance, tel que prévu par le fichier
+    default_schedule: Mapping[int, str]
+
+    @property
+    def weeks(self) -> int:
+        return len(self.week_phases)
+
+    @property
+    def workout_names(self) -> List[str]:
+        return list(self.workouts)
+
+    def phase_for_week(self, week: int) -> str:
+        return self.week_phases[min(max(week, 1), self.weeks) - 1]
+
+    def compile(self, schedule: Mapping[int, str]) -> Mapping[Tuple[int, str], Tuple[str, Tuple[ProgramExercise, ...]]]:
+        """Indexe le programme par (jour de la semaine, phase), en lecture seule"""
+        table = {}
+        for weekday, workout_name in schedule.items():
+            for phase, exercises in self.workouts[workout_name].items():
+                table[(weekday, phase)] = (workout_name, exercises)
+        return MappingProxyType(table)
+
+
+def _check(condition: bool, message: str):
+    if not condition:
+        raise ProgramError(message)
+
+
+def _parse_exercise(data, where: str) -> ProgramExercise:
+    _check(isinstance(data, dict), f"{where} : un exercice doit être un objet")
+    unknown = set(data) - {"name", "sets", "reps", "weight", "notes"}
+    _check(not unknown, f"{where} : champs inconnus {sorted(unknown)}")
+    _check(isinstance(data.get("name"), str) and data["name"], f"{where} : 'name' manquant")
+    _check(type(data.get("sets")) is int and data["sets"] > 0, f"{where} : 'sets' doit être un entier positif")
+    _check(isinstance(data.get("reps"), (str, int)), f"{where} : 'reps' manquant")
+    weight = data.get("weight", 0.0)
+    _check(isinstance(weight, (int, float)) and not isinstance(weight, bool) and weight >= 0,
+           f"{where} : 'weight' doit être un nombre positif")
+    _check(isinstance(data.get("notes", ""), str), f"{where} : 'notes' doit être du texte")
+    return ProgramExercise(data["name"], data["sets"], str(data["reps"]), float(weight), data.get("notes", ""))
+
+
+def parse_program(program_id: str, data) -> Program:
+    """Valide le contenu d'un fichier programme et le compile"""
+    _check(isinstance(data, dict), "le programme doit être un objet")
+    _check(isinstance(data.get("name"), str) and data["name"], "'name' manquant")
+
+    phases = data.get("phases")
+    _check(isinstance(phases, dict) and phases, "'phases' doit associer chaque phase à ses semaines")
+    week_phase: Dict[int, str] = {}
+    for phase, weeks in phases.items():
+        _check(isinstance(weeks, list) and weeks and all(type(w) is int and w >= 1 for w in weeks),
+               f"phase {phase} : liste de semaines invalide")
+        for week in weeks:
+            _check(week not in week_phase, f"semaine {week} attribuée à deux phases")
+            week_phase[week] = phase
+    _check(sorted(week_phase) == list(range(1, len(week_phase) + 1)), "les semaines doivent se suivre à partir de 1")
+
+    workouts_data = data.get("workouts")
+    _check(isinstance(workouts_data, list) and workouts_data, "'workouts' doit être une liste non vide")
+    workouts = {}
+    schedule = {}
+    for workout in workouts_data:
+        _check(isinstance(workout, dict) and isinstance(workout.get("name"), str), "séance sans 'name'")
+        name = workout["name"]
+        _check(name not in workouts, f"séance {name} définie deux fois")
+        day = workout.get("day")
+        _check(type(day) is int and 0 <= day <= 6, f"{name} : 'day' doit être entre 0 (lundi) et 6 (dimanche)")
+        _check(day not in schedule, f"{name} : jour {day} déjà pris par {schedule.get(day)}")
+        workout_phases = workout.get("phases")
+        _check(isinstance(workout_phases, dict) and set(workout_phases) == set(phases),
+               f"{name} : il faut des exercices pour chaque phase {sorted(phases)}")
+        workouts[name] = MappingProxyType({
+            phase: tuple(_parse_exercise(ex, f"{name} / {phase} / exercice {i + 1}")
+                         for i, ex in enumerate(workout_phases[phase]))
+            for phase in phases
+        })
+        schedule[day] = name
+
+    return Program(
+        program_id=program_id,
+        name=data["name"],
+        description=data.get("description", ""),
+        week_phases=tuple(week_phase[week] for week in sorted(week_phase)),
+        workouts=MappingProxyType(workouts),
+        default_schedule=MappingProxyType(dict(sorted(schedule.items()))),
+    )
+
+
+def _extensions() -> Tuple[str, ...]:
+    return (".json", ".yaml", ".yml") if yaml is not None else (".json",)
+
+
+def load_program_file(path: str) -> Program:
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f) if path.endswith(".json") else yaml.safe_load(f)
+        except Exception as e:  # json.JSONDecodeError, yaml.YAMLError
+            raise ProgramError(f"fichier illisible : {e}") from e
+    program_id = os.path.splitext(os.path.basename(path))[0]
+    return parse_program(program_id, data)
+
+
+class ProgramLibrary:
+    """Programmes d'un dossier, compilés à la demande et rechargés si le fichier change"""
+
+    def __init__(self, directory: str = PROGRAMS_DIR):
+        self.directory = directory
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._programs: Dict[str, Tuple[Tuple[str, int, int], Program]] = {}
+
+    def _path(self, program_id: str) -> Optional[str]:
+        for extension in _extensions():
+            path = os.path.join(self.directory, program_id + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def ids(self) -> List[str]:
+        """Identifiants des programmes disponibles"""
+        try:
+            files = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted({os.path.splitext(f)[0] for f in files
+                       if f.endswith(_extensions()) and not f.startswith(".")})
+
+    def get(self, program_id: str) -> Program:
+        path = self._path(program_id)
+        with self._lock:
+            cached = self._programs.get(program_id)
+            if path is None:
+                if cached is not None:
+                    return cached[1]  # fichier supprimé : on garde la dernière version
+                raise ProgramError(f"programme inconnu : {program_id}")
+            stat = os.stat(path)
+            state = (path, stat.st_mtime_ns, stat.st_size)
+            if cached is not None and cached[0] == state:
+                return cached[1]
+            try:
+                program = load_program_file(path)
+            except ProgramError as e:
+                self.errors[program_id] = str(e)
+                if cached is not None:
+                    return cached[1]
+                raise ProgramError(f"{program_id} : {e}") from e
+            self.errors.pop(program_id, None)
+            self._programs[program_id] = (state, program)
+            return program
+
+
+LIBRARY = ProgramLibrary()
+
+
+def get_program(program_id: str = "") -> Program:
+    """Programme ``program_id`` (ou celui par défaut), à jour du fichier"""
+    return LIBRARY.get(program_id or DEFAULT_PROGRAM)
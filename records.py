@@ -0,0 +1,171 @@
+"""Records personnels par exercice, tenus à jour série par série.
+
+Pour chaque exercice :
+
+- meilleure charge pour 1 à ``MAX_REPS`` répétitions. Une série de 5 à
+  100 kg vaut aussi pour 1 à 4 répétitions : la table est décroissante, et
+  une série ne met à jour que les cases qu'elle bat (on s'arrête à la
+  première case qui tient) ;
+- meilleur 1RM estimé (Epley) et meilleure série en volume (charge × reps),
+  avec la série et la date correspondantes.
+
+Seules les séries réussies comptent ; un exercice réussi sans série réussie
+aux répétitions saisies (pas de séries détaillées, ou "Tout réussi" sans
+saisie) compte pour le poids et les répétitions prescrits, les exercices au
+temps et au poids du corps sont ignorés. L'index est construit une fois sur
+l'historique puis mis à jour à chaque séance enregistrée.
+
+``ExerciseRecords.add`` renvoie les records battus par une série : pendant
+la séance, on les signale en direct en ajoutant les séries cochées à une
+copie (``RecordIndex.live``), sans toucher à l'index.
+
+Les records des séances archivées sont enregistrés avec l'archive
+(``to_json``, voir ``storage.py``) : l'index de tout l'historique part de
+ceux-ci et n'ajoute que les séances chargées, sans relire l'archive. Une
+série ajoutée deux fois ne change rien (seules les valeurs strictement
+meilleures remplacent), le recouvrement éventuel est donc sans effet.
+Quand ces règles changent, ``RECORDS_VERSION`` augmente : les records
+enregistrés avec une autre version sont recalculés depuis l'archive.
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from model import TIME, SessionRecord
+
+MAX_REPS = 12
+# Version des règles de calcul des records enregistrés avec l'archive
+RECORDS_VERSION = 2
+
+# (poids, reps, ordinal de la date)
+RecordSet = Tuple[float, int, int]
+
+
+class ExerciseRecords:
+    __slots__ = ("weights", "dates", "best_e1rm", "e1rm_set", "best_volume", "volume_set")
+
+    def __init__(self):
+        # Case r - 1 : meilleure charge pour r répétitions (0 : aucune série)
+        self.weights = array('d', bytes(8 * MAX_REPS))
+        self.dates = array('i', bytes(4 * MAX_REPS))
+        self.best_e1rm = 0.0
+        self.e1rm_set: RecordSet = (0.0, 0, 0)
+        self.best_volume = 0.0
+        self.volume_set: RecordSet = (0.0, 0, 0)
+
+    def copy(self) -> "ExerciseRecords":
+        copy = ExerciseRecords()
+        copy.weights, copy.dates = array('d', self.weights), array('i', self.dates)
+        copy.best_e1rm, copy.e1rm_set = self.best_e1rm, self.e1rm_set
+        copy.best_volume, copy.volume_set = self.best_volume, self.volume_set
+        return copy
+
+    def add(self, weight: float, reps: int, date: int) -> List[str]:
+        """Prend en compte une série réussie ; renvoie les records battus ("3RM", "1RM estimé", "volume")"""
+        if weight <= 0 or reps <= 0:
+            return []
+        beaten = []
+        weights = self.weights
+        for count in range(min(reps, MAX_REPS), 0, -1):
+            if weight <= weights[count - 1]:
+                break  # les cases suivantes sont au moins aussi lourdes
+            weights[count - 1] = weight
+            self.dates[count - 1] = date
+            beaten.append(f"{count}RM")
+        beaten.reverse()
+        e1rm = weight if reps == 1 else weight * (1 + reps / 30.0)
+        if e1rm > self.best_e1rm:
+            self.best_e1rm, self.e1rm_set = e1rm, (weight, reps, date)
+            beaten.append("1RM estimé")
+        volume = weight * reps
+        if volume > self.best_volume:
+            self.best_volume, self.volume_set = volume, (weight, reps, date)
+            beaten.append("volume")
+        return beaten
+
+    def to_json(self) -> Dict:
+        return {'weights': list(self.weights), 'dates': list(self.dates),
+                'e1rm': [self.best_e1rm, *self.e1rm_set], 'volume': [self.best_volume, *self.volume_set]}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "ExerciseRecords":
+        records = cls()
+        records.weights, records.dates = array('d', data['weights']), array('i', data['dates'])
+        best_e1rm, *e1rm_set = data['e1rm']
+        best_volume, *volume_set = data['volume']
+        records.best_e1rm, records.e1rm_set = best_e1rm, tuple(e1rm_set)
+        records.best_volume, records.volume_set = best_volume, tuple(volume_set)
+        return records
+
+    def rep_max(self, reps: int) -> Optional[float]:
+        weight = self.weights[reps - 1]
+        return weight if weight > 0 else None
+
+
+class RecordIndex:
+    """Exercice -> records, mis à jour séance par séance"""
+
+    def __init__(self):
+        self._exercises: Dict[str, ExerciseRecords] = {}
+
+    def build(self, sessions: Iterable[SessionRecord]):
+        self._exercises = {}
+        for session in sessions:
+            self.add_session(session)
+
+    def add(self, exercise_name: str, weight: float, reps: int, date: int):
+        """Prend en compte une série réussie (séries agrégées par le stockage)"""
+        records = self._exercises.get(exercise_name)
+        if records is None:
+            records = self._exercises[exercise_name] = ExerciseRecords()
+        records.add(weight, reps, date)
+
+    def add_session(self, session: SessionRecord):
+        date = session.date
+        for ex in session.exercises:
+            if ex.prescription.kind == TIME:
+                continue
+            records = self._exercises.get(ex.name)
+            if records is None:
+                records = self._exercises[ex.name] = ExerciseRecords()
+            performed = False
+            for weight, reps, completed in ex.iter_sets():
+                if completed and reps > 0:
+                    records.add(weight, reps, date)
+                    performed = True
+            if not performed and ex.status == 'completed':
+                # Sans répétitions saisies (pas de séries détaillées, "Tout réussi") : poids et reps prescrits
+                records.add(ex.weight, ex.prescription.rep_count, date)
+
+    def to_json(self) -> Dict[str, Dict]:
+        """Records des exercices qui en ont, pour les métadonnées de l'archive"""
+        return {name: records.to_json() for name, records in self._exercises.items() if records.best_e1rm > 0}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Dict]) -> "RecordIndex":
+        index = cls()
+        index._exercises = {name: ExerciseRecords.from_json(records) for name, records in data.items()}
+        return index
+
+    def get(self, exercise_name: str) -> Optional[ExerciseRecords]:
+        records = self._exercises.get(exercise_name)
+        return records if records is not None and records.best_e1rm > 0 else None
+
+    def live(self, exercise_name: str) -> ExerciseRecords:
+        """Copie des records de l'exercice, à laquelle ajouter les séries de la séance en cours"""
+        records = self._exercises.get(exercise_name)
+        return records.copy() if records is not None else ExerciseRecords()
+
+    def table(self) -> List[Dict]:
+        """Une ligne par exercice ayant au moins un record, par ordre alphabétique"""
+        rows = []
+        for name in sorted(self._exercises):
+            records = self._exercises[name]
+            if records.best_e1rm <= 0:
+                continue
+            row = {'exercise': name}
+            for reps in range(1, MAX_REPS + 1):
+                row[f"{reps}RM"] = records.rep_max(reps)
+            row['e1rm'] = records.best_e1rm
+            row['volume'] = records.best_volume
+            rows.append(row)
+        return rows
@@ -0,0 +1,115 @@
+"""Calendrier du bloc d'entraînement, précalculé à chaque changement de date de début.
+
+Le bloc (les semaines du programme à partir de la date de début) est déroulé
+une fois en une liste triée de séances planifiées (date, séance, semaine,
+phase). Les requêtes par intervalle (prochaines séances, séances d'une
+semaine, séances manquées) sont des tranches de cette liste, trouvées par
+dichotomie.
+
+Comme avant, les dates hors du bloc reprennent la première semaine (avant
+le début) ou la dernière (après la fin).
+
+Le jour de chaque séance vient d'un dictionnaire jour de la semaine -> nom de
+séance (celui du fichier programme par défaut), qui peut être personnalisé.
+"""
+import bisect
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from program import Program, ProgramExercise
+
+WEEKDAY_NAMES = ("Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche")
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduledWorkout:
+    date: datetime.date
+    week: int
+    phase: str
+    workout_name: str
+    exercises: Tuple[ProgramExercise, ...]
+
+
+def schedule_from_days(workout_days: Iterable[int], program: Program) -> Dict[int, str]:
+    """Associe les séances du programme (A, B, C, ...) aux jours donnés, dans l'ordre"""
+    days = list(workout_days)
+    workout_names = list(program.default_schedule.values())
+    if len(days) != len(workout_names) or len(set(days)) != len(days) or not all(0 <= d <= 6 for d in days):
+        raise ValueError(f"Il faut {len(workout_names)} jours distincts entre 0 (lundi) et 6 (dimanche)")
+    return dict(zip(days, workout_names))
+
+
+class TrainingCalendar:
+    def __init__(self, start_date: datetime.date, program: Program, schedule: Optional[Mapping[int, str]] = None):
+        self.start_date = start_date
+        self.program = program
+        self.schedule = dict(program.default_schedule if schedule is None else schedule)
+        self.weeks = weeks = program.weeks
+        self.end_date = start_date + datetime.timedelta(weeks=weeks)
+        self.table = program.compile(self.schedule)
+
+        # Déroulé du bloc : une entrée par jour d'entraînement, dans l'ordre des dates
+        self.workouts: List[ScheduledWorkout] = []
+        for offset in range(7 * weeks):
+            date = start_date + datetime.timedelta(days=offset)
+            workout = self._build(date, offset // 7 + 1)
+            if workout is not None:
+                self.workouts.append(workout)
+        self._offsets = [(w.date - start_date).days for w in self.workouts]
+
+    def _build(self, date: datetime.date, week: int) -> Optional[ScheduledWorkout]:
+        phase = self.program.phase_for_week(week)
+        entry = self.table.get((date.weekday(), phase))
+        if entry is None:
+            return None
+        workout_name, exercises = entry
+        return ScheduledWorkout(date, week, phase, workout_name, exercises)
+
+    def _outside(self, start: datetime.date, end: datetime.date) -> List[ScheduledWorkout]:
+        """Séances des jours [start, end] hors du bloc (première ou dernière semaine selon le côté)"""
+        workouts = []
+        date = start
+        while date <= end:
+            workout = self._build(date, 1 if date < self.start_date else self.weeks)
+            if workout is not None:
+                workouts.append(workout)
+            date += datetime.timedelta(days=1)
+        return workouts
+
+    def week_for(self, date: datetime.date) -> int:
+        return min(max((date - self.start_date).days // 7 + 1, 1), self.weeks)
+
+    def workout_on(self, date: datetime.date) -> Optional[ScheduledWorkout]:
+        if not self.start_date <= date < self.end_date:
+            return self._build(date, self.week_for(date))
+        offset = (date - self.start_date).days
+        index = bisect.bisect_left(self._offsets, offset)
+        if index < len(self._offsets) and self._offsets[index] == offset:
+            return self.workouts[index]
+        return None
+
+    def between(self, start: datetime.date, end: datetime.date) -> List[ScheduledWorkout]:
+        """Séances planifiées du ``start`` au ``end`` inclus"""
+        if end < start:
+            return []
+        last_day = self.end_date - datetime.timedelta(days=1)
+        before = self._outside(start, min(end, self.start_date - datetime.timedelta(days=1)))
+        after = self._outside(max(start, self.end_date), end)
+        lo = bisect.bisect_left(self._offsets, (max(start, self.start_date) - self.start_date).days)
+        hi = bisect.bisect_right(self._offsets, (min(end, last_day) - self.start_date).days)
+        return before + self.workouts[lo:hi] + after
+
+    def next_workouts(self, from_date: datetime.date, days_ahead: int) -> List[ScheduledWorkout]:
+        """Séances des ``days_ahead`` jours suivant ``from_date``"""
+        return self.between(from_date + datetime.timedelta(days=1), from_date + datetime.timedelta(days=days_ahead))
+
+    def week(self, week: int) -> List[ScheduledWorkout]:
+        start = self.start_date + datetime.timedelta(weeks=week - 1)
+        return self.between(start, start + datetime.timedelta(days=6))
+
+    def missed(self, done_days: Iterable[int], until: datetime.date) -> List[ScheduledWorkout]:
+        """Séances du bloc antérieures à ``until`` sans séance enregistrée ce jour-là (ordinaux)"""
+        done = set(done_days)
+        last_day = min(until, self.end_date) - datetime.timedelta(days=1)
+        return [w for w in self.between(self.start_date, last_day) if w.date.toordinal() not in done]
@@ -0,0 +1,225 @@
+"""Scores de force relatifs au poids de corps : DOTS, Wilks (2020) et IPF GL.
+
+Les trois formules sont vectorisées : un appel score des tableaux de totaux,
+de poids de corps et de sexes (``female``) de même taille, qu'il s'agisse de
+l'historique d'un athlète ou de milliers d'athlètes à classer.
+
+- DOTS : ``total × 500 / polynôme de degré 4`` ;
+- Wilks 2020 : ``total × 600 / polynôme de degré 5`` ;
+- IPF GL (force athlétique sans équipement) : ``total × 100 / (A - B·e^(-C·pdc))``.
+
+Le total est la somme des meilleurs 1RM estimés (Epley) au squat, au
+développé couché et au soulevé de terre (``LIFTS``), à date : il n'existe
+qu'une fois les trois mouvements enregistrés. Chaque total de l'historique
+est scoré avec la pesée la plus proche dans le temps (``measurements`` du
+profil), à défaut avec le poids du profil.
+
+Classement : ``rank_athletes`` lit les records de chaque athlète (dossier
+``athletes/``) puis score tout le monde en un seul appel ;
+``python scoring.py rank`` l'affiche en ligne de commande.
+"""
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from model import SET_DTYPE, SET_STRUCT, TIME, SessionRecord
+
+# Mouvements du total : clé de l'objectif dans le profil -> nom de l'exercice
+LIFTS = {"squat_1rm": "Squat", "bench_1rm": "Bench Press", "deadlift_1rm": "Deadlift"}
+SCORES = ("dots", "wilks", "ipf_gl")
+SCORE_LABELS = {"dots": "DOTS", "wilks": "Wilks 2020", "ipf_gl": "IPF GL"}
+
+# Coefficients (hommes, femmes), du degré 0 au degré le plus haut, et bornes du poids de corps
+DOTS_COEFFICIENTS = (
+    (-307.75076, 24.0900756, -0.1918759221, 0.0007391293, -0.000001093),
+    (-57.96288, 13.6175032, -0.1126655495, 0.0005158568, -0.0000010706),
+)
+DOTS_BODYWEIGHT = ((40.0, 210.0), (40.0, 150.0))
+WILKS_COEFFICIENTS = (
+    (47.46178854, 8.472061379, 0.07369410346, -0.001395833811, 7.07665973070743e-06, -1.20804336482315e-08),
+    (-125.4255398, 13.71219419, -0.03307250631, -0.001050400051, 9.38773881462799e-06, -2.3334613884954e-08),
+)
+WILKS_BODYWEIGHT = ((40.0, 200.95), (40.0, 150.95))
+IPF_GL_COEFFICIENTS = ((1199.72839, 1025.18162, 0.00921), (610.32796, 1045.59282, 0.03048))
+IPF_GL_MIN_BODYWEIGHT = 35.0
+
+
+def _by_sex(female: np.ndarray, men, women) -> np.ndarray:
+    return np.where(female, women, men)
+
+
+def _polynomial(coefficients, bodyweight: np.ndarray, female: np.ndarray) -> np.ndarray:
+    """Polynôme des coefficients hommes ou femmes, évalué par la méthode de Horner"""
+    men, women = (np.asarray(c, dtype=float) for c in coefficients)
+    result = np.zeros_like(bodyweight)
+    for degree in range(len(men) - 1, -1, -1):
+        result = result * bodyweight + _by_sex(female, men[degree], women[degree])
+    return result
+
+
+def _clip(bodyweight: np.ndarray, female: np.ndarray, bounds) -> np.ndarray:
+    (men_low, men_high), (women_low, women_high) = bounds
+    return np.clip(bodyweight, _by_sex(female, men_low, women_low), _by_sex(female, men_high, women_high))
+
+
+def _arrays(total, bodyweight, female):
+    total = np.asarray(total, dtype=float)
+    bodyweight = np.broadcast_to(np.asarray(bodyweight, dtype=float), total.shape)
+    female = np.broadcast_to(np.asarray(female, dtype=bool), total.shape)
+    return total, bodyweight, female
+
+
+def dots(total, bodyweight, female=False) -> np.ndarray:
+    total, bodyweight, female = _arrays(total, bodyweight, female)
+    bodyweight = _clip(bodyweight, female, DOTS_BODYWEIGHT)
+    return total * 500.0 / _polynomial(DOTS_COEFFICIENTS, bodyweight, female)
+
+
+def wilks(total, bodyweight, female=False) -> np.ndarray:
+    """Wilks révisé (2020)"""
+    total, bodyweight, female = _arrays(total, bodyweight, female)
+    bodyweight = _clip(bodyweight, female, WILKS_BODYWEIGHT)
+    return total * 600.0 / _polynomial(WILKS_COEFFICIENTS, bodyweight, female)
+
+
+def ipf_gl(total, bodyweight, female=False) -> np.ndarray:
+    """Points IPF GL, force athlétique sans équipement (0 sous ``IPF_GL_MIN_BODYWEIGHT``)"""
+    total, bodyweight, female = _arrays(total, bodyweight, female)
+    (a_men, b_men, c_men), (a_women, b_women, c_women) = IPF_GL_COEFFICIENTS
+    denominator = (_by_sex(female, a_men, a_women)
+                   - _by_sex(female, b_men, b_women) * np.exp(-_by_sex(female, c_men, c_women) * bodyweight))
+    return np.where(bodyweight < IPF_GL_MIN_BODYWEIGHT, 0.0, total * 100.0 / denominator)
+
+
+SCORE_FUNCTIONS = {"dots": dots, "wilks": wilks, "ipf_gl": ipf_gl}
+
+
+def score_all(total, bodyweight, female=False) -> Dict[str, np.ndarray]:
+    """Les trois scores en une passe (NaN là où le total est NaN)"""
+    return {name: function(total, bodyweight, female) for name, function in SCORE_FUNCTIONS.items()}
+
+
+def nearest_bodyweight(dates: np.ndarray, measurements: List[Dict], default: float) -> np.ndarray:
+    """Pesée la plus proche de chaque date (``datetime64[D]``) ; ``default`` sans pesée"""
+    weighings = sorted((np.datetime64(m['date'], 'D'), m['weight'])
+                       for m in measurements if m.get('type', 'weight') == 'weight')
+    if not weighings:
+        return np.full(len(dates), float(default))
+    days = np.array([date for date, _ in weighings], dtype='datetime64[D]')
+    weights = np.array([weight for _, weight in weighings], dtype=float)
+    after = np.clip(np.searchsorted(days, dates), 0, len(days) - 1)
+    before = np.clip(after - 1, 0, len(days) - 1)
+    closer_before = np.abs(dates - days[before]) <= np.abs(days[after] - dates)
+    return weights[np.where(closer_before, before, after)]
+
+
+def score_history(lifts: Sequence[Dict[str, np.ndarray]], measurements: List[Dict], bodyweight: float,
+                  female: bool = False) -> Dict[str, np.ndarray]:
+    """Total et scores à chaque date où l'un des mouvements du total a été enregistré
+
+    ``lifts`` : pour chaque mouvement, les séries réussies (``date`` et
+    ``epley`` de ``PowerliftingTracker.get_set_estimates``). Le total
+    retient le meilleur 1RM estimé de chaque mouvement à date ; les dates
+    antérieures au premier total complet sont omises.
+    """
+    dates = np.unique(np.concatenate([lift['date'] for lift in lifts]))
+    total = np.zeros(len(dates))
+    for lift in lifts:
+        if len(lift['date']) == 0:
+            total[:] = np.nan
+            continue
+        order = np.argsort(lift['date'], kind='stable')
+        best = np.maximum.accumulate(np.nan_to_num(lift['epley'][order], nan=0.0))
+        position = np.searchsorted(lift['date'][order], dates, side='right') - 1
+        # Meilleur 1RM estimé à date ; NaN avant la première série du mouvement
+        total += np.where(position >= 0, best[np.maximum(position, 0)], np.nan)
+    complete = ~np.isnan(total) & (total > 0)
+    dates, total = dates[complete], total[complete]
+    weights = nearest_bodyweight(dates, measurements, bodyweight)
+    history = {'date': dates, 'total': total, 'bodyweight': weights}
+    history.update(score_all(total, weights, female))
+    return history
+
+
+def best_lifts(sessions: Iterable[SessionRecord]) -> Dict[str, float]:
+    """Meilleur 1RM estimé (Epley) de chaque mouvement du total, NaN s'il n'a pas été fait
+
+    Mêmes règles que ``records.RecordIndex`` (séries réussies ; sans série
+    réussie aux répétitions saisies, poids et reps prescrits d'un exercice
+    réussi), mais seuls les trois mouvements sont lus : leurs séries sont
+    décodées en un tableau.
+    """
+    packed: Dict[str, List[bytes]] = {name: [] for name in LIFTS.values()}
+    for session in sessions:
+        for ex in session.exercises:
+            parts = packed.get(ex.name)
+            if parts is None or ex.prescription.kind == TIME:
+                continue
+            parts.append(ex.packed_sets)
+            if ex.status == 'completed' and not any(completed and reps > 0
+                                                    for _, reps, completed in ex.iter_sets()):
+                parts.append(SET_STRUCT.pack(ex.weight, ex.prescription.rep_count, True))
+    best = {}
+    for name, parts in packed.items():
+        sets = np.frombuffer(b"".join(parts), dtype=SET_DTYPE)
+        sets = sets[sets['completed'] & (sets['reps'] > 0) & (sets['weight'] > 0)]
+        reps = sets['reps'].astype(float)
+        e1rm = np.where(reps == 1, sets['weight'], sets['weight'] * (1 + reps / 30.0))
+        best[name] = float(e1rm.max()) if len(e1rm) else np.nan
+    return best
+
+
+def _athlete_record(athlete: str, backend: Optional[str]) -> Dict:
+    """Profil et meilleur 1RM estimé de chaque mouvement du total, lus sans stockage partagé
+
+    Lecture seule : les fichiers de l'athlète ne sont ni migrés, ni compactés.
+    """
+    from storage import athlete_paths, open_storage
+
+    storage = open_storage(backend, *athlete_paths(athlete, create=False), read_only=True)
+    profile = storage.load_profile() or {}
+    _, sessions = storage.load_data()
+    return {'athlete': athlete or profile.get('name') or "(par défaut)", 'name': profile.get('name', ""),
+            'sex': profile.get('sex', "M"), 'bodyweight': profile.get('weight', np.nan), **best_lifts(sessions)}
+
+
+def rank_athletes(athletes: Optional[List[str]] = None, backend: Optional[str] = None,
+                  score: str = "dots") -> List[Dict]:
+    """Classement des athlètes par ``score`` décroissant (tous ceux de ``athletes/`` par défaut)
+
+    Les athlètes sans l'un des trois mouvements n'ont pas de total : ils
+    sont listés à la fin, sans rang.
+    """
+    from storage import list_athletes
+
+    if score not in SCORE_FUNCTIONS:
+        raise ValueError(f"score inconnu : {score}")
+    rows = [_athlete_record(athlete, backend) for athlete in (list_athletes() if athletes is None else athletes)]
+    if not rows:
+        return []
+    total = np.array([sum(row[name] for name in LIFTS.values()) for row in rows], dtype=float)
+    bodyweight = np.array([row['bodyweight'] for row in rows], dtype=float)
+    female = np.array([row['sex'] == "F" for row in rows])
+    scores = score_all(total, bodyweight, female)
+    for index, row in enumerate(rows):
+        row['total'] = total[index]
+        for name in SCORES:
+            row[name] = scores[name][index]
+    order = np.argsort(np.nan_to_num(-scores[score], nan=np.inf), kind='stable')  # sans total : à la fin
+    ranked = [rows[index] for index in order]
+    for position, row in enumerate(ranked, start=1):
+        row['rank'] = position if not np.isnan(row[score]) else None
+    return ranked
+
+
+if __name__ == "__main__":
+    # python scoring.py rank [dots|wilks|ipf_gl]
+    if len(sys.argv) >= 2 and sys.argv[1] == "rank":
+        chosen = sys.argv[2] if len(sys.argv) >= 3 else "dots"
+        for row in rank_athletes(score=chosen):
+            rank = f"{row['rank']:>4}" if row['rank'] else "   -"
+            print(f"{rank}  {row['athlete']:<24} {row['bodyweight']:>6.1f}kg  total {row['total']:>6.1f}kg  "
+                  + "  ".join(f"{SCORE_LABELS[name]} {row[name]:>6.1f}" for name in SCORES))
+    else:
+        print("Usage: python scoring.py rank [dots|wilks|ipf_gl]")
@@ -0,0 +1,1202 @@
+"""Persistance des séances et du profil.
+
+Deux backends interchangeables exposent la même interface :
+
+- ``JsonStorage`` : snapshot + journal en ajout seul. Chaque séance
+  terminée est ajoutée en une ligne au journal, au lieu de réécrire tout
+  l'historique. Le journal est replié périodiquement dans le snapshot par un
+  thread de compaction ; toutes les réécritures passent par un fichier
+  temporaire + ``os.replace`` pour qu'un crash ne laisse jamais un fichier à
+  moitié écrit.
+- ``SqliteStorage`` : tables normalisées séances / exercices / séries, avec
+  un index (nom d'exercice, date) qui sert les exercices de l'archive.
+
+Chargement fenêtré : ``load_recent`` ne renvoie que les séances depuis
+``POWERLIFTING_HISTORY_WEEKS`` semaines (8 par défaut) avant le début du
+bloc, avec les compteurs, les records (``archived_records``) et les noms
+d'exercices (``archived_exercise_names``) de l'historique plus ancien. Cet
+historique archivé n'est lu qu'à la demande (``load_archive`` :
+statistiques, exports).
+Côté JSON, la compaction déplace les séances trop anciennes dans un fichier
+d'archive en ajout seul ; côté SQLite, la fenêtre est une simple condition
+sur la date. ``POWERLIFTING_HISTORY_WEEKS=all``
+désactive l'archive.
+
+En mémoire, les séances sont des ``SessionRecord`` (voir ``model.py``) : la
+conversion depuis / vers le format disque se fait à la lecture et à l'écriture.
+
+Format disque (voir ``codec.py``) : snapshot et archive binaires par défaut,
+ou JSON compact (``POWERLIFTING_SNAPSHOT_FORMAT=json``), reconnus à la
+lecture ; le journal et le profil restent en JSON. Le snapshot binaire a son
+propre fichier (``workout_data.snap``) : ``workout_data.json`` n'est jamais
+réécrit en binaire, il reste lisible et sert de source à la conversion.
+
+Le backend est choisi par la variable d'environnement ``POWERLIFTING_BACKEND``
+(``json`` par défaut, ou ``sqlite``).
+"""
+import copy
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrous de thread uniquement
+    fcntl = None
+
+import codec
+import metrics
+from model import (SET_STRUCT, TIME, ExerciseRecord, SessionRecord, parse_prescription, session_from_dict,
+                   session_to_dict, to_iso, to_ordinal)
+from records import RECORDS_VERSION, RecordIndex
+
+# Nombre d'entrées du journal au-delà duquel on lance une compaction
+COMPACT_THRESHOLD = 50
+# ... et part minimale de l'historique qu'elles doivent représenter : une
+# compaction réécrit tout l'historique, elle ne doit pas revenir tous les
+# 50 ajouts pendant un import de milliers de séances
+COMPACT_RATIO = 0.1
+
+# Semaines d'historique chargées avant le début du bloc ("all" : pas d'archive)
+_history_weeks = os.environ.get("POWERLIFTING_HISTORY_WEEKS", "8")
+HISTORY_WEEKS: Optional[int] = None if _history_weeks == "all" else int(_history_weeks)
+
+
+def archive_cutoff(start_date: Optional[str]) -> Optional[int]:
+    """Ordinal du jour avant lequel les séances sont archivées (None : tout est chargé)"""
+    if HISTORY_WEEKS is None or not start_date:
+        return None
+    return to_ordinal(start_date) - 7 * HISTORY_WEEKS
+
+
+@dataclass
+class SessionAggregates:
+    """Compteurs globaux maintenus au fil des séances (cartes de vue d'ensemble)"""
+    total_sessions: int = 0
+    completed_sessions: int = 0
+    total_duration: int = 0
+    total_exercises: int = 0
+    completed_exercises: int = 0
+    # Ordinaux de la première et de la dernière séance (0 : aucune)
+    first_date: int = 0
+    last_date: int = 0
+
+    @classmethod
+    def from_sessions(cls, sessions: List[SessionRecord]) -> "SessionAggregates":
+        aggregates = cls()
+        for session in sessions:
+            aggregates.add(session)
+        return aggregates
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "SessionAggregates":
+        dates = {key: to_ordinal(data[key]) if data.get(key) else 0 for key in ('first_date', 'last_date')}
+        return cls(**dict(data, **dates))
+
+    def to_json(self) -> Dict:
+        return {
+            'total_sessions': self.total_sessions,
+            'completed_sessions': self.completed_sessions,
+            'total_duration': self.total_duration,
+            'total_exercises': self.total_exercises,
+            'completed_exercises': self.completed_exercises,
+            'first_date': to_iso(self.first_date) if self.first_date else "",
+            'last_date': to_iso(self.last_date) if self.last_date else "",
+        }
+
+    def add(self, session: SessionRecord):
+        exercises = session.exercises
+        self.total_sessions += 1
+        self.completed_sessions += 1 if session.completed else 0
+        self.total_duration += session.duration_minutes
+        self.total_exercises += len(exercises)
+        self.completed_exercises += sum(1 for ex in exercises if ex.status == 'completed')
+        if not self.first_date or session.date < self.first_date:
+            self.first_date = session.date
+        self.last_date = max(self.last_date, session.date)
+
+    def merge(self, other: "SessionAggregates") -> "SessionAggregates":
+        """Compteurs de deux parties disjointes de l'historique (archive + séances récentes)"""
+        return SessionAggregates(
+            total_sessions=self.total_sessions + other.total_sessions,
+            completed_sessions=self.completed_sessions + other.completed_sessions,
+            total_duration=self.total_duration + other.total_duration,
+            total_exercises=self.total_exercises + other.total_exercises,
+            completed_exercises=self.completed_exercises + other.completed_exercises,
+            first_date=min(filter(None, (self.first_date, other.first_date)), default=0),
+            last_date=max(self.last_date, other.last_date),
+        )
+
+    @property
+    def avg_duration(self) -> float:
+        return self.total_duration / self.total_sessions if self.total_sessions > 0 else 0
+
+    @property
+    def success_rate(self) -> float:
+        return (self.completed_exercises / self.total_exercises * 100) if self.total_exercises > 0 else 0
+
+
+def atomic_write(path: str, payload: Union[str, bytes]):
+    """Écrit un fichier de façon atomique (tmp + fsync + rename)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", dir=directory)
+    try:
+        # mkstemp crée le fichier en 0600 : on garde les droits du fichier remplacé
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb' if isinstance(payload, bytes) else 'w') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            metrics.add_bytes("storage.written", f.tell())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str):
+    """Verrou exclusif inter-processus sur ``path`` (fcntl si disponible)"""
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _file_state(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def binary_snapshot_path(data_file: str) -> str:
+    """Snapshot binaire associé à ``workout_data.json`` : ``workout_data.snap``"""
+    return os.path.splitext(data_file)[0] + ".snap"
+
+
+class SessionJournal:
+    """Snapshot ``workout_data.snap`` (binaire) ou ``workout_data.json`` + journal ``workout_data.journal``
+
+    Une instance est partagée par toutes les sessions Streamlit du processus.
+    Les écritures prennent un verrou de thread et un verrou de fichier, puis
+    relisent l'état disque s'il a changé (autre processus) avant d'écrire :
+    aucune séance écrite par quelqu'un d'autre n'est écrasée.
+
+    Les séances antérieures à ``archive_cutoff`` sont déplacées par la
+    compaction dans ``workout_data.archive.bin`` (blocs binaires) ou
+    ``workout_data.archive.jsonl`` (une séance par ligne). Le snapshot garde
+    le format et la taille valide de ce fichier, les compteurs, les records
+    (``records.RecordIndex``) et les noms d'exercices des séances archivées :
+    l'archive n'est relue que par ``load_archive``, et par la compaction d'une
+    archive écrite sans ses records.
+
+    Snapshot et archive sont écrits au format ``fmt`` ; ceux écrits dans un
+    autre format (ou un schéma antérieur) sont relus tels quels puis
+    convertis par une compaction lancée au chargement. Le ``.snap`` est lu
+    s'il existe : la conversion vers le binaire laisse ``workout_data.json``
+    intact, celle vers le JSON réécrit ``workout_data.json`` puis supprime le
+    ``.snap``.
+    """
+
+    def __init__(self, data_file: str, compact_threshold: int = COMPACT_THRESHOLD,
+                 fmt: str = codec.SNAPSHOT_FORMAT, read_only: bool = False):
+        self.data_file = data_file
+        self.read_only = read_only  # jamais de compaction (lecture des données d'un autre athlète)
+        self.snapshot_file = binary_snapshot_path(data_file)
+        self.journal_file = os.path.splitext(data_file)[0] + ".journal"
+        self.lock_file = os.path.splitext(data_file)[0] + ".lock"
+        self.compact_threshold = compact_threshold
+        self.format = fmt
+        self._lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        self._seq = 0            # dernier numéro attribué dans le journal
+        self._snapshot_seq = 0   # dernier numéro déjà replié dans le snapshot
+        self._start_date: Optional[str] = None
+        self._sessions: List[SessionRecord] = []
+        self._archived = SessionAggregates()  # compteurs des séances archivées
+        self._archived_records: Optional[Dict] = None  # records des séances archivées (JSON)
+        self._archived_names: Optional[List[str]] = None  # exercices des séances archivées, triés
+        self._archive_bytes = 0  # taille valide du fichier d'archive
+        self._archive_format = fmt
+        self._archive_cache: Optional[Tuple[Tuple, List[SessionRecord]]] = None
+        self._snapshot_format = fmt
+        self._state = None       # (mtime, taille) des fichiers au dernier chargement
+        self.generation = 0      # incrémenté à chaque changement de l'historique
+
+    @property
+    def sessions(self) -> List[SessionRecord]:
+        return self._sessions
+
+    @property
+    def start_date(self) -> Optional[str]:
+        return self._start_date
+
+    def _archive_path(self, fmt: str) -> str:
+        return os.path.splitext(self.data_file)[0] + (".archive.bin" if fmt == "binary" else ".archive.jsonl")
+
+    @property
+    def archive_file(self) -> str:
+        return self._archive_path(self._archive_format)
+
+    def _files_state(self):
+        return _file_state(self.snapshot_file), _file_state(self.data_file), _file_state(self.journal_file)
+
+    def _has_snapshot(self) -> bool:
+        return os.path.exists(self.snapshot_file) or os.path.exists(self.data_file)
+
+    def _read_snapshot(self) -> Optional[bytes]:
+        """Contenu du snapshot courant : le ``.snap``, sauf si le JSON a été réécrit depuis
+
+        Un JSON plus récent que le ``.snap`` ne se voit qu'après une conversion
+        vers le JSON interrompue avant la suppression du ``.snap`` : on garde
+        alors celui des deux qui a replié le plus de journal.
+        """
+        if not os.path.exists(self.snapshot_file):
+            if not os.path.exists(self.data_file):
+                return None
+            with open(self.data_file, 'rb') as f:
+                return f.read()
+        with open(self.snapshot_file, 'rb') as f:
+            snapshot = f.read()
+        if not os.path.exists(self.data_file) or (
+                os.stat(self.data_file).st_mtime_ns <= os.stat(self.snapshot_file).st_mtime_ns):
+            return snapshot  # JSON plus ancien : source de la conversion, ignoré
+        with open(self.data_file, 'rb') as f:
+            data = f.read()
+        return max((snapshot, data), key=lambda payload: codec.decode_snapshot(payload)[0]['journal_seq'])
+
+    def sync(self) -> bool:
+        """Relit les fichiers s'ils ont changé depuis le dernier chargement"""
+        with self._lock:
+            if self._state is not None and self._files_state() == self._state:
+                return False
+            self.load()
+            return True
+
+    def read(self) -> Tuple[Optional[str], List[SessionRecord], int]:
+        """État courant (relu si besoin) : date de début, séances, génération"""
+        with self._lock:
+            self.sync()
+            return self._start_date, list(self._sessions), self.generation
+
+    def read_window(self) -> Tuple[Optional[str], List[SessionRecord], SessionAggregates]:
+        """Date de début, séances non archivées et compteurs de l'archive, au même instant"""
+        with self._lock:
+            self.sync()
+            return self._start_date, list(self._sessions), replace(self._archived)
+
+    def read_all(self) -> Tuple[Optional[str], List[SessionRecord]]:
+        """Date de début et historique complet, archive comprise"""
+        with self._lock:
+            archive = self.load_archive()
+            return self._start_date, archive + self._sessions
+
+    def load_archive(self) -> List[SessionRecord]:
+        """Séances archivées, relues seulement si l'archive a changé"""
+        # En lecture seule, le fichier de verrou n'est pas créé : sans lui, personne n'a jamais écrit
+        lock = file_lock(self.lock_file) if not self.read_only or os.path.exists(self.lock_file) else nullcontext()
+        with self._lock, lock:
+            self.sync()
+            return list(self._read_archive())
+
+    def archived_records(self) -> Optional[RecordIndex]:
+        """Records des séances archivées (None : archive écrite sans eux, à relire)"""
+        with self._lock:
+            self.sync()
+            if self._archived_records is not None:
+                return RecordIndex.from_json(self._archived_records)
+            return RecordIndex() if self._archive_bytes == 0 else None
+
+    def archived_exercise_names(self) -> Optional[List[str]]:
+        """Noms triés des exercices des séances archivées (None : archive écrite sans eux)"""
+        with self._lock:
+            self.sync()
+            if self._archived_names is not None:
+                return list(self._archived_names)
+            return [] if self._archive_bytes == 0 else None
+
+    def _read_archive(self) -> List[SessionRecord]:
+        """Séances archivées (verrous déjà pris)"""
+        size = self._archive_bytes
+        key = (self._archive_format, size, _file_state(self.archive_file))
+        if self._archive_cache is None or self._archive_cache[0] != key:
+            sessions = []
+            if size:
+                # Au-delà de ``size`` : reste d'une compaction interrompue
+                try:
+                    with open(self.archive_file, 'rb') as f:
+                        sessions = codec.decode_archive(f.read(size), self._archive_format)
+                    metrics.add_bytes("storage.read", size)
+                except FileNotFoundError:
+                    # Fichier supprimé à la main : historique récent seul plutôt qu'une page en erreur
+                    metrics.add_event("storage.archive_missing")
+            self._archive_cache = (key, sessions)
+        return self._archive_cache[1]
+
+    def load(self) -> Tuple[Optional[str], List[SessionRecord]]:
+        """Relit le snapshot puis rejoue la queue du journal"""
+        with self._lock:
+            state = self._files_state()
+            start_date, sessions, snapshot_seq, archive = None, [], 0, {}
+            snapshot_format = self.format
+            data = self._read_snapshot()
+            if data is not None:
+                snapshot_format = codec.snapshot_format(data)
+                meta, sessions = codec.decode_snapshot(data)
+                start_date = meta.get('start_date')
+                snapshot_seq = meta['journal_seq']
+                archive = meta.get('archive') or {}
+
+            seq = snapshot_seq
+            for record in self._read_journal():
+                # Entrées déjà repliées (crash entre snapshot et troncature)
+                if record['seq'] <= snapshot_seq:
+                    continue
+                sessions.append(session_from_dict(record['session']))
+                seq = record['seq']
+
+            self._start_date = start_date
+            self._sessions = list(sessions)
+            self._snapshot_seq = snapshot_seq
+            self._seq = seq
+            self._archived = SessionAggregates.from_json(archive.get('aggregates', {}))
+            self._archive_bytes = archive.get('bytes', 0)
+            self._archive_format = archive.get('format', self.format)
+            # Records calculés avec d'autres règles : recalculés par la compaction
+            current = archive.get('records_version') == RECORDS_VERSION
+            self._archived_records = archive.get('records') if current else None
+            self._archived_names = archive.get('exercises')
+            self._snapshot_format = snapshot_format
+            self._state = state
+            self.generation += 1
+            self._maintain()
+        journal_state = state[-1]
+        metrics.add_bytes("storage.read", len(data or b"") + (journal_state[1] if journal_state else 0))
+        return start_date, sessions
+
+    def _archivable(self, start_date: Optional[str], sessions: List[SessionRecord]) -> List[SessionRecord]:
+        cutoff = archive_cutoff(start_date)
+        return [s for s in sessions if s.date < cutoff] if cutoff else []
+
+    def _outdated_format(self) -> bool:
+        """Snapshot ou archive écrits dans un autre format que ``self.format``"""
+        return (self._snapshot_format != self.format
+                or (self._archive_bytes > 0 and self._archive_format != self.format))
+
+    def _missing_records(self) -> bool:
+        """Archive écrite avant que ses records et ses exercices ne soient enregistrés avec elle"""
+        return self._archive_bytes > 0 and (self._archived_records is None or self._archived_names is None)
+
+    def _maintain(self):
+        """Lance une compaction si des séances chargées sont assez anciennes pour l'archive
+        ou si les fichiers sont à convertir dans le format courant"""
+        cutoff = archive_cutoff(self._start_date)
+        if (cutoff and any(s.date < cutoff for s in self._sessions)) or (
+                self._has_snapshot() and (self._outdated_format() or self._missing_records())):
+            self.compact_in_background()
+
+    def _read_journal(self) -> List[Dict]:
+        records = []
+        if not os.path.exists(self.journal_file):
+            return records
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # dernière ligne tronquée par un crash : ignorée
+                try:
+                    records.append(codec.json_loads(line))
+                except ValueError:
+                    break
+        return records
+
+    def append(self, session: SessionRecord, start_date: Optional[str] = None) -> int:
+        """Ajoute une séance au journal (une ligne, fsync)"""
+        return self.append_many([session], start_date)
+
+    def append_many(self, sessions: List[SessionRecord], start_date: Optional[str] = None) -> int:
+        """Ajoute un lot de séances au journal en une seule écriture (un fsync)"""
+        with self._lock, file_lock(self.lock_file):
+            self.sync()
+            if not self._has_snapshot():
+                # Premier enregistrement : on fige la date de début dans le snapshot
+                self._start_date = start_date
+                self._sessions.extend(sessions)
+                self._install_snapshot(self._snapshot_payload(self._seq), self._seq)
+                self.generation += 1
+                return self.generation
+            lines = []
+            for session in sessions:
+                self._seq += 1
+                lines.append(codec.json_dumps({'seq': self._seq, 'session': session_to_dict(session)}) + b"\n")
+            payload = b"".join(lines)
+            self._repair_tail()
+            with open(self.journal_file, 'ab') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            metrics.add_bytes("storage.written", len(payload))
+            self._sessions.extend(sessions)
+            self._state = self._files_state()
+            self.generation += 1
+            generation = self.generation
+            pending = self._seq - self._snapshot_seq
+            history = len(self._sessions)
+        if pending >= max(self.compact_threshold, history * COMPACT_RATIO):
+            self.compact_in_background()
+        return generation
+
+    def _repair_tail(self):
+        """Coupe une éventuelle ligne incomplète laissée par un crash"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            f.seek(0)
+            content = f.read()
+            f.truncate(content.rfind(b'\n') + 1)
+
+    def write_snapshot(self, start_date: str, sessions: Optional[List[SessionRecord]] = None) -> int:
+        """Réécrit tout le snapshot (changement de date de début, etc.)
+
+        Sans ``sessions``, l'historique est repris de l'état disque le plus
+        récent : seule la date de début change (fusion à l'écriture).
+        """
+        with self._lock, file_lock(self.lock_file):
+            self.sync()
+            self._start_date = start_date
+            if sessions is not None:
+                # Historique remplacé : l'archive repart de zéro
+                self._sessions = list(sessions)
+                self._archived = SessionAggregates()
+                self._archived_records = self._archived_names = None
+                self._archive_bytes = 0
+                self._archive_format = self.format
+            seq = self._seq
+            self._install_snapshot(self._snapshot_payload(seq), seq)
+            if sessions is not None:
+                self._remove_archives()
+            self.generation += 1
+            self._maintain()
+            return self.generation
+
+    def compact(self):
+        """Replie le journal dans le snapshot et archive les séances trop anciennes"""
+        with self._lock:
+            self.sync()
+            seq, snapshot_seq, archive_bytes = self._seq, self._snapshot_seq, self._archive_bytes
+            start_date, sessions = self._start_date, list(self._sessions)
+            old = self._archivable(start_date, sessions)
+            if seq == snapshot_seq and not old and not self._outdated_format() and not self._missing_records():
+                return
+        # La sérialisation (le coût principal) se fait hors du verrou
+        old_ids = {id(s) for s in old}
+        recent = [s for s in sessions if id(s) not in old_ids]
+        recent_payload = codec.encode_sessions(recent, self.format)
+        archive_payload = codec.encode_archive(old, self.format)
+        with self._lock, file_lock(self.lock_file):
+            self.sync()
+            if (self._snapshot_seq != snapshot_seq or self._archive_bytes != archive_bytes
+                    or start_date != self._start_date):
+                return  # un snapshot plus récent a été écrit entre-temps
+            records = names = None
+            if old or self._missing_records():
+                # Records et exercices de l'archive avant son éventuelle conversion ; relue une fois si absents
+                records, names = self.archived_records(), self.archived_exercise_names()
+                if records is None or names is None:
+                    archive = self._read_archive()
+                    records = RecordIndex()
+                    records.build(archive)
+                    names = {ex.name for s in archive for ex in s.exercises}
+            previous_archive = None
+            if self._archive_bytes and self._archive_format != self.format:
+                # Changement de format : l'archive est réécrite dans un autre fichier,
+                # l'ancien reste valide tant que le nouveau snapshot n'est pas installé
+                previous_archive = self.archive_file
+                payload = codec.encode_archive(self._read_archive(), self.format) + archive_payload
+                atomic_write(self._archive_path(self.format), payload)
+                self._archive_bytes = len(payload)
+                self._archive_format = self.format
+            elif old:
+                # L'archive d'abord : si le snapshot n'est pas écrit, l'ajout est ignoré
+                self._archive_format = self.format
+                self._append_archive(archive_payload)
+            if records is not None:
+                for session in old:
+                    records.add_session(session)
+                self._archived_records = records.to_json()
+                self._archived_names = sorted(set(names).union(ex.name for s in old for ex in s.exercises))
+            if old:
+                self._archived = self._archived.merge(SessionAggregates.from_sessions(old))
+                # Les séances ajoutées depuis la copie suivent les séances copiées
+                self._sessions = recent + self._sessions[len(sessions):]
+            self._install_snapshot(self._snapshot_payload(seq, recent_payload), seq)
+            if previous_archive is not None:
+                os.remove(previous_archive)
+
+    def _append_archive(self, payload: bytes):
+        with open(self.archive_file, 'a+b') as f:
+            f.truncate(self._archive_bytes)  # reste d'une compaction interrompue
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.add_bytes("storage.written", len(payload))
+        self._archive_bytes += len(payload)
+
+    def _snapshot_payload(self, seq: int, sessions_payload: Optional[bytes] = None) -> bytes:
+        if sessions_payload is None:
+            sessions_payload = codec.encode_sessions(self._sessions, self.format)
+        meta = {'start_date': self._start_date, 'journal_seq': seq}
+        if self._archive_bytes:
+            meta['archive'] = {'format': self._archive_format, 'bytes': self._archive_bytes,
+                               'aggregates': self._archived.to_json()}
+            if self._archived_records is not None:
+                meta['archive']['records'] = self._archived_records
+                meta['archive']['records_version'] = RECORDS_VERSION
+                meta['archive']['exercises'] = self._archived_names
+        return codec.encode_snapshot(meta, sessions_payload, self.format)
+
+    def _install_snapshot(self, payload: bytes, seq: int):
+        if self.format == "binary":
+            atomic_write(self.snapshot_file, payload)
+        else:
+            atomic_write(self.data_file, payload)
+            if os.path.exists(self.snapshot_file):
+                os.remove(self.snapshot_file)
+        self._snapshot_seq = seq
+        self._snapshot_format = self.format
+        # On ne garde dans le journal que les séances ajoutées après la copie
+        records = [r for r in self._read_journal() if r['seq'] > seq]
+        if records or os.path.exists(self.journal_file):
+            atomic_write(self.journal_file, b"".join(codec.json_dumps(r) + b"\n" for r in records))
+        self._state = self._files_state()
+
+    def _remove_archives(self):
+        for fmt in codec.FORMATS:
+            if os.path.exists(self._archive_path(fmt)):
+                os.remove(self._archive_path(fmt))
+
+    def compact_in_background(self):
+        if self.read_only:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def wait_for_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def remove_files(self):
+        self.wait_for_compaction()
+        with self._lock, file_lock(self.lock_file):
+            for path in (self.snapshot_file, self.data_file, self.journal_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._remove_archives()
+            self.load()
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        data = codec.json_loads(f.read())
+        metrics.add_bytes("storage.read", f.tell())
+    return data
+
+
+def merge_profile(base: Optional[Dict], ours: Dict, theirs: Optional[Dict]) -> Dict:
+    """Fusion à trois du profil : nos modifications appliquées à la version disque
+
+    ``base`` est le profil tel qu'on l'avait chargé, ``theirs`` celui
+    actuellement sur disque. Les champs modifiés de notre côté l'emportent ;
+    les mesures ajoutées des deux côtés sont conservées.
+    """
+    if theirs is None or base is None or theirs == base:
+        return ours
+    merged = dict(theirs)
+    for key, value in ours.items():
+        if key != 'measurements' and base.get(key) != value:
+            merged[key] = value
+    base_measurements = base.get('measurements') or []
+    measurements = list(theirs.get('measurements') or [])
+    for m in ours.get('measurements') or []:
+        if m not in base_measurements and m not in measurements:
+            measurements.append(m)
+    merged['measurements'] = measurements
+    return merged
+
+
+class JsonStorage:
+    """Backend historique : ``workout_data.snap`` ou ``workout_data.json`` (+ journal) et ``user_profile.json``"""
+
+    name = "json"
+
+    def __init__(self, data_file: str = "workout_data.json", profile_file: str = "user_profile.json",
+                 read_only: bool = False):
+        self.data_file = data_file
+        self.profile_file = profile_file
+        self.journal = SessionJournal(data_file, read_only=read_only)
+        self._profile_lock = threading.Lock()
+        self._profile: Optional[Dict] = None
+        self._profile_state = None
+        self._profile_generation = 0
+
+    def generation(self) -> int:
+        """Compteur croissant de changements (séances ou profil, y compris externes)"""
+        self.journal.sync()
+        self._sync_profile()
+        return self.journal.generation + self._profile_generation
+
+    def load_data(self) -> Tuple[Optional[str], List[SessionRecord]]:
+        """Historique complet, archive comprise"""
+        return self.journal.read_all()
+
+    def load_recent(self) -> Tuple[Optional[str], List[SessionRecord], SessionAggregates]:
+        """Séances non archivées et compteurs de l'archive"""
+        return self.journal.read_window()
+
+    def load_archive(self) -> List[SessionRecord]:
+        return self.journal.load_archive()
+
+    def archived_records(self) -> Optional[RecordIndex]:
+        """Records des séances archivées, enregistrés avec l'archive (None : à recalculer)"""
+        return self.journal.archived_records()
+
+    def archived_exercise_names(self) -> Optional[List[str]]:
+        return self.journal.archived_exercise_names()
+
+    def save_data(self, start_date: str, sessions: Optional[List[SessionRecord]] = None) -> int:
+        self.journal.write_snapshot(start_date, sessions)
+        return self.generation()
+
+    def append_session(self, start_date: str, session: SessionRecord) -> int:
+        return self.append_sessions(start_date, [session])
+
+    def append_sessions(self, start_date: str, sessions: List[SessionRecord]) -> int:
+        self.journal.append_many(sessions, start_date)
+        return self.generation()
+
+    def _sync_profile(self):
+        with self._profile_lock:
+            state = _file_state(self.profile_file)
+            if self._profile_state is not None and state == self._profile_state:
+                return
+            self._profile = _read_json(self.profile_file)
+            self._profile_state = state
+            self._profile_generation += 1
+
+    def load_profile(self) -> Optional[Dict]:
+        self._sync_profile()
+        return copy.deepcopy(self._profile)
+
+    def save_profile(self, profile: Dict, base: Optional[Dict] = None) -> Dict:
+        """Écrit le profil en fusionnant avec la version disque ; renvoie le résultat"""
+        with self._profile_lock, file_lock(os.path.splitext(self.profile_file)[0] + ".lock"):
+            merged = merge_profile(base, profile, _read_json(self.profile_file))
+            atomic_write(self.profile_file, codec.json_dumps(merged))
+            self._profile = copy.deepcopy(merged)
+            self._profile_state = _file_state(self.profile_file)
+            self._profile_generation += 1
+        return merged
+
+    def remove_all(self):
+        self.journal.remove_files()
+        if os.path.exists(self.profile_file):
+            os.remove(self.profile_file)
+        self._sync_profile()
+
+    # Requête : pas d'index, on parcourt l'historique en mémoire (archive comprise)
+
+    def sessions_per_date(self) -> List[Tuple[str, int]]:
+        counts: Dict[int, int] = {}
+        for session in self.load_data()[1]:
+            counts[session.date] = counts.get(session.date, 0) + 1
+        return [(to_iso(date), count) for date, count in sorted(counts.items())]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    workout_name TEXT,
+    week INTEGER,
+    completed INTEGER,
+    duration_minutes INTEGER,
+    notes TEXT
+);
+CREATE TABLE IF NOT EXISTS exercises (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    sets INTEGER,
+    reps TEXT,
+    weight REAL,
+    notes TEXT,
+    completed_sets INTEGER,
+    failed_sets INTEGER,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS sets (
+    id INTEGER PRIMARY KEY,
+    exercise_id INTEGER NOT NULL REFERENCES exercises(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    reps INTEGER,
+    weight REAL,
+    completed INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions(date);
+CREATE INDEX IF NOT EXISTS idx_exercises_name_date ON exercises(name, date);
+CREATE INDEX IF NOT EXISTS idx_exercises_session ON exercises(session_id, position);
+CREATE INDEX IF NOT EXISTS idx_sets_exercise ON sets(exercise_id, position);
+"""
+
+
+class SqliteStorage:
+    """Backend SQLite : ``workout_data.db``"""
+
+    name = "sqlite"
+
+    def __init__(self, db_file: str = "workout_data.db", read_only: bool = False):
+        self.db_file = db_file
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        self._conn = self._connect()
+        self._generation = 0
+        self._seen_data_version = None
+        # Fenêtre récente (date de début, séances, compteurs de l'archive), archive et ses records
+        self._cache: Optional[Tuple[Optional[str], List[SessionRecord], SessionAggregates]] = None
+        self._archive_cache: Optional[List[SessionRecord]] = None
+        self._records_cache: Optional[RecordIndex] = None
+        self._names_cache: Optional[List[str]] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Streamlit exécute le script dans plusieurs threads
+        if self.read_only:
+            # Base existante ouverte sans écriture : ni schéma ni changement de journal
+            return sqlite3.connect(f"file:{self.db_file}?mode=ro", uri=True, check_same_thread=False)
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _sync(self):
+        """Invalide le cache si une autre connexion a modifié la base"""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._seen_data_version:
+            self._seen_data_version = data_version
+            self._cache = None
+            self._archive_cache = self._records_cache = self._names_cache = None
+            self._generation += 1
+
+    def generation(self) -> int:
+        """Compteur croissant de changements (y compris par d'autres processus)"""
+        with self._lock:
+            self._sync()
+            return self._generation
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            return row[0] == 0 and self._get_meta('start_date') is None
+
+    def load_data(self) -> Tuple[Optional[str], List[SessionRecord]]:
+        """Historique complet, archive comprise"""
+        with self._lock, self._conn:  # lecture cohérente dans une seule transaction
+            self._sync()
+            self._conn.execute("BEGIN")
+            return self._get_meta('start_date'), self._read_sessions()
+
+    def load_recent(self) -> Tuple[Optional[str], List[SessionRecord], SessionAggregates]:
+        """Séances depuis ``archive_cutoff`` et compteurs des séances antérieures"""
+        with self._lock:
+            self._sync()
+            if self._cache is None:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    start_date = self._get_meta('start_date')
+                    cutoff = archive_cutoff(start_date)
+                    self._cache = (start_date, self._read_sessions(since=cutoff), self._archived(cutoff))
+            start_date, sessions, archived = self._cache
+            return start_date, list(sessions), replace(archived)
+
+    def load_archive(self) -> List[SessionRecord]:
+        with self._lock:
+            self._sync()
+            if self._archive_cache is None:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    cutoff = archive_cutoff(self._get_meta('start_date'))
+                    self._archive_cache = self._read_sessions(before=cutoff) if cutoff else []
+            return list(self._archive_cache)
+
+    def archived_records(self) -> RecordIndex:
+        """Records des séances archivées, agrégés par SQLite sans relire les séances"""
+        with self._lock:
+            self._sync()
+            if self._records_cache is None:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._records_cache = self._archived_records(archive_cutoff(self._get_meta('start_date')))
+            return RecordIndex.from_json(self._records_cache.to_json())
+
+    def archived_exercise_names(self) -> List[str]:
+        """Noms des exercices des séances archivées (index nom d'exercice, date)"""
+        with self._lock:
+            self._sync()
+            if self._names_cache is None:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    cutoff = archive_cutoff(self._get_meta('start_date'))
+                    self._names_cache = [row[0] for row in self._conn.execute(
+                        "SELECT DISTINCT name FROM exercises WHERE date < ? ORDER BY name",
+                        (to_iso(cutoff),))] if cutoff else []
+            return list(self._names_cache)
+
+    def _archived_records(self, cutoff: Optional[int]) -> RecordIndex:
+        """Mêmes règles que ``RecordIndex.add_session`` : meilleure charge par exercice, prescription et
+        répétitions, première série à l'atteindre ; sans série réussie avec des répétitions saisies,
+        poids et reps prescrits"""
+        records = RecordIndex()
+        if cutoff is None:
+            return records
+        rows = self._conn.execute(
+            "SELECT name, prescription, reps, weight, MIN(rank), date FROM ("
+            " SELECT e.name, e.reps AS prescription, s.reps, s.weight, e.date, e.id * 65536 + s.position AS rank,"
+            " MAX(s.weight) OVER (PARTITION BY e.name, e.reps, s.reps) AS best"
+            " FROM sets s JOIN exercises e ON e.id = s.exercise_id"
+            " WHERE e.date < ? AND s.completed AND s.reps > 0 AND s.weight > 0)"
+            " WHERE weight = best GROUP BY name, prescription, reps "
+            "UNION ALL "
+            "SELECT name, prescription, NULL, weight, MIN(rank), date FROM ("
+            " SELECT e.name, e.reps AS prescription, e.weight, e.date, e.id * 65536 AS rank,"
+            " MAX(e.weight) OVER (PARTITION BY e.name, e.reps) AS best"
+            " FROM exercises e WHERE e.date < ? AND e.status = 'completed' AND e.weight > 0"
+            " AND NOT EXISTS (SELECT 1 FROM sets s WHERE s.exercise_id = e.id AND s.completed AND s.reps > 0))"
+            " WHERE weight = best GROUP BY name, prescription",
+            (to_iso(cutoff), to_iso(cutoff))).fetchall()
+        for name, prescription, reps, weight, _, date in sorted(rows, key=lambda row: row[4]):
+            prescription = parse_prescription(prescription or "")
+            if prescription.kind == TIME:
+                continue
+            records.add(name, weight, prescription.rep_count if reps is None else reps, to_ordinal(date))
+        return records
+
+    def _archived(self, cutoff: Optional[int]) -> SessionAggregates:
+        """Compteurs des séances antérieures à ``cutoff``, calculés par SQLite"""
+        if cutoff is None:
+            return SessionAggregates()
+        sessions, completed, duration, first_date, last_date = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(completed), 0), COALESCE(SUM(duration_minutes), 0), MIN(date), MAX(date) "
+            "FROM sessions WHERE date < ?", (to_iso(cutoff),)).fetchone()
+        exercises, completed_exercises = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'completed'), 0) FROM exercises WHERE date < ?",
+            (to_iso(cutoff),)).fetchone()
+        return SessionAggregates(sessions, completed, duration, exercises, completed_exercises,
+                                 to_ordinal(first_date) if first_date else 0,
+                                 to_ordinal(last_date) if last_date else 0)
+
+    def _read_sessions(self, since: Optional[int] = None, before: Optional[int] = None) -> List[SessionRecord]:
+        """Séances de [since, before[ (tout l'historique par défaut)"""
+        conditions, params = [], []
+        if since:
+            conditions.append("{date} >= ?")
+            params.append(to_iso(since))
+        if before:
+            conditions.append("{date} < ?")
+            params.append(to_iso(before))
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+        pack = SET_STRUCT.pack
+        sets_by_exercise: Dict[int, List[bytes]] = {}
+        for exercise_id, reps, weight, completed in self._conn.execute(
+                "SELECT s.exercise_id, s.reps, s.weight, s.completed FROM sets s "
+                "JOIN exercises e ON e.id = s.exercise_id" + where.format(date="e.date") +
+                " ORDER BY s.exercise_id, s.position", params):
+            sets_by_exercise.setdefault(exercise_id, []).append(pack(weight or 0.0, reps or 0, bool(completed)))
+
+        exercises_by_session: Dict[int, List[ExerciseRecord]] = {}
+        for row in self._conn.execute(
+                "SELECT id, session_id, name, sets, reps, weight, notes, completed_sets, failed_sets, status "
+                "FROM exercises" + where.format(date="date") + " ORDER BY session_id, position", params):
+            exercises_by_session.setdefault(row[1], []).append(ExerciseRecord(
+                name=sys.intern(row[2]),
+                sets=row[3] or 0,
+                reps=sys.intern(row[4] or ""),
+                weight=row[5] or 0.0,
+                notes=row[6] or "",
+                completed_sets=row[7] or 0,
+                failed_sets=row[8] or 0,
+                status=sys.intern(row[9] or "pending"),
+                packed_sets=b"".join(sets_by_exercise.get(row[0], ())),
+            ))
+
+        sessions = []
+        for row in self._conn.execute(
+                "SELECT id, date, workout_name, week, completed, duration_minutes, notes "
+                "FROM sessions" + where.format(date="date") + " ORDER BY id", params):
+            sessions.append(SessionRecord(
+                date=to_ordinal(row[1]),
+                workout_name=sys.intern(row[2] or ""),
+                week=row[3] or 0,
+                exercises=tuple(exercises_by_session.get(row[0], ())),
+                completed=bool(row[4]),
+                duration_minutes=row[5] or 0,
+                notes=row[6] or "",
+            ))
+        return sessions
+
+    def _insert_session(self, session: SessionRecord):
+        date = session.iso_date
+        cursor = self._conn.execute(
+            "INSERT INTO sessions (date, workout_name, week, completed, duration_minutes, notes) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (date, session.workout_name, session.week, int(session.completed), session.duration_minutes,
+             session.notes))
+        session_id = cursor.lastrowid
+        for position, ex in enumerate(session.exercises):
+            cursor = self._conn.execute(
+                "INSERT INTO exercises (session_id, position, date, name, sets, reps, weight, notes, "
+                "completed_sets, failed_sets, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, position, date, ex.name, ex.sets, ex.reps, ex.weight, ex.notes,
+                 ex.completed_sets, ex.failed_sets, ex.status))
+            exercise_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO sets (exercise_id, position, reps, weight, completed) VALUES (?, ?, ?, ?, ?)",
+                [(exercise_id, j, reps, weight, int(completed))
+                 for j, (weight, reps, completed) in enumerate(ex.iter_sets())])
+
+    def save_data(self, start_date: str, sessions: Optional[List[SessionRecord]] = None) -> int:
+        """Met à jour la date de début ; remplace l'historique seulement si ``sessions`` est fourni"""
+        with self._lock, self._conn:
+            self._sync()
+            self._set_meta('start_date', start_date)
+            if sessions is not None:
+                self._conn.execute("DELETE FROM sessions")
+                for session in sessions:
+                    self._insert_session(session)
+            self._cache = None
+            self._archive_cache = self._records_cache = self._names_cache = None
+            self._generation += 1
+            return self._generation
+
+    def append_session(self, start_date: str, session: SessionRecord) -> int:
+        return self.append_sessions(start_date, [session])
+
+    def append_sessions(self, start_date: str, sessions: List[SessionRecord]) -> int:
+        """Ajoute un lot de séances dans une seule transaction"""
+        with self._lock, self._conn:
+            self._sync()
+            if self._get_meta('start_date') is None:
+                self._set_meta('start_date', start_date)
+            for session in sessions:
+                self._insert_session(session)
+            if self._cache is not None:
+                cached_start, recent, archived = self._cache
+                cutoff = archive_cutoff(cached_start)
+                if cached_start is None or (cutoff and any(s.date < cutoff for s in sessions)):
+                    # Première date de début ou séances anciennes (import) : fenêtre à relire
+                    self._cache = self._archive_cache = self._records_cache = self._names_cache = None
+                else:
+                    self._cache = (cached_start, recent + list(sessions), archived)
+            self._generation += 1
+            return self._generation
+
+    def load_profile(self) -> Optional[Dict]:
+        with self._lock:
+            value = self._get_meta('profile')
+        return json.loads(value) if value else None
+
+    def save_profile(self, profile: Dict, base: Optional[Dict] = None) -> Dict:
+        """Écrit le profil en fusionnant avec la version en base ; renvoie le résultat"""
+        with self._lock, self._conn:
+            self._sync()
+            self._conn.execute("BEGIN IMMEDIATE")
+            current = self._get_meta('profile')
+            merged = merge_profile(base, profile, json.loads(current) if current else None)
+            self._set_meta('profile', json.dumps(merged))
+            self._generation += 1
+        return merged
+
+    def close(self):
+        """Ferme la connexion (la dernière fermée reporte le WAL dans la base)"""
+        with self._lock:
+            self._conn.close()
+
+    def remove_all(self):
+        with self._lock:
+            self._conn.close()
+            _remove_db_files(self.db_file)
+            self._conn = self._connect()
+            self._cache = self._archive_cache = self._records_cache = self._names_cache = None
+            self._seen_data_version = None
+
+    # Requête servie par l'index (date) des séances
+
+    def sessions_per_date(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT date, COUNT(*) FROM sessions GROUP BY date ORDER BY date").fetchall()
+
+
+def _remove_db_files(db_file: str):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+
+
+def migrate_json_to_sqlite(data_file: str = "workout_data.json", profile_file: str = "user_profile.json",
+                           db_file: str = "workout_data.db") -> SqliteStorage:
+    """Copie une fois les fichiers JSON dans une base SQLite vide
+
+    La copie se fait dans une base temporaire, mise en place par
+    ``os.replace`` une fois complète : un échec ne laisse pas de base
+    partielle, ``open_storage`` retente la migration au lancement suivant.
+    """
+    if os.path.exists(db_file):
+        existing = SqliteStorage(db_file)
+        empty = existing.is_empty()
+        existing.close()
+        if not empty:
+            raise ValueError(f"{db_file} contient déjà des données")
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".db", dir=os.path.dirname(os.path.abspath(db_file)))
+    os.close(fd)
+    target = None
+    try:
+        os.chmod(tmp_path, 0o644)
+        target = SqliteStorage(tmp_path)
+        source = JsonStorage(data_file, profile_file)
+        start_date, sessions = source.load_data()
+        if start_date or sessions:
+            target.save_data(start_date, sessions)
+        profile = source.load_profile()
+        if profile is not None:
+            target.save_profile(profile)
+        target.close()
+        _remove_db_files(db_file)  # base vide éventuelle et son WAL, qui ne doit pas s'appliquer à la copie
+        os.replace(tmp_path, db_file)
+    except BaseException:
+        if target is not None:
+            target.close()
+        _remove_db_files(tmp_path)
+        raise
+    return SqliteStorage(db_file)
+
+
+def open_storage(backend: Optional[str] = None, data_file: str = "workout_data.json",
+                 profile_file: str = "user_profile.json", db_file: str = "workout_data.db",
+                 read_only: bool = False):
+    """Ouvre le backend demandé (``POWERLIFTING_BACKEND`` par défaut)
+
+    ``read_only`` : lecture seule, pour lire les données d'un autre athlète
+    (classement) sans rien réécrire : ni migration, ni compaction, ni
+    création de base. Une base SQLite pas encore migrée est lue dans ses
+    fichiers JSON.
+    """
+    backend = backend or os.environ.get("POWERLIFTING_BACKEND", "json")
+    if backend == "json" or (backend == "sqlite" and read_only and not os.path.exists(db_file)):
+        return JsonStorage(data_file, profile_file, read_only=read_only)
+    if backend == "sqlite":
+        if not os.path.exists(db_file) and any(
+                os.path.exists(path) for path in (binary_snapshot_path(data_file), data_file, profile_file)):
+            return migrate_json_to_sqlite(data_file, profile_file, db_file)
+        return SqliteStorage(db_file, read_only=read_only)
+    raise ValueError(f"Backend de stockage inconnu: {backend}")
+
+
+def athlete_paths(athlete: str = "", create: bool = True) -> Tuple[str, str, str]:
+    """Fichiers de données d'un athlète (dossier courant pour l'athlète par défaut)
+
+    Le dossier de l'athlète est créé, sauf avec ``create=False`` (lecture).
+    """
+    names = ("workout_data.json", "user_profile.json", "workout_data.db")
+    if not athlete:
+        return names
+    directory = os.path.join("athletes", re.sub(r"[^A-Za-z0-9_-]", "_", athlete))
+    if create:
+        os.makedirs(directory, exist_ok=True)
+    return tuple(os.path.join(directory, name) for name in names)
+
+
+def _has_data(paths: Tuple[str, str, str]) -> bool:
+    return any(os.path.exists(path) for path in (binary_snapshot_path(paths[0]), *paths))
+
+
+def list_athletes() -> List[str]:
+    """Athlètes ayant des données : l'athlète par défaut ("") puis les dossiers de ``athletes/``"""
+    athletes = [""] if _has_data(athlete_paths()) else []
+    if os.path.isdir("athletes"):
+        athletes += sorted(name for name in os.listdir("athletes")
+                           if _has_data(athlete_paths(name, create=False)))
+    return athletes
+
+
+_SHARED_STORAGES: Dict[Tuple[str, str], object] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_storage(backend: Optional[str] = None, athlete: str = ""):
+    """Backend partagé par toutes les sessions Streamlit du processus
+
+    Le module n'est importé qu'une fois par processus : chaque athlète n'est
+    donc lu et analysé qu'une fois, puis relu seulement si ses fichiers
+    changent sur disque.
+    """
+    backend = backend or os.environ.get("POWERLIFTING_BACKEND", "json")
+    data_file, profile_file, db_file = athlete_paths(athlete)
+    key = (backend, os.path.abspath(data_file))
+    with _SHARED_LOCK:
+        if key not in _SHARED_STORAGES:
+            _SHARED_STORAGES[key] = open_storage(backend, data_file, profile_file, db_file)
+        return _SHARED_STORAGES[key]
+
+
+def reset_shared_storages():
+    """Oublie les backends partagés (tests, benchmarks : force une relecture à froid)"""
+    with _SHARED_LOCK:
+        _SHARED_STORAGES.clear()
+
+
+if __name__ == "__main__":
+    # python storage.py migrate [workout_data.json user_profile.json workout_data.db]
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate":
+        migrate_json_to_sqlite(*sys.argv[2:5])
+        print("✅ Migration terminée")
+    else:
+        print("Usage: python storage.py migrate [data_file profile_file db_file]")
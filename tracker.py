@@ -0,0 +1,527 @@
+"""Modèle de données et logique du tracker, indépendants de l'interface Streamlit.
+
+Ce module est importé par ``powerlifting_pro_multipage.py`` et peut l'être
+seul (scripts, benchmarks) sans lancer l'application.
+"""
+import bisect
+import copy
+import datetime
+import os
+from array import array
+from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from autoregulation import DEFAULT_BAR, DEFAULT_PLATES, AutoRegulator
+from cache import LRUCache
+from metrics import add_event, timed
+from model import EPOCH_ORDINAL, TIME, ExerciseRecord, SessionRecord, parse_prescription
+from program import DEFAULT_PROGRAM, Program, ProgramError, ProgramExercise, get_program
+from records import ExerciseRecords, RecordIndex
+from schedule import ScheduledWorkout, TrainingCalendar, schedule_from_days
+from storage import SessionAggregates, athlete_paths, shared_storage
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from analytics import TrainingLoad
+
+# Relectures de l'archive quand ses séances ne correspondent pas aux compteurs chargés
+ARCHIVE_RETRIES = 3
+
+
+@dataclass
+class Exercise:
+    name: str
+    sets: int
+    reps: str
+    weight: float
+    notes: str = ""
+    completed_sets: int = 0
+    failed_sets: int = 0
+    status: str = "pending"
+    actual_sets: List[Dict] = None  # Pour tracking série par série
+
+    def __post_init__(self):
+        if self.actual_sets is None:
+            self.actual_sets = []
+
+def thaw_exercise(exercise) -> Exercise:
+    """Copie modifiable d'un exercice du programme partagé (copie à l'écriture)"""
+    if not isinstance(exercise, ProgramExercise):
+        return exercise
+    return Exercise(exercise.name, exercise.sets, exercise.reps, exercise.weight, exercise.notes)
+
+@dataclass
+class WorkoutSession:
+    date: str
+    workout_name: str
+    week: int
+    exercises: List[Exercise]
+    completed: bool = False
+    duration_minutes: int = 0
+    notes: str = ""
+
+@dataclass
+class UserProfile:
+    name: str = ""
+    age: int = 25
+    weight: float = 70.0
+    height: int = 175
+    # "M" ou "F" : coefficients des scores DOTS, Wilks et IPF GL
+    sex: str = "M"
+    experience_years: int = 1
+    goals: Dict = None
+    measurements: List[Dict] = None
+    # Programme choisi (fichier de programs/, vide = programme par défaut)
+    program: str = ""
+    # Jours (0 = lundi) des séances du programme, dans l'ordre ; None = jours du fichier
+    workout_days: List[int] = None
+    # Matériel, pour arrondir les charges suggérées : barre et disques disponibles (kg, par paire)
+    bar_weight: float = DEFAULT_BAR
+    plates: List[float] = None
+
+    def __post_init__(self):
+        if self.goals is None:
+            self.goals = {
+                "bench_1rm": 100.0,
+                "squat_1rm": 120.0,
+                "deadlift_1rm": 140.0
+            }
+        if self.measurements is None:
+            self.measurements = []
+        if self.plates is None:
+            self.plates = list(DEFAULT_PLATES)
+
+class _ExerciseColumns:
+    """Colonnes d'un exercice : progression (exercices réussis, triée par date) et séries réussies"""
+    __slots__ = ("dates", "weights", "sets", "reps", "top_weights", "top_reps", "estimates",
+                 "set_dates", "set_weights", "set_reps")
+
+    def __init__(self):
+        self.dates = array('i')
+        self.weights = array('d')
+        self.sets = array('i')
+        self.reps: List[str] = []
+        # Meilleure série du jour (poids, reps réalisées), base du 1RM estimé
+        self.top_weights = array('d')
+        self.top_reps = array('i')
+        self.estimates: List[float] = None  # 1RM estimés, calculés à la première lecture
+        # Séries réussies, dans l'ordre d'enregistrement
+        self.set_dates = array('i')
+        self.set_weights = array('d')
+        self.set_reps = array('i')
+
+    def insert(self, index: int, date: int, ex: ExerciseRecord, top_weight: float, top_reps: int):
+        self.dates.insert(index, date)
+        self.weights.insert(index, ex.weight)
+        self.sets.insert(index, ex.sets)
+        self.reps.insert(index, ex.reps)
+        self.top_weights.insert(index, top_weight)
+        self.top_reps.insert(index, top_reps)
+        self.estimates = None
+
+    def sort(self):
+        order = sorted(range(len(self.dates)), key=self.dates.__getitem__)
+        if order != list(range(len(order))):
+            for name in ("dates", "weights", "sets", "top_weights", "top_reps"):
+                column = getattr(self, name)
+                setattr(self, name, array(column.typecode, [column[i] for i in order]))
+            self.reps = [self.reps[i] for i in order]
+
+
+class ProgressionIndex:
+    """Index exercice -> progression triée par date, en colonnes (``array``)"""
+
+    def __init__(self):
+        self._columns: Dict[str, _ExerciseColumns] = {}
+        self._names: List[str] = []
+
+    def build(self, sessions: List[SessionRecord]):
+        self._columns = {}
+        for session in sessions:
+            self._index_session(session, sort=False)
+        for columns in self._columns.values():
+            columns.sort()
+        self._names = sorted(self._columns)
+
+    def add_session(self, session: SessionRecord):
+        """Ajoute une séance sans reparcourir l'historique"""
+        for name in self._index_session(session):
+            bisect.insort(self._names, name)
+
+    def _index_session(self, session: SessionRecord, sort: bool = True) -> List[str]:
+        """Indexe la séance ; renvoie les noms d'exercices jusque-là inconnus"""
+        new_names = []
+        date = session.date
+        for ex in session.exercises:
+            columns = self._columns.get(ex.name)
+            if columns is None:
+                columns = self._columns[ex.name] = _ExerciseColumns()
+                new_names.append(ex.name)
+            # Sans séries détaillées : poids et répétitions prescrits
+            top_weight, top_reps, top_load = ex.weight, ex.prescription.rep_count, -1.0
+            if ex.prescription.kind != TIME:  # séries au temps : pas de répétitions
+                for weight, reps, completed in ex.iter_sets():
+                    if completed and reps > 0:
+                        columns.set_dates.append(date)
+                        columns.set_weights.append(weight)
+                        columns.set_reps.append(reps)
+                        load = weight if reps == 1 else weight * (1 + reps / 30.0)  # Epley
+                        if load > top_load:
+                            top_weight, top_reps, top_load = weight, reps, load
+            if ex.status != 'completed':
+                continue
+            # Cas courant : séance du jour, ajoutée à la fin
+            index = len(columns.dates)
+            if sort and index and columns.dates[-1] > date:
+                index = bisect.bisect_right(columns.dates, date)
+            columns.insert(index, date, ex, top_weight, top_reps)
+        return new_names
+
+    def names(self) -> List[str]:
+        return self._names
+
+    def progression(self, exercise_name: str, start: int = None, end: int = None) -> List[Dict]:
+        """Progression complète, ou limitée aux ordinaux [start, end]"""
+        columns = self._columns.get(exercise_name)
+        if columns is None or not columns.dates:
+            return []
+        if columns.estimates is None:
+            # 1RM estimé (Epley) de toute la colonne en un seul appel NumPy (NaN sans répétitions)
+            from analytics import estimate_1rm
+            columns.estimates = estimate_1rm(columns.top_weights, columns.top_reps)['epley'].tolist()
+        lo = bisect.bisect_left(columns.dates, start) if start is not None else 0
+        hi = bisect.bisect_right(columns.dates, end) if end is not None else len(columns.dates)
+        fromordinal = datetime.date.fromordinal
+        return [{
+            'date': fromordinal(columns.dates[i]),
+            'weight': columns.weights[i],
+            'sets': columns.sets[i],
+            'reps': columns.reps[i],
+            'estimated_1rm': columns.estimates[i],
+        } for i in range(lo, hi)]
+
+    def sets(self, exercise_name: str) -> Tuple[array, array, array]:
+        """Séries réussies (ordinaux, poids, reps) dans l'ordre d'enregistrement"""
+        columns = self._columns.get(exercise_name)
+        if columns is None:
+            return array('i'), array('d'), array('i')
+        return columns.set_dates, columns.set_weights, columns.set_reps
+
+class PowerliftingTracker:
+    def __init__(self, backend: str = None, athlete: str = ""):
+        self.athlete = athlete
+        self.data_file, self.profile_file, self.db_file = athlete_paths(athlete)
+        # Stockage partagé par toutes les sessions du processus pour cet athlète
+        self.storage = shared_storage(backend, athlete)
+        self.progression_index = ProgressionIndex()
+        # Vérifie les compteurs incrémentaux contre un recalcul complet (tests)
+        self.check_aggregates = os.environ.get("POWERLIFTING_CHECK_AGGREGATES") == "1"
+        # Version des données : incrémentée à chaque chargement ou écriture réelle,
+        # elle sert de clé au cache des pages
+        self.data_version = 0
+        self.cache = LRUCache(maxsize=32)
+        self._calendar = None
+        self._archive = None
+        self._records: Optional[RecordIndex] = None
+        self._training_load: Optional["TrainingLoad"] = None
+        self._autoregulator: Optional[AutoRegulator] = None
+        self.load_data()
+        self.load_profile()
+
+    @timed
+    def load_data(self):
+        """Charge les séances récentes ; l'archive n'est lue qu'à la demande (``all_sessions``)"""
+        self._generation = self.storage.generation()
+        start_date = None
+        try:
+            start_date, self.sessions, self.archived = self.storage.load_recent()
+            self.start_date = datetime.datetime.strptime(start_date or str(datetime.date.today()), '%Y-%m-%d').date()
+        except:
+            start_date = None
+            self.start_date = datetime.date.today()
+            self.sessions = []
+            self.archived = SessionAggregates()
+        self._archive = None
+        self._records = None
+        self._training_load = None
+        self._autoregulator = None
+        self.progression_index.build(self.sessions)
+        self.aggregates = self.archived.merge(SessionAggregates.from_sessions(self.sessions))
+        self._saved_start_date = start_date
+        self.data_version += 1
+
+    @timed
+    def load_profile(self):
+        try:
+            data = self.storage.load_profile()
+            self.profile = UserProfile(**data) if data else UserProfile()
+        except:
+            self.profile = UserProfile()
+        self._saved_profile = asdict(self.profile)
+        self.data_version += 1
+
+    @timed
+    def refresh(self):
+        """Recharge si un autre onglet ou processus a écrit depuis le dernier chargement"""
+        if self.storage.generation() != self._generation:
+            self.load_data()
+            self.load_profile()
+
+    def _track_generation(self, generation: int):
+        # Si personne d'autre n'a écrit entre-temps, la mémoire est à jour ;
+        # sinon refresh() rechargera l'état fusionné
+        if generation == self._generation + 1:
+            self._generation = generation
+
+    @timed
+    def save_data(self):
+        """Met à jour la date de début (l'historique sur disque est conservé)"""
+        if str(self.start_date) == self._saved_start_date:
+            return
+        self._track_generation(self.storage.save_data(str(self.start_date)))
+        self._saved_start_date = str(self.start_date)
+        self.data_version += 1
+
+    @timed
+    def append_session(self, session: SessionRecord):
+        """Enregistre une séance terminée sans réécrire tout l'historique"""
+        self.append_sessions([session])
+
+    @timed
+    def append_sessions(self, sessions: List[SessionRecord]):
+        """Enregistre un lot de séances en une seule écriture (import)"""
+        for session in sessions:
+            self.sessions.append(session)
+            self.progression_index.add_session(session)
+            if self._records is not None:
+                self._records.add_session(session)
+            if self._training_load is not None:
+                self._training_load.add_session(session)
+            if self._autoregulator is not None:
+                self._autoregulator.add_session(session)
+            self.aggregates.add(session)
+        if self.check_aggregates:
+            self.verify_aggregates()
+        self._track_generation(self.storage.append_sessions(str(self.start_date), sessions))
+        self._saved_start_date = str(self.start_date)
+        self.data_version += 1
+
+    @timed
+    def save_profile(self):
+        """Sauvegarde le profil, fusionné avec les modifications d'autres onglets"""
+        profile = asdict(self.profile)
+        if profile == self._saved_profile:
+            return
+        merged = self.storage.save_profile(profile, self._saved_profile)
+        self._track_generation(self.storage.generation())
+        self.profile = UserProfile(**copy.deepcopy(merged))
+        self._saved_profile = asdict(self.profile)
+        self.data_version += 1
+
+    def all_sessions(self) -> List[SessionRecord]:
+        """Historique complet : archive (lue à la première demande) + séances récentes"""
+        if self._archive is None:
+            archive = self.storage.load_archive()
+            for _ in range(ARCHIVE_RETRIES):
+                if len(archive) == self.archived.total_sessions:
+                    break
+                # Archive modifiée depuis le chargement (compaction, import) : on recharge
+                self.load_data()
+                archive = self.storage.load_archive()
+            if len(archive) != self.archived.total_sessions:
+                # Toujours incohérente (fichier d'archive perdu...) : on garde ce qui a été lu
+                add_event("tracker.archive_mismatch")
+            self._archive = archive
+            if archive:
+                self.progression_index.build(archive + self.sessions)
+        return self._archive + self.sessions
+
+    def read_history(self) -> List[SessionRecord]:
+        """Historique complet relu dans le stockage, sans toucher à l'état du tracker
+
+        Pour les fichiers générés au clic : Streamlit les produit dans un autre
+        thread, qui ne doit pas recharger le tracker utilisé par le script.
+        """
+        return self.storage.load_data()[1]
+
+    @property
+    def records(self) -> RecordIndex:
+        """Records personnels de tout l'historique, calculés à la première demande puis tenus à jour
+
+        Ceux de l'archive sont enregistrés avec elle : seules les séances
+        chargées sont ajoutées, sans relire l'archive.
+        """
+        if self._records is None:
+            records = self.storage.archived_records()
+            if records is None:
+                # Archive écrite sans ses records (convertie à la prochaine compaction)
+                records = RecordIndex()
+                records.build(self.storage.load_archive() if self._archive is None else self._archive)
+            for session in self.sessions:
+                records.add_session(session)
+            self._records = records
+        return self._records
+
+    def live_records(self, exercise) -> Optional[ExerciseRecords]:
+        """Copie des records d'un exercice de la séance en cours (None : exercice au temps)"""
+        if parse_prescription(exercise.reps).kind == TIME:
+            return None
+        return self.records.live(exercise.name)
+
+    @property
+    def training_load(self) -> "TrainingLoad":
+        """Charges d'entraînement de tout l'historique, calculées à la première demande puis tenues à jour"""
+        sessions = self.all_sessions()
+        if self._training_load is None:
+            from analytics import TrainingLoad
+            self._training_load = TrainingLoad()
+            self._training_load.build(sessions)
+        return self._training_load
+
+    @timed
+    def get_weekly_load(self, until: datetime.date = None) -> Dict[str, "np.ndarray"]:
+        """Tonnage, INOL, répétitions par zone d'intensité et ACWR par semaine, jusqu'à ``until`` si précisé"""
+        return self.training_load.weekly(until and until.toordinal())
+
+    @property
+    def autoregulator(self) -> AutoRegulator:
+        """Tendances récentes par exercice, calculées à la première demande puis tenues à jour
+
+        Les séances chargées couvrent au moins ``HISTORY_WEEKS`` semaines : l'archive n'est pas lue.
+        """
+        if self._autoregulator is None:
+            self._autoregulator = AutoRegulator()
+            self._autoregulator.build(self.sessions)
+        return self._autoregulator
+
+    def suggest_weight(self, exercise, date: datetime.date = None) -> Optional[float]:
+        """Poids de travail suggéré pour un exercice du programme (None : poids du programme)"""
+        date = date or datetime.date.today()
+        return self.autoregulator.suggest(exercise.name, exercise.reps, exercise.weight, date.toordinal(),
+                                          self.profile.bar_weight, self.profile.plates)
+
+    def verify_aggregates(self):
+        expected = self.archived.merge(SessionAggregates.from_sessions(self.sessions))
+        if self.aggregates != expected:
+            raise RuntimeError(f"Compteurs incohérents: {self.aggregates} != {expected}")
+
+    def cached(self, key: Tuple, compute):
+        """Résultat de ``compute`` mis en cache pour la version courante des données"""
+        return self.cache.get_or_compute((self.data_version,) + key, compute)
+
+    @property
+    def program(self) -> Program:
+        """Programme de l'athlète, rechargé si son fichier a changé"""
+        try:
+            return get_program(self.profile.program)
+        except ProgramError:
+            # Programme supprimé ou invalide : programme par défaut
+            return get_program(DEFAULT_PROGRAM)
+
+    @property
+    def calendar(self) -> TrainingCalendar:
+        """Calendrier du bloc, recalculé quand le programme, la date de début ou les jours changent"""
+        program = self.program
+        schedule = program.default_schedule
+        if self.profile.workout_days is not None:
+            try:
+                schedule = schedule_from_days(self.profile.workout_days, program)
+            except ValueError:
+                pass  # jours prévus pour un autre programme
+        calendar = self._calendar
+        if (calendar is None or calendar.program is not program or calendar.start_date != self.start_date
+                or calendar.schedule != schedule):
+            calendar = self._calendar = TrainingCalendar(self.start_date, program, schedule)
+        return calendar
+
+    def get_current_week(self) -> int:
+        return self.calendar.week_for(datetime.date.today())
+
+    def calculate_1rm(self, weight: float, reps: int) -> float:
+        """Calcule le 1RM avec la formule d'Epley"""
+        if reps == 1:
+            return weight
+        return weight * (1 + reps / 30.0)
+
+    @timed
+    def get_exercise_progression(self, exercise_name: str, start: datetime.date = None,
+                                 end: datetime.date = None) -> List[Dict]:
+        """Récupère la progression d'un exercice (triée par date), sur [start, end] si précisé"""
+        self.all_sessions()
+        return self.progression_index.progression(exercise_name, start and start.toordinal(),
+                                                  end and end.toordinal())
+
+    def get_exercise_names(self) -> List[str]:
+        """Exercices de tout l'historique ; ceux de l'archive sont enregistrés avec elle"""
+        if self._archive is None:
+            archived = self.storage.archived_exercise_names()
+            if archived is not None:
+                return sorted(set(archived).union(self.progression_index.names()))
+        self.all_sessions()
+        return self.progression_index.names()
+
+    @timed
+    def get_set_estimates(self, exercise_name: str, start: datetime.date = None,
+                          end: datetime.date = None) -> Dict[str, "np.ndarray"]:
+        """1RM estimé de chaque série réussie, pour toutes les formules, sur [start, end] si précisé"""
+        import numpy as np
+        from analytics import estimate_1rm
+        self.all_sessions()
+        # Copies : les colonnes de l'index doivent rester extensibles (pas de vue sur leur tampon)
+        ordinals, weights, reps = (np.array(column) for column in self.progression_index.sets(exercise_name))
+        if start is not None or end is not None:
+            in_range = np.ones(len(ordinals), dtype=bool)
+            if start is not None:
+                in_range &= ordinals >= start.toordinal()
+            if end is not None:
+                in_range &= ordinals <= end.toordinal()
+            ordinals, weights, reps = ordinals[in_range], weights[in_range], reps[in_range]
+        dates = (ordinals.astype(np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+        estimates = estimate_1rm(weights, reps)
+        estimates.update(date=dates, weight=weights, reps=reps)
+        return estimates
+
+    @timed
+    def get_score_history(self) -> Dict[str, "np.ndarray"]:
+        """Total des meilleurs 1RM estimés (squat, développé couché, soulevé de terre) et scores à chaque date"""
+        from scoring import LIFTS, score_history
+        lifts = [self.get_set_estimates(name) for name in LIFTS.values()]
+        return score_history(lifts, self.profile.measurements, self.profile.weight, self.profile.sex == "F")
+
+    @timed
+    def get_sessions_per_date(self) -> List[Tuple[str, int]]:
+        return self.storage.sessions_per_date()
+
+    def get_program_data(self):
+        """Programme de l'athlète, compilé une seule fois par version du fichier (lecture seule)"""
+        return self.program.workouts
+
+    def get_workout_by_day(self, target_date):
+        """Retourne l'entraînement pour une date donnée"""
+        workout = self.calendar.workout_on(target_date)
+        if workout is None:
+            return None, [], 0
+        return workout.workout_name, workout.exercises, workout.week
+
+    def get_today_workout(self):
+        today = datetime.date.today()
+        return self.get_workout_by_day(today)
+
+    @timed
+    def get_next_workouts(self, days_ahead=7):
+        """Retourne les prochains entraînements"""
+        return [{
+            'date': workout.date,
+            'day_name': workout.date.strftime("%A"),
+            'workout_name': workout.workout_name,
+            'exercises': workout.exercises,
+            'week': workout.week
+        } for workout in self.calendar.next_workouts(datetime.date.today(), days_ahead)]
+
+    def get_missed_workouts(self) -> List[ScheduledWorkout]:
+        """Séances du bloc en cours, avant aujourd'hui, sans séance enregistrée"""
+        calendar = self.calendar
+        # L'archive ne sert que si la date de début a été reculée après l'archivage
+        sessions = self.all_sessions() if self.archived.last_date >= calendar.start_date.toordinal() else self.sessions
+        return calendar.missed((session.date for session in sessions), datetime.date.today())